@@ -1,4 +1,35 @@
 __version__ = '0.1.4'
 
-from .parser import parse
+import importlib
+
+from .error_handling import SchemaError, Diagnostic, Diagnostics
 from .intermediate_representation import *
+from .intermediate_representation import __all__ as _ir_all
+
+# Loaded on first use, because they import lark. Name -> module
+_lazy = {
+    "parse": "parser",
+    "check": "parser",
+    "parse_many": "parser",
+    "ParserSession": "parser",
+    "IRCache": "cache",
+    "parse_parallel": "blocks",
+    "IncrementalParser": "incremental",
+    "register_prelude": "prelude",
+    "ModuleLoader": "modules",
+}
+
+__all__ = _ir_all + ["SchemaError", "Diagnostic", "Diagnostics"] + list(_lazy)
+
+
+def __getattr__(name: str):
+    module = _lazy.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_lazy))
@@ -0,0 +1,5 @@
+import sys
+
+from api_schemas.cli import main
+
+sys.exit(main())
@@ -0,0 +1,133 @@
+import re
+from dataclasses import dataclass, field
+from functools import partial
+from typing import List, Optional, Tuple, Union, TYPE_CHECKING
+
+from .error_handling import Context, Position, SchemaError, DEFAULT_FILE_NAME
+from .intermediate_representation import *
+from .parser import ParserSession, link, reject_imports
+from .prelude import DEFAULT_PRELUDE, Prelude, resolve_prelude, symbols
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+__all__ = ["Block", "ParsedBlock", "split_blocks", "parse_block", "link_blocks", "parse_parallel"]
+
+_BLOCK_START = re.compile(r"^[^\s#]", re.MULTILINE)
+
+
+@dataclass
+class Block:
+    text: str
+    line: int   # line of the first character in the file. line 1 is first line
+
+
+@dataclass
+class ParsedBlock:
+    file: Optional[File]
+    references: List[Tuple[ReferenceType, Position]] = field(default_factory=list)
+    error: Optional[str] = None     # message, when the block can't be parsed
+    line: int = 1   # line of the block, when it was parsed
+    imports: List[Tuple[str, Position]] = field(default_factory=list)
+
+
+def split_blocks(text: str) -> List[Block]:
+    """Splits a schema at its top level blocks (typedef, communication, constant, WS).
+
+    Every block starts at column 0. Blank lines and comments belong to the block in front of them.
+    """
+    starts = [m.start() for m in _BLOCK_START.finditer(text)]
+    if not starts:
+        return [Block(text, 1)] if text else []
+    starts[0] = 0
+    starts.append(len(text))
+    blocks = []
+    line = 1
+    for begin, end in zip(starts, starts[1:]):
+        block_text = text[begin:end]
+        blocks.append(Block(block_text, line))
+        line += block_text.count("\n")
+    return blocks
+
+
+def parse_block(block: Block, file_name: str = DEFAULT_FILE_NAME) -> ParsedBlock:
+    """Parses a single block without resolving its references. Errors are returned instead of raised."""
+    session = ParserSession(file_name, block.line - 1, prelude=None)
+    try:
+        file = session.parse(block.text, link_references=False)
+    except SchemaError as e:
+        return ParsedBlock(None, error=str(e))
+    except Exception as e:
+        return ParsedBlock(None, error=repr(e))
+    return ParsedBlock(file, session.references, line=block.line, imports=session.imports)
+
+
+def link_blocks(blocks: List[ParsedBlock], text: str, file_name: str = DEFAULT_FILE_NAME,
+                lines: List[int] = None, prelude: Union[str, Prelude, None] = DEFAULT_PRELUDE) -> File:
+    """Merges the blocks into one file and links their references in a single pass.
+
+    :param lines: The current line of every block, when blocks moved since they were parsed.
+    :param prelude: See `parse`.
+    """
+    if any(b.error for b in blocks):
+        # A block doesn't see the tokens after it, so its error can differ from the one of `parse`. Parse the whole
+        # file to report the same error.
+        return ParserSession(file_name, prelude=prelude).parse(text)
+    sym_table = {}
+    communications = []
+    typedefs = []
+    constants = []
+    ws_events = None
+    for b in blocks:
+        for t in b.file.global_types:
+            sym_table[t.name] = t
+        communications.extend(b.file.communications)
+        typedefs.extend(b.file.global_types)
+        constants.extend(b.file.constants)
+        if b.file.ws_events is not None:
+            ws_events = b.file.ws_events
+    ctx = Context(file_name, text, None)
+    reject_imports(list(_shifted(blocks, lines, "imports")), ctx)
+    link(_shifted(blocks, lines, "references"), symbols(sym_table, resolve_prelude(prelude)), ctx)
+    return File(tuple(communications), tuple(typedefs), tuple(constants), ws_events)
+
+
+def _shifted(blocks: List[ParsedBlock], lines: Optional[List[int]], part: str):
+    """The references or imports of the blocks at their current lines."""
+    for i, b in enumerate(blocks):
+        shift = lines[i] - b.line if lines else 0
+        for x, pos in getattr(b, part):
+            yield x, shift_position(pos, shift)
+
+
+def shift_position(pos: Position, shift: int) -> Position:
+    if shift == 0:
+        return pos
+    return Position(pos.line_begin + shift, pos.column_begin, pos.line_end + shift, pos.column_end)
+
+
+def parse_parallel(text: str, executor: 'Executor' = None, file_name: str = DEFAULT_FILE_NAME,
+                   prelude: Union[str, Prelude, None] = DEFAULT_PRELUDE) -> File:
+    """Parses the top level blocks of a schema in parallel and links them afterwards. The result is the same as
+    the one of `parse`.
+
+    Meant for very large schemas. Uses a process pool when no executor is given.
+    """
+    if not text.endswith("\n"):
+        text += "\n"
+    blocks = split_blocks(text)
+    if len(blocks) < 2:
+        return ParserSession(file_name, prelude=prelude).parse(text)
+    fn = partial(parse_block, file_name=file_name)
+    if executor is None:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor() as executor:
+            parsed = list(executor.map(fn, blocks, chunksize=_chunk_size(blocks, executor)))
+    else:
+        parsed = list(executor.map(fn, blocks, chunksize=_chunk_size(blocks, executor)))
+    return link_blocks(parsed, text, file_name, prelude=prelude)
+
+
+def _chunk_size(blocks: List[Block], executor: 'Executor') -> int:
+    workers = getattr(executor, "_max_workers", 1)
+    return max(1, len(blocks) // (workers * 4))
@@ -0,0 +1,197 @@
+import hashlib
+import io
+import os
+import pickle
+import tempfile
+import threading
+import zlib
+from pathlib import Path
+from typing import Optional, Union, TYPE_CHECKING
+
+from .intermediate_representation import File, Typedef
+
+if TYPE_CHECKING:
+    from .prelude import Prelude
+
+__all__ = ["CACHE_DIR_ENV", "get_cache_dir", "hash_key", "IRCache"]
+
+# Set to an empty string to disable all on-disk caches
+CACHE_DIR_ENV = "API_SCHEMAS_CACHE_DIR"
+# Part of the cache keys, changes when the pickled entries change
+_FORMAT = "2"     # prelude typedefs by reference
+
+
+def get_cache_dir(sub_dir: str = None) -> Optional[Path]:
+    """Returns the directory where api_schemas persists its caches or None, when disk caching is disabled or the
+    directory can't be created.
+
+    Defaults to `$XDG_CACHE_HOME/api_schemas` (`~/.cache/api_schemas`) and can be overwritten with the
+    `API_SCHEMAS_CACHE_DIR` environment variable.
+    """
+    path = os.environ.get(CACHE_DIR_ENV)
+    if path is None:
+        path = Path(os.environ.get("XDG_CACHE_HOME") or Path.home().joinpath(".cache")).joinpath("api_schemas")
+    elif path == "":
+        return None
+    path = Path(path)
+    if sub_dir:
+        path = path.joinpath(sub_dir)
+    try:
+        path.mkdir(parents=True, exist_ok=True)
+    except OSError:
+        return None
+    return path
+
+
+def hash_key(*parts: str) -> str:
+    """Stable hex digest over all parts. Used as cache key."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class IRCache:
+    """Content addressed on-disk cache of parsed schemas.
+
+    Entries are keyed by the schema text, its prelude, the package version, the grammar and the IR classes and hold the
+    pickled and compressed `File` IR. When the cache grows above `max_size` bytes, the least recently used entries are
+    evicted.
+
+    usage:
+    ```python
+    cache = IRCache()
+    ir = parse(schema, cache=cache)
+    ```
+    """
+
+    def __init__(self, directory: Union[str, Path] = None, max_size: int = 64 * 1024 * 1024):
+        self.directory = Path(directory) if directory else get_cache_dir("ir")
+        if self.directory is None:
+            raise ValueError(f"No cache directory. Pass one or set {CACHE_DIR_ENV}.")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+        self._namespace: Optional[str] = None
+
+    def key(self, text: str, prelude: Union[str, 'Prelude', None] = "std") -> str:
+        """The prelude defaults to the one of `parse`."""
+        from .prelude import resolve_prelude
+        prelude = resolve_prelude(prelude)
+        if self._namespace is None:
+            from . import __version__
+            package = Path(__file__).parent
+            grammar = package.joinpath("grammar.lark").read_text()
+            ir_classes = package.joinpath("intermediate_representation.py").read_text()
+            self._namespace = hash_key(__version__, _FORMAT, grammar, ir_classes)
+        if prelude is None:
+            return hash_key(self._namespace, text)
+        return hash_key(self._namespace, prelude.key, text)
+
+    def get(self, text: str, prelude: Union[str, 'Prelude', None] = "std") -> Optional[File]:
+        """The IR references the typedefs of the prelude, that are shared by all schemas, and not copies of them."""
+        from .prelude import resolve_prelude
+        prelude = resolve_prelude(prelude)
+        path = self._path(self.key(text, prelude))
+        try:
+            data = path.read_bytes()
+            ir = _Unpickler(io.BytesIO(zlib.decompress(data)), prelude).load()
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            ir = None
+        except Exception:
+            path.unlink(missing_ok=True)    # corrupt or stale entry, unpickling can fail in many ways
+            ir = None
+        with self._lock:
+            if ir is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return ir
+
+    def put(self, text: str, ir: File, prelude: Union[str, 'Prelude', None] = "std"):
+        from .prelude import resolve_prelude
+        prelude = resolve_prelude(prelude)
+        buffer = io.BytesIO()
+        try:
+            _Pickler(buffer, prelude).dump(ir)
+            data = zlib.compress(buffer.getvalue())
+        except RecursionError:
+            return  # too deeply nested to pickle, not worth caching
+        path = self._path(self.key(text, prelude))
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        with self._lock:
+            try:
+                replaced = path.stat().st_size
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp, path)
+            if self._size is None:
+                self._size = sum(p.stat().st_size for p in self._entries())
+            else:
+                self._size += len(data) - replaced
+            if self._size > self.max_size:
+                self._evict()
+
+    def clear(self):
+        with self._lock:
+            for p in self._entries():
+                p.unlink(missing_ok=True)
+            self._size = 0
+
+    def _evict(self):
+        """Removes least recently used entries until the cache is below 3/4 of its max size."""
+        entries = []
+        for p in self._entries():
+            try:
+                stat = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, p))
+        entries.sort()
+        size = sum(e[1] for e in entries)
+        target = self.max_size * 3 // 4
+        for _, entry_size, p in entries:
+            if size <= target:
+                break
+            p.unlink(missing_ok=True)
+            size -= entry_size
+        self._size = size
+
+    def _entries(self):
+        return self.directory.glob("*.ir")
+
+    def _path(self, key: str) -> Path:
+        return self.directory.joinpath(f"{key}.ir")
+
+
+class _Pickler(pickle.Pickler):
+    """Pickles the typedefs of the prelude as (prelude name, type name)."""
+
+    def __init__(self, file, prelude: Optional['Prelude']):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.prelude = prelude
+
+    def persistent_id(self, obj):
+        if self.prelude is not None and isinstance(obj, Typedef) and self.prelude.types.get(obj.name) is obj:
+            return self.prelude.name, obj.name
+        return None
+
+
+class _Unpickler(pickle.Unpickler):
+
+    def __init__(self, file, prelude: Optional['Prelude']):
+        super().__init__(file)
+        self.prelude = prelude
+
+    def persistent_load(self, pid):
+        prelude_name, name = pid
+        if self.prelude is None or self.prelude.name != prelude_name or name not in self.prelude.types:
+            raise pickle.UnpicklingError(f"no type '{name}' in the prelude '{prelude_name}'")
+        return self.prelude.types[name]
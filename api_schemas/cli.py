@@ -0,0 +1,297 @@
+"""Command line interface, that compiles schema files for one or more targets.
+
+usage:
+```
+api_schemas schemas/ "more/**/*.schema" -t python -t dart -o generated/ -I shared/
+```
+Every target writes into its own directory (`generated/python/...`) and the files keep the layout of the input
+directories. The generated code of a schema contains the types of the modules it imports (see `modules`). The schemas
+are compiled in a process pool. Schemas, whose content, imported modules and options didn't change since the last
+run, are skipped. The last run is recorded in the manifest `generated/.api_schemas.json`.
+"""
+import argparse
+import glob
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+from api_schemas import __version__
+from api_schemas.cache import hash_key
+from api_schemas.compilers import available_compilers, get_compiler
+from api_schemas.error_handling import Diagnostics, SchemaError
+from api_schemas.profiling import Event, Profile
+
+if TYPE_CHECKING:
+    from api_schemas.modules import ModuleLoader
+
+__all__ = ["main", "find_schemas", "Job", "Result", "compile_schema", "Manifest"]
+
+DEFAULT_PATTERN = "*.schema"
+MANIFEST_NAME = ".api_schemas.json"
+
+
+@dataclass
+class Job:
+    """A schema and the files, that are generated from it."""
+    source: Path
+    text: str
+    outputs: Dict[str, Path]    # target -> file
+    profile: bool = False
+    search_path: Tuple[Path, ...] = ()  # of imported modules
+
+
+@dataclass
+class Result:
+    source: Path
+    times: Dict[str, float] = field(default_factory=dict)     # phase -> seconds
+    written: List[Path] = field(default_factory=list)       # files, whose content changed
+    error: Optional[str] = None
+    skipped: bool = False
+    events: List[Event] = field(default_factory=list)   # phases, when the job was profiled
+    dependencies: Dict[str, str] = field(default_factory=dict)  # imported module file -> hash of its text
+
+    @property
+    def total(self) -> float:
+        return sum(self.times.values())
+
+
+def compile_schema(job: Job) -> Result:
+    """Compiles the schema for all its targets. Errors are returned in the result instead of being raised, so the
+    other schemas are still compiled."""
+    if not job.profile:
+        return _compile_schema(job)
+    with Profile() as profile:
+        result = _compile_schema(job)
+    result.events = profile.events
+    return result
+
+
+# search path -> loader of this process. Modules imported by several schemas are parsed once per process.
+_loaders: Dict[Tuple[Path, ...], 'ModuleLoader'] = {}
+
+
+def _compile_schema(job: Job) -> Result:
+    from api_schemas.interning import intern_types
+    from api_schemas.modules import ModuleLoader
+    result = Result(job.source)
+    try:
+        start = time.perf_counter()
+        loader = _loaders.get(job.search_path)
+        if loader is None:
+            loader = _loaders[job.search_path] = ModuleLoader(job.search_path)
+        diagnostics = Diagnostics()     # reports all errors of the schema at once
+        module = loader.load_file(job.source, job.text, diagnostics)
+        result.times["parse"] = time.perf_counter() - start
+        if diagnostics.errors:
+            result.error = str(diagnostics)
+            return result
+        result.dependencies = {str(m.path): m.digest for m in module.modules() if m is not module}
+        ir = intern_types(module.bundle())
+        for target, path in job.outputs.items():
+            start = time.perf_counter()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if get_compiler(target).write_file(ir, path):
+                result.written.append(path)
+            result.times[target] = time.perf_counter() - start
+    except SchemaError as e:
+        result.error = str(e)
+    except Exception as e:
+        result.error = f"{job.source}: {type(e).__name__}: {e}"
+    return result
+
+
+class Manifest:
+    """Content hashes and options of the schemas, that were compiled by the last run. Stored as JSON."""
+
+    VERSION = 2
+
+    def __init__(self, path: Path):
+        self.path = path
+        try:
+            data = json.loads(path.read_text(encoding="utf8"))
+        except (OSError, ValueError):
+            data = {}
+        self.entries: Dict[str, dict] = data.get("entries", {}) if data.get("version") == self.VERSION else {}
+        self._digests: Dict[str, Optional[str]] = {}    # hashes of the imported modules, read once per run
+
+    def is_current(self, job: Job, key: str) -> bool:
+        entry = self.entries.get(str(job.source))
+        return entry is not None and entry["key"] == key and \
+            entry["outputs"] == {target: str(path) for target, path in job.outputs.items()} and \
+            all(path.exists() for path in job.outputs.values()) and \
+            all(self._digest(file) == digest for file, digest in entry["dependencies"].items())
+
+    def update(self, job: Job, key: str, dependencies: Dict[str, str]):
+        self.entries[str(job.source)] = {
+            "key": key,
+            "outputs": {target: str(path) for target, path in job.outputs.items()},
+            "dependencies": dependencies,
+        }
+
+    def remove(self, job: Job):
+        self.entries.pop(str(job.source), None)
+
+    def _digest(self, file: str) -> Optional[str]:
+        if file not in self._digests:
+            try:
+                self._digests[file] = hash_key(Path(file).read_text(encoding="utf8"))
+            except OSError:
+                self._digests[file] = None
+        return self._digests[file]
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps({"version": self.VERSION, "entries": self.entries}, indent=1, sort_keys=True),
+                       encoding="utf8")
+        os.replace(tmp, self.path)
+
+
+def find_schemas(inputs: Iterable[str], pattern: str = DEFAULT_PATTERN) -> Dict[Path, Path]:
+    """Schema files of the inputs, which are files, directories or glob patterns. Directories are searched
+    recursively for files, that match the pattern. Files of directories and glob patterns keep their path relative to
+    the directory or the part of the pattern in front of the first wildcard.
+
+    :return: file -> its path relative to the output directory
+    :raises ValueError: When two files have the same relative path, so their outputs would overwrite each other.
+    """
+    found: Dict[Path, Path] = {}
+    sources: Dict[Path, Path] = {}  # relative path -> file
+    for arg in inputs:
+        path = Path(arg)
+        if path.is_dir():
+            for file in sorted(path.rglob(pattern)):
+                if file.is_file():
+                    _add_schema(found, sources, file, file.relative_to(path))
+        elif path.is_file():
+            _add_schema(found, sources, path, Path(path.name))
+        else:
+            base = Path(*itertools.takewhile(lambda part: not glob.has_magic(part), path.parts))
+            for file in sorted(glob.glob(arg, recursive=True)):
+                file = Path(file)
+                if file.is_file():
+                    _add_schema(found, sources, file, file.relative_to(base) if base.parts else file)
+    return found
+
+
+def _add_schema(found: Dict[Path, Path], sources: Dict[Path, Path], file: Path, relative: Path):
+    if file in found:
+        return  # matched by several inputs
+    other = sources.setdefault(relative, file)
+    if other != file:
+        raise ValueError(f"{other} and {file} would both be compiled to {relative}. "
+                         f"Pass their common parent directory instead")
+    found[file] = relative
+
+
+def _options_key(targets: Sequence[str], search_path: Sequence[Path] = ()) -> str:
+    return hash_key(__version__, *targets, "\0", *map(str, search_path))
+
+
+def _create_jobs(schemas: Dict[Path, Path], targets: Sequence[str], out_dir: Path, profile: bool,
+                 search_path: Tuple[Path, ...] = ()) -> List[Job]:
+    extensions = {target: get_compiler(target).FILE_EXTENSION for target in targets}
+    jobs = []
+    for source, relative in schemas.items():
+        outputs = {target: out_dir.joinpath(target, relative).with_suffix(extensions[target]) for target in targets}
+        jobs.append(Job(source, source.read_text(encoding="utf8"), outputs, profile, search_path))
+    return jobs
+
+
+def _run(jobs: List[Job], workers: int) -> List[Result]:
+    if workers <= 1 or len(jobs) < 2:
+        return [compile_schema(job) for job in jobs]
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(min(workers, len(jobs))) as executor:
+        return list(executor.map(compile_schema, jobs))
+
+
+def _print_summary(results: List[Result], duration: float):
+    for result in results:
+        if result.skipped:
+            status = "unchanged"
+        elif result.error:
+            status = "failed"
+        else:
+            status = ", ".join(f"{phase} {seconds * 1000:.1f} ms" for phase, seconds in result.times.items())
+        print(f"{result.total * 1000:9.1f} ms  {result.source}  ({status})")
+    compiled = sum(1 for r in results if not r.skipped and not r.error)
+    skipped = sum(1 for r in results if r.skipped)
+    failed = sum(1 for r in results if r.error)
+    print(f"{compiled} compiled, {skipped} unchanged, {failed} failed in {duration:.2f} s")
+
+
+def main(argv: Sequence[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="api_schemas", description="Generates code from api schemas.")
+    parser.add_argument("inputs", nargs="+", help="Schema files, directories or glob patterns")
+    parser.add_argument("-t", "--target", action="append", dest="targets", choices=available_compilers(),
+                        help="Target language. Can be given multiple times. Defaults to all targets")
+    parser.add_argument("-o", "--out", type=Path, default=Path("generated"), help="Output directory")
+    parser.add_argument("-p", "--pattern", default=DEFAULT_PATTERN,
+                        help=f"Schema files in directories (default: {DEFAULT_PATTERN})")
+    parser.add_argument("-I", "--include", action="append", type=Path, default=[], metavar="DIR",
+                        help="Directory, that imported modules are searched in. Can be given multiple times")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="Number of worker processes")
+    parser.add_argument("-f", "--force", action="store_true", help="Compile unchanged schemas too")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Don't print the timing summary")
+    parser.add_argument("--profile", nargs="?", const="", default=None, metavar="TRACE",
+                        help="Print the time of every phase. Writes a Chrome trace to TRACE, when it is given")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    targets = list(dict.fromkeys(args.targets or available_compilers()))
+    try:
+        schemas = find_schemas(args.inputs, args.pattern)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    if not schemas:
+        print(f"No schemas found in: {' '.join(args.inputs)}", file=sys.stderr)
+        return 2
+    manifest = Manifest(args.out.joinpath(MANIFEST_NAME))
+    search_path = tuple(args.include)
+    options = _options_key(targets, search_path)
+    keys = {}
+    todo = []
+    results: Dict[Path, Result] = {}
+    for job in _create_jobs(schemas, targets, args.out, args.profile is not None, search_path):
+        keys[job.source] = hash_key(options, job.text)
+        if not args.force and manifest.is_current(job, keys[job.source]):
+            results[job.source] = Result(job.source, skipped=True)
+        else:
+            todo.append(job)
+    for job, result in zip(todo, _run(todo, args.jobs)):
+        results[job.source] = result
+        if result.error:
+            manifest.remove(job)
+        else:
+            manifest.update(job, keys[job.source], result.dependencies)
+    manifest.save()
+
+    ordered = [results[source] for source in schemas]
+    if not args.quiet:
+        _print_summary(ordered, time.perf_counter() - start)
+    if args.profile is not None:
+        profile = Profile()
+        for result in ordered:
+            profile.extend(result.events)
+        print(f"\n{profile.report()}")
+        if args.profile:
+            profile.write_chrome_trace(args.profile)
+    errors = [r.error for r in ordered if r.error]
+    if errors:
+        print(f"\n{len(errors)} schema(s) failed:", file=sys.stderr)
+        for error in errors:
+            print(error, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
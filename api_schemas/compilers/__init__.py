@@ -0,0 +1,44 @@
+"""The compilers by name. A compiler module is imported on first use, so only the used compilers and their
+dependencies are loaded.
+
+usage:
+```python
+from api_schemas import compilers
+compilers.get_compiler("python").convert(schema)
+compilers.python.convert(schema)  # same
+```
+"""
+import importlib
+from types import ModuleType
+from typing import Dict, List
+
+__all__ = ["COMPILERS", "register_compiler", "get_compiler", "available_compilers"]
+
+# name -> module, that has `convert(schema)`, `convert_ir(ir, fragments=None)`, `write_file(ir, path)` and the
+# `FILE_EXTENSION` of the generated files
+COMPILERS: Dict[str, str] = {
+    "python": "api_schemas.compilers.python",
+    "dart": "api_schemas.compilers.dart",
+}
+
+
+def register_compiler(name: str, module: str):
+    """Registers the module of a compiler. It is imported, when the compiler is used."""
+    COMPILERS[name] = module
+
+
+def get_compiler(name: str) -> ModuleType:
+    """Imports the module of the compiler."""
+    if name not in COMPILERS:
+        raise ValueError(f"Unknown compiler '{name}'. Available: {', '.join(COMPILERS)}")
+    return importlib.import_module(COMPILERS[name])
+
+
+def available_compilers() -> List[str]:
+    return list(COMPILERS)
+
+
+def __getattr__(name: str):
+    if name in COMPILERS:
+        return get_compiler(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,13 +2,25 @@ import re
 from abc import ABC
 from dataclasses import dataclass
 from enum import Enum
-from typing import Dict, List, Union
+from functools import cached_property, lru_cache
+import threading
+from collections import OrderedDict
+from io import StringIO
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, TextIO, Union, TYPE_CHECKING
 
-from mako.template import Template
+from api_schemas.intermediate_representation import Primitive, PrimitiveType, ObjectType, EnumType, Type, File, \
+    resolve_type
+from api_schemas.cache import IRCache, hash_key
+from api_schemas.compilers.output import ChangedFileWriter
+from api_schemas.interning import intern_types
+from api_schemas.profiling import phase
 
-from api_schemas import Primitive, PrimitiveType, parse, ObjectType, EnumType, Type, TypeAttribute
+if TYPE_CHECKING:
+    from mako.template import Template
 
-__all__ = ["NameTypes", "CaseConverter", "BaseCompiler", "NameFormat"]
+__all__ = ["NameTypes", "CaseConverter", "BaseCompiler", "NameFormat", "NameFormatter", "collect_types", "group_types",
+           "FragmentCache", "fragment_key"]
 
 
 class NameTypes(Enum):
@@ -20,6 +32,10 @@ class NameTypes(Enum):
     ENUM_NAME = 5
 
 
+# Upper case letters, that start a new word in camelCase and PascalCase
+_WORD_START = re.compile(r'(?<!^)(?=[A-Z])')
+
+
 class CaseConverter:
 
     CAMEL = 0   # camelCase
@@ -28,7 +44,9 @@ class CaseConverter:
     UPPER = 3
 
     @staticmethod
+    @lru_cache(maxsize=4096)
     def convert_unknown(name: str, target: int) -> str:
+        """Memoized, see `convert_unknown.cache_info()`."""
         return CaseConverter.convert(name, CaseConverter.basic_match(name), target)
 
     @staticmethod
@@ -53,14 +71,14 @@ class CaseConverter:
             if target == CaseConverter.PASCAL:
                 return name[0].upper() + name[1:]
             elif target == CaseConverter.SNAKE:
-                return re.sub(r'(?<!^)(?=[A-Z])', '_', name).lower()
+                return _WORD_START.sub('_', name).lower()
             elif target == CaseConverter.UPPER:
                 return CaseConverter.convert(name, source, CaseConverter.SNAKE).upper()
         elif source == CaseConverter.PASCAL:
             if target == CaseConverter.CAMEL:
                 return name[0].lower() + name[1:]
             elif target == CaseConverter.SNAKE:
-                return re.sub(r'(?<!^)(?=[A-Z])', '_', name).lower()
+                return _WORD_START.sub('_', name).lower()
             elif target == CaseConverter.UPPER:
                 return CaseConverter.convert(name, source, CaseConverter.SNAKE).upper()
         elif source == CaseConverter.UPPER:
@@ -87,13 +105,40 @@ class NameFormat:
     format: str = "{}"
 
 
+class NameFormatter:
+    """Formats names for one compiler. Results are memoized, see `cache_info()`.
+
+    usage:
+    ```python
+    formatter = NameFormatter({NameTypes.CLASS: NameFormat(CaseConverter.PASCAL, "API{}")})
+    formatter.format("user_id", NameTypes.CLASS)   # APIUserId
+    ```
+    """
+
+    def __init__(self, formats: Dict[NameTypes, NameFormat], max_size: int = 65536):
+        self._formats = {name_type: (f.case, f.format) for name_type, f in formats.items()}
+        self.format = lru_cache(maxsize=max_size)(self._format)
+        self.cache_info = self.format.cache_info
+
+    def _format(self, name: str, name_type: NameTypes) -> str:
+        case, name_format = self._formats[name_type]
+        return name_format.format(CaseConverter.convert_unknown(name, case))
+
+
 class BaseCompiler(ABC):
 
     def format_name(self, name: str, name_type: NameTypes) -> str:
-        name_format = self._get_name_format_map()[name_type]
-        name = CaseConverter.convert_unknown(name, name_format.case)
-        name = name_format.format.format(name)
-        return name
+        return self.name_formatter.format(name, name_type)
+
+    @cached_property
+    def name_formatter(self) -> NameFormatter:
+        """Built once from `_get_name_format_map`."""
+        return NameFormatter(self._get_name_format_map())
+
+    @cached_property
+    def primitive_map(self) -> Dict[Primitive, str]:
+        """`_get_primitive_map`, built once."""
+        return self._get_primitive_map()
 
     def _get_name_format_map(self) -> Dict[NameTypes, NameFormat]:
         raise NotImplementedError()
@@ -102,7 +147,7 @@ class BaseCompiler(ABC):
         raise NotImplementedError()
 
     def _parse_primitive(self, p: PrimitiveType):
-        return self._get_primitive_map()[p.primitive]
+        return self.primitive_map[p.primitive]
 
     def _get_array_format(self) -> str:
         raise NotImplementedError()
@@ -122,10 +167,11 @@ class BaseCompiler(ABC):
         List<String> names; // 'List<String>' would be returned
         ```
         """
+        t = resolve_type(t)
         if type(t) == ObjectType:
             _type = self.format_name(t.name, NameTypes.CLASS)
         elif type(t) == PrimitiveType:
-            _type = self._get_primitive_map()[t.primitive]
+            _type = self.primitive_map[t.primitive]
         elif type(t) == EnumType:
             _type = self.format_name(t.name, NameTypes.ENUM_NAME)
         else:
@@ -135,71 +181,291 @@ class BaseCompiler(ABC):
         # TODO: maybe optional
         return _type
 
-    def compile_dataclasses(self, schema: str, template: Template, *args, **kwargs) -> str:
-        ir = parse(schema)
-        classes = []
-        enums = []
-        objects: List[Union[ObjectType, EnumType]] = []
-
-        def object_from_attributes(attributes: List[TypeAttribute]):
-            queue: List[TypeAttribute] = attributes
-            while queue:
-                e = queue.pop()
-                if type(e.type) == ObjectType:
-                    queue.extend(e.type.attributes)
-                    objects.append(e.type)
-                if type(e.type) == EnumType:
-                    objects.append(e.type)
-            return queue
-
-        queue: List[Union[ObjectType, EnumType]] = [obj.type for obj in ir.global_types]
-        while queue:
-            obj = queue.pop()
-            if type(obj) is ObjectType:
-                objects.append(obj)
-                for a in obj.attributes:
-                    if type(a) in [ObjectType, EnumType]:
-                        queue.append(a.type)     
-
-        # get all not globally defined classes
-        # TODO: Should they be global then?
+    def compile_dataclasses(self, schema: str, template: 'Template', *args, cache: IRCache = None, **kwargs) -> str:
+        from api_schemas.parser import parse
+        with phase("compile"):
+            return self.compile_ir(intern_types(parse(schema, cache=cache)), template, *args, **kwargs)
+
+    def compile_ir(self, ir: File, template: 'Template', *args, fragments: "FragmentCache" = None, **kwargs) -> str:
+        """Renders the classes of an already parsed schema. Equal types are only shared, when the IR was passed to
+        `intern_types` before."""
+        out = StringIO()
+        self.emit_ir(ir, template, out, fragments)
+        return out.getvalue()
+
+    def emit_ir(self, ir: File, template: 'Template', out: TextIO, fragments: "FragmentCache" = None):
+        """Writes the code of the schema to the stream, one type at a time. Only a single class is rendered at once.
+
+        The template needs the defs `header(imports)`, `enums_begin()`, `enum_def(enum)`, `classes_begin()`,
+        `class_def(cls)` and `end()`.
+
+        :param fragments: Reuses the code of types, that didn't change since they were rendered the last time.
+        """
+        with phase("render"):
+            self._emit(collect_types(ir), _Defs(template, self, fragments), out, [], sections=True)
+
+    def emit_file(self, ir: File, template: 'Template', path: Union[str, Path], fragments: "FragmentCache" = None) \
+            -> bool:
+        """Writes the code of the schema to the file, when it changed. Returns whether the file was written."""
+        with ChangedFileWriter(path) as out:
+            self.emit_ir(ir, template, out, fragments)
+        return out.changed
+
+    def emit_split(self, ir: File, template: 'Template', directory: Union[str, Path],
+                   fragments: "FragmentCache" = None) -> List[Path]:
+        """Writes every type into its own file in the directory and returns the files. The files import the
+        types they use. Recursive types are written into the same file, as they would import each other.
+        Files are only written, when they changed.
+        """
+        with phase("render"):
+            return self._emit_split(ir, template, Path(directory), fragments)
+
+    def _emit_split(self, ir: File, template: 'Template', directory: Path, fragments: Optional["FragmentCache"]) \
+            -> List[Path]:
+        directory.mkdir(parents=True, exist_ok=True)
+        defs = _Defs(template, self, fragments)
+        files: Dict[str, List[Union[ObjectType, EnumType]]] = {}
+        module_of: Dict[int, str] = {}
+        for group in group_types(collect_types(ir)):
+            module = self.format_module_name(group[0].name)
+            files.setdefault(module, []).extend(group)
+            for t in group:
+                module_of[id(t)] = module
+        paths = []
+        for module, types in files.items():
+            imported: Dict[str, List[str]] = {}
+            for t in types:
+                for child in _dependencies(t):
+                    other = module_of[id(child)]
+                    name = self.get_native_type(child)
+                    if other != module and name not in imported.setdefault(other, []):
+                        imported[other].append(name)
+            imports = [self.format_import(other, names) for other, names in imported.items()]
+            path = directory.joinpath(module + self._get_file_extension())
+            with ChangedFileWriter(path) as out:
+                self._emit(types, defs, out, imports, sections=False)
+            paths.append(path)
+        return paths
+
+    def format_module_name(self, type_name: str) -> str:
+        """Name of the file (without extension) of a type in split mode."""
+        return CaseConverter.convert_unknown(type_name, CaseConverter.SNAKE)
+
+    def format_import(self, module: str, names: List[str]) -> str:
+        """Import of types from the file of another type in split mode."""
+        raise NotImplementedError()
+
+    def _get_file_extension(self) -> str:
+        raise NotImplementedError()
+
+    def _emit(self, types: List[Union[ObjectType, EnumType]], defs: "_Defs", out: TextIO, imports: List[str],
+              sections: bool):
+        """Writes the types. Empty sections are skipped, unless `sections` is set."""
+        out.write(defs.header.render(imports=imports))
+        enums = [t for t in types if type(t) is EnumType]
+        if enums or sections:
+            out.write(defs.enums_begin.render())
+        for t in enums:
+            out.write(self._fragment(t, defs))
+        if len(enums) < len(types) or sections:
+            out.write(defs.classes_begin.render())
+        for t in types:
+            if type(t) is ObjectType:
+                out.write(self._fragment(t, defs))
+        out.write(defs.end.render())
+
+    def _fragment(self, t: Union[ObjectType, EnumType], defs: "_Defs") -> str:
+        if defs.fragments is None:
+            return self._render(t, defs)
+        return defs.fragments.get((defs.key, fragment_key(t)), lambda: self._render(t, defs))
+
+    def _render(self, t: Union[ObjectType, EnumType], defs: "_Defs") -> str:
+        if type(t) is EnumType:
+            return defs.enum_def.render(enum=self._enum(t))
+        return defs.class_def.render(cls=self._class(t))
+
+    def _class(self, t: ObjectType) -> "Class":
+        class_name = self.format_name(t.name, NameTypes.CLASS)
+        req_attributes: List[Attribute] = []
+        opt_attributes: List[Attribute] = []
+        for a in t.attributes:
+            native_name = self.format_name(a.name, NameTypes.ATTRIBUTE)
+            original_name = a.name
+            _type = self.get_native_type(a.type, a.is_array, a.is_optional)
+            from_json = self.format_from_json(a.type, native_name, original_name, a.is_array)
+            to_json = self.format_to_json(a.type, native_name, original_name, a.is_array)
+            java_attribute = Attribute(a.name, native_name, _type, from_json, to_json)
+            if a.is_optional:
+                opt_attributes.append(java_attribute)
+            else:
+                req_attributes.append(java_attribute)
+        return Class(class_name, req_attributes, opt_attributes)
+
+    def _enum(self, t: EnumType) -> "Enum":
+        name = self.format_name(t.name, NameTypes.ENUM_NAME)
+        return Enum(name, t.values)
+
+
+class FragmentCache:
+    """Rendered code of single classes and enums. When a schema changed, only its changed types are rendered again.
+
+    Fragments are keyed by the compiler (its class, name formats, primitives and template) and `fragment_key` of the
+    type. When there are more than `max_size` fragments, the least recently used ones are evicted. A cache can be
+    shared by several compilers and threads.
+
+    usage:
+    ```python
+    fragments = FragmentCache()
+    python.write_file(ir, "api.py", fragments)
+    python.write_file(changed_ir, "api.py", fragments)
+    ```
+    """
+
+    def __init__(self, max_size: int = 100_000):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._fragments: "OrderedDict[tuple, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, render: Callable[[], str]) -> str:
+        """Returns the cached fragment or renders and caches it."""
+        with self._lock:
+            fragment = self._fragments.get(key)
+            if fragment is not None:
+                self._fragments.move_to_end(key)
+                self.hits += 1
+                return fragment
+            self.misses += 1
+        fragment = render()
+        with self._lock:
+            self._fragments[key] = fragment
+            if len(self._fragments) > self.max_size:
+                self._fragments.popitem(last=False)
+        return fragment
+
+    def clear(self):
+        with self._lock:
+            self._fragments.clear()
+
+    def __len__(self):
+        return len(self._fragments)
+
+
+def fragment_key(t: Union[ObjectType, EnumType]) -> tuple:
+    """Structure of a type, that determines its rendered code: Its name, its attributes and the names of their types.
+    Changes inside the types of the attributes don't change the code of the type itself."""
+    if type(t) is EnumType:
+        return EnumType, t.name, t.values
+    return ObjectType, t.name, tuple((a.name, a.is_optional, a.is_array, a.is_wildcard, _type_key(a.type))
+                                     for a in t.attributes)
+
+
+def _type_key(t: Type):
+    t = resolve_type(t)
+    if type(t) is PrimitiveType:
+        return t.primitive
+    return type(t), t.name
+
+
+class _Defs:
+    """The defs of a template, that render one part of a file."""
+
+    def __init__(self, template: 'Template', compiler: BaseCompiler, fragments: Optional[FragmentCache]):
+        for name in ("header", "enums_begin", "enum_def", "classes_begin", "class_def", "end"):
+            setattr(self, name, template.get_def(name))
+        self.fragments = fragments
+        if fragments is not None:
+            name_formats = tuple((n.name, f.case, f.format) for n, f in compiler._get_name_format_map().items())
+            primitives = tuple((p.name, native) for p, native in compiler.primitive_map.items())
+            compiler_type = type(compiler)
+            self.key = (compiler_type.__module__, compiler_type.__qualname__, name_formats, primitives,
+                        hash_key(template.source))
+
+
+def collect_types(ir: File) -> List[Union[ObjectType, EnumType]]:
+    """Returns all object and enum types of the file that need a class. Every type is returned once and after all
+    types of its attributes (dependency order), except in recursive types.
+
+    Starts at the global types and the data of the websocket events. The data of an event is returned as object
+    `event_data_<name>`. Types are compared by identity, use `intern_types` to merge equal ones first.
+    """
+    roots: List[Type] = [t.type for t in ir.global_types]
+    if ir.ws_events is not None:
         for event in ir.ws_events.client + ir.ws_events.server:
-            objects.append(ObjectType(f"event_data_{event.name}", [], event.data))
-            queue = event.data
-            while queue:
-                e = queue.pop()
-                if type(e.type) == ObjectType:
-                    queue.extend(e.type.attributes)
-                    objects.append(e.type)
-                if type(e.type) == EnumType:
-                    objects.append(e.type)
-
-        while objects:
-            t = objects.pop()
-            if type(t) == ObjectType:
-                class_name = self.format_name(t.name, NameTypes.CLASS)
-                req_attributes: List[Attribute] = []
-                opt_attributes: List[Attribute] = []
-                for a in t.attributes:
-                    native_name = self.format_name(a.name, NameTypes.ATTRIBUTE)
-                    original_name = a.name
-                    _type = self.get_native_type(a.type, a.is_array, a.is_optional)
-                    from_json = self.format_from_json(a.type, native_name, original_name, a.is_array)
-                    to_json = self.format_to_json(a.type, native_name, original_name, a.is_array)
-                    java_attribute = Attribute(a.name, native_name, _type, from_json, to_json)
-                    if a.is_optional:
-                        opt_attributes.append(java_attribute)
-                    else:
-                        req_attributes.append(java_attribute)
-                java_class = Class(class_name, req_attributes, opt_attributes)
-                classes.append(java_class)
-            elif type(t) == EnumType:
-                name = self.format_name(t.name, NameTypes.ENUM_NAME)
-                enums.append(Enum(name, t.values))
-        imports = []
-
-        file_content = template.render(classes=classes, enums=enums, imports=imports)
-        return file_content
+            roots.append(ObjectType(f"event_data_{event.name}", (), event.data))
+    types = []
+    visited = set()
+    for root in roots:
+        root = resolve_type(root)
+        if type(root) not in (ObjectType, EnumType) or id(root) in visited:
+            continue
+        visited.add(id(root))
+        stack = [(root, iter(root.attributes if type(root) is ObjectType else ()))]
+        while stack:
+            t, attributes = stack[-1]
+            for a in attributes:
+                child = resolve_type(a.type)
+                if type(child) in (ObjectType, EnumType) and id(child) not in visited:
+                    visited.add(id(child))
+                    stack.append((child, iter(child.attributes if type(child) is ObjectType else ())))
+                    break
+            else:
+                stack.pop()
+                types.append(t)
+    return types
+
+
+def group_types(types: List[Union[ObjectType, EnumType]]) -> List[List[Union[ObjectType, EnumType]]]:
+    """Groups the types, that depend on each other (strongly connected components). The groups are in dependency
+    order and keep the order of `types` inside.
+    """
+    position = {id(t): i for i, t in enumerate(types)}
+    index: Dict[int, int] = {}
+    low: Dict[int, int] = {}
+    stack = []
+    on_stack = set()
+    groups = []
+    for root in types:
+        if id(root) in index:
+            continue
+        index[id(root)] = low[id(root)] = len(index)
+        stack.append(root)
+        on_stack.add(id(root))
+        work = [(root, iter(_dependencies(root)))]
+        while work:
+            t, dependencies = work[-1]
+            for child in dependencies:
+                if id(child) not in index:
+                    index[id(child)] = low[id(child)] = len(index)
+                    stack.append(child)
+                    on_stack.add(id(child))
+                    work.append((child, iter(_dependencies(child))))
+                    break
+                if id(child) in on_stack:
+                    low[id(t)] = min(low[id(t)], index[id(child)])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[id(parent)] = min(low[id(parent)], low[id(t)])
+                if low[id(t)] == index[id(t)]:
+                    group = []
+                    while True:
+                        child = stack.pop()
+                        on_stack.discard(id(child))
+                        group.append(child)
+                        if child is t:
+                            break
+                    groups.append(sorted(group, key=lambda g: position[id(g)]))
+    return groups
+
+
+def _dependencies(t: Union[ObjectType, EnumType]) -> List[Union[ObjectType, EnumType]]:
+    if type(t) is not ObjectType:
+        return []
+    types = (resolve_type(a.type) for a in t.attributes)
+    return [c for c in types if type(c) in (ObjectType, EnumType)]
 
 
 @dataclass
@@ -1,84 +1,22 @@
-from typing import Dict
+from pathlib import Path
+from typing import Dict, List, TextIO, Union
 
-from mako.template import Template
 
-from api_schemas import *
+from api_schemas.intermediate_representation import *
+from api_schemas.cache import IRCache
 from api_schemas.compilers.base import *
+from api_schemas.compilers.template_registry import templates, TEMPLATE_DIR
+from api_schemas.interning import intern_types
 
-file_template = Template("""\
-/*
- *
- * Auto generated Code by python tool.
- * Changes in this file will be overwritten, when the script is executed again.
- *
-*/
-<%
-    imports_str = "\\n".join([f"import {i};" for i in imports]) 
-%>
-${imports_str}
-
-// Enunms
-% for enum in enums:
-enum ${enum.name} {
-<% values = ",\\n  ".join(enum.values) %>\
-  ${values}
-}
-% endfor
-
-// Data Classes
-% for cls in classes:
-class ${cls.name} {
-    % for attr in cls.req_attributes:
-  ${attr.type} ${attr.native_name};
-    % endfor
-    % for attr in cls.opt_attributes:
-  ${attr.type} ${attr.native_name};
-    % endfor
-
-  ${cls.name}(
-    % for attr in cls.req_attributes:
-    this.${attr.native_name},
-    % endfor
-    % if cls.opt_attributes:
-    {
-        % for attr in cls.opt_attributes:
-    this.${attr.native_name},
-        % endfor
-    }
-    % endif
-  );
-
-  ${cls.name}.fromJson(Map<String, dynamic> json) {
-    % for attr in cls.req_attributes:
-    ${attr.native_name} = ${attr.from_json};
-    % endfor
-     % for attr in cls.opt_attributes:
-    if (json.containsKey("${attr.original_name}")) {
-      ${attr.native_name} = ${attr.from_json};
-    }
-    % endfor
-  }
-
-  Map<String, dynamic> toJson() {
-    final Map<String, dynamic> json = new Map<String, dynamic>();
-    % for attr in cls.req_attributes:
-    json["${attr.original_name}"] = ${attr.to_json};
-    % endfor
-    % for attr in cls.opt_attributes:
-    if (${attr.native_name} != null) {
-      json["${attr.original_name}"] = ${attr.to_json};
-    }
-    % endfor
-    return json;
-  }
-}
-%endfor 
-""")
+FILE_EXTENSION = ".dart"
+
+templates.register("dart", TEMPLATE_DIR.joinpath("dart.mako"))
 
 
 class DartCompiler(BaseCompiler):
 
-    def format_from_json(self, t: Type, original_name: str, is_array: bool):
+    def format_from_json(self, t: Type, native_name: str, original_name: str, is_array: bool):
+        t = resolve_type(t)
         if is_array:
             native_type = self.get_native_type(t, is_array)
             s = f"{native_type} tmp__ = [];\n" \
@@ -93,7 +31,8 @@ class DartCompiler(BaseCompiler):
             return f"{native_type}.values.firstWhere(" \
                    f"(e) => e.toString() == \"{native_type}.\" + json[\"{original_name}\"])"
 
-    def format_to_json(self, t: Type, native_name: str, is_array: bool):
+    def format_to_json(self, t: Type, native_name: str, original_name: str, is_array: bool):
+        t = resolve_type(t)
         if type(t) == ObjectType:
             return f"{native_name}.toJson()"
         elif type(t) == PrimitiveType:
@@ -105,6 +44,12 @@ class DartCompiler(BaseCompiler):
     def _get_array_format(self) -> str:
         return "List<{}>"
 
+    def format_import(self, module: str, names: List[str]) -> str:
+        return f"import '{module}.dart';"
+
+    def _get_file_extension(self) -> str:
+        return FILE_EXTENSION
+
     def _get_name_format_map(self) -> Dict[NameTypes, NameFormat]:
         return {
             NameTypes.ENUM_NAME: NameFormat(CaseConverter.PASCAL, "API{}"),
@@ -119,6 +64,32 @@ class DartCompiler(BaseCompiler):
                 Primitive.Int: "int", Primitive.Float: "double"}
 
 
-def convert(schema) -> str:
-    f = DartCompiler().compile_dataclasses(schema, file_template)
+def convert(schema, cache: IRCache = None) -> str:
+    from api_schemas.parser import parse
+    return convert_ir(intern_types(parse(schema, cache=cache)))
+
+
+def convert_ir(ir: File, fragments: FragmentCache = None) -> str:
+    f = DartCompiler().compile_ir(ir, templates.get("dart"), fragments=fragments)
     return f
+
+
+def write_ir(ir: File, out: TextIO, fragments: FragmentCache = None):
+    """Writes the library to the stream class by class."""
+    DartCompiler().emit_ir(ir, templates.get("dart"), out, fragments)
+
+
+def write_file(ir: File, path: Union[str, Path], fragments: FragmentCache = None) -> bool:
+    """Writes the library to the file, when it changed. Returns whether it was written."""
+    return DartCompiler().emit_file(ir, templates.get("dart"), path, fragments)
+
+
+def write_split(ir: File, directory: Union[str, Path], fragments: FragmentCache = None) -> List[Path]:
+    """Writes one file per type into the directory and returns the written files."""
+    return DartCompiler().emit_split(ir, templates.get("dart"), directory, fragments)
+
+
+def __getattr__(name: str):
+    if name == "file_template":     # compiled on first use
+        return templates.get("dart")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,68 @@
+import os
+import threading
+from pathlib import Path
+from typing import Optional, TextIO, Union
+
+__all__ = ["ChangedFileWriter"]
+
+
+class ChangedFileWriter:
+    """Text stream, that replaces a file only when the written content differs from it.
+
+    Unchanged files keep their mtime, so build tools that compare mtimes don't rebuild. The content is compared while
+    it is written and goes to a temporary file, that replaces the file on `close`. Nothing is held in memory.
+
+    usage:
+    ```python
+    with ChangedFileWriter("out.py") as out:
+        out.write(code)
+    out.changed
+    ```
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.changed = False
+        try:
+            self._old: Optional[TextIO] = open(self.path, encoding="utf8")
+        except FileNotFoundError:
+            self._old = None
+            self.changed = True
+        # A file next to the target, that is created with the default permissions
+        self._tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        self._new = open(self._tmp, "w", encoding="utf8")
+
+    def write(self, s: str) -> int:
+        if not self.changed and self._old.read(len(s)) != s:
+            self.changed = True
+        return self._new.write(s)
+
+    def close(self):
+        """Replaces the file, when its content changed."""
+        if self._new.closed:
+            return
+        if self._old is not None:
+            if not self.changed and self._old.read(1):
+                self.changed = True     # the file was longer
+            self._old.close()
+        self._new.close()
+        if self.changed:
+            os.replace(self._tmp, self.path)
+        else:
+            os.unlink(self._tmp)
+
+    def discard(self):
+        """Keeps the file as it is."""
+        if self._old is not None:
+            self._old.close()
+        self._new.close()
+        os.unlink(self._tmp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
@@ -0,0 +1,49 @@
+from functools import partial
+from typing import Dict, Iterable, Optional, Union, TYPE_CHECKING
+
+from api_schemas.intermediate_representation import File
+from api_schemas.cache import IRCache
+from api_schemas.compilers import COMPILERS, get_compiler
+from api_schemas.compilers.base import FragmentCache
+from api_schemas.interning import intern_types
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+__all__ = ["compile_targets"]
+
+
+def compile_targets(schema: Union[str, File], targets: Iterable[str] = None, executor: 'Executor' = None,
+                    cache: IRCache = None, fragments: FragmentCache = None) -> Dict[str, str]:
+    """Parses the schema once and renders it for every target. Returns the output of every target by its name.
+
+    usage:
+    ```python
+    outputs = compile_targets(schema, ["python", "dart"])
+    outputs["python"]
+    ```
+
+    :param schema: The schema text or its IR.
+    :param targets: Names of compilers (see `api_schemas.compilers.COMPILERS`). Defaults to all compilers.
+    :param executor: Renders the targets concurrently. Rendering holds the GIL, so only a process pool renders them
+        in parallel. Without one, the targets are rendered one after another.
+    :param fragments: Renders only the types, that changed since the last call. See `FragmentCache`. It stays in
+        this process and can't be combined with a process pool.
+    """
+    names = list(COMPILERS) if targets is None else list(targets)
+    for name in names:
+        if name not in COMPILERS:
+            raise ValueError(f"Unknown target '{name}'. Available: {', '.join(COMPILERS)}")
+    if isinstance(schema, str):
+        from api_schemas.parser import parse
+        schema = parse(schema, cache=cache)
+    ir = intern_types(schema)
+    render = partial(_render, ir=ir, fragments=fragments)
+    if executor is None or len(names) < 2:
+        return {name: render(name) for name in names}
+    return dict(zip(names, executor.map(render, names)))
+
+
+def _render(name: str, ir: File, fragments: Optional[FragmentCache]) -> str:
+    """Module level, so process pools can pickle it."""
+    return get_compiler(name).convert_ir(ir, fragments=fragments)
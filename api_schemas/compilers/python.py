@@ -1,76 +1,18 @@
 import enum
-from typing import Dict
-
-import autopep8 as autopep8
-
-from api_schemas import *
-from mako.template import Template
-
-from api_schemas.compilers.base import BaseCompiler, NameTypes, CaseConverter, NameFormat
-
-file_template = Template("""\
-#
-#
-# Auto generated Code by python tool.
-# Changes in this file will be overwritten, when the script is executed again.
-#
-#
-<%
-    imports_str = "\\n".join([f"import {i}" for i in imports]) 
-%>
-${imports_str}
-from dataclasses import dataclass, field
-from typing import List, Dict, Optional, Any, Union
-import json
-import enum
+from pathlib import Path
+from typing import Dict, List, TextIO, Union
 
-# Enums
-% for enum in enums:
-class ${enum.name}(enum.Enum):
-    % for i, value in enumerate(enum.values):
-    ${value} = ${i},
-    % endfor 
-% endfor
-
-# Data Classes
-% for cls in classes:
-@dataclass
-class ${cls.name}:
-    % for attr in cls.req_attributes:
-    ${attr.native_name}: '${attr.type}'
-    % endfor
-   % for attr in cls.opt_attributes:
-    ${attr.native_name}: 'Optional[${attr.type}]' = None
-    % endfor
-    
-    @classmethod
-    def from_json(cls, data: 'Union[str, dict]'):
-        if type(data) is str:
-            data = json.loads(data)
-        % for attr in cls.req_attributes:
-        ${attr.from_json}
-        % endfor
-        % for attr in cls.opt_attributes:
-        if "${attr.original_name}" in data:
-            ${attr.from_json}
-        else:
-            ${attr.native_name} = None
-        % endfor
-        <% attributes = ", ".join([attr.native_name for attr in cls.req_attributes + cls.opt_attributes]) %>
-        return cls(${attributes})
-        
-    def to_json(self):
-        data = {}
-        % for attr in cls.req_attributes:
-        ${attr.to_json}
-        % endfor
-        % for attr in cls.opt_attributes:
-        if self.${attr.original_name}:
-            ${attr.to_json}
-        % endfor
-        return data
-%endfor
-""")
+from api_schemas.intermediate_representation import *
+
+from api_schemas.cache import IRCache
+from api_schemas.compilers.base import BaseCompiler, NameTypes, CaseConverter, NameFormat, FragmentCache
+from api_schemas.compilers.template_registry import templates, TEMPLATE_DIR
+from api_schemas.interning import intern_types
+from api_schemas.profiling import phase
+
+FILE_EXTENSION = ".py"
+
+templates.register("python", TEMPLATE_DIR.joinpath("python.mako"))
 
 
 class PythonCompiler(BaseCompiler):
@@ -84,6 +26,7 @@ class PythonCompiler(BaseCompiler):
             return f"{native_name} = {self.format_from_json_single(t, json_value)}"
 
     def format_from_json_single(self, t: Type, json_value: str):
+        t = resolve_type(t)
         if type(t) == PrimitiveType:
             return json_value
         elif type(t) == ObjectType:
@@ -97,19 +40,26 @@ class PythonCompiler(BaseCompiler):
         if is_array:
             return f"data[\"{original_name}\"] = [{self.format_to_json_single(t, 'v')} for v in self.{native_name}]"
         else:
-            return f"data[\"{original_name}\"] = {self.format_to_json_single(t, native_name)}"
+            return f"data[\"{original_name}\"] = {self.format_to_json_single(t, f'self.{native_name}')}"
 
-    def format_to_json_single(self, t: Type, native_name: str):
+    def format_to_json_single(self, t: Type, value: str):
+        t = resolve_type(t)
         if type(t) == PrimitiveType:
-            return f"self.{native_name}"
+            return value
         elif type(t) == ObjectType:
-            return f"self.{native_name}.to_json()"
+            return f"{value}.to_json()"
         elif type(t) == EnumType:
-            return f"self.{native_name}.name"
+            return f"{value}.name"
 
     def _get_array_format(self) -> str:
         return "List[{}]"
 
+    def format_import(self, module: str, names: List[str]) -> str:
+        return f"from .{module} import {', '.join(names)}"
+
+    def _get_file_extension(self) -> str:
+        return FILE_EXTENSION
+
     def _get_name_format_map(self) -> Dict[NameTypes, NameFormat]:
         return {
             NameTypes.ENUM_NAME: NameFormat(CaseConverter.PASCAL, "API{}"),
@@ -124,7 +74,38 @@ class PythonCompiler(BaseCompiler):
                 Primitive.Int: "int", Primitive.Float: "float"}
 
 
-def convert(schema: str) -> str:
-    f = PythonCompiler().compile_dataclasses(schema, file_template)
-    f = autopep8.fix_code(f)
+def convert(schema: str, cache: IRCache = None, run_autopep8: bool = False) -> str:
+    from api_schemas.parser import parse
+    return convert_ir(intern_types(parse(schema, cache=cache)), run_autopep8)
+
+
+def convert_ir(ir: File, run_autopep8: bool = False, fragments: FragmentCache = None) -> str:
+    """The template already renders PEP 8 formatted code. `run_autopep8` formats it once more with autopep8, which
+    is slow for large schemas."""
+    f = PythonCompiler().compile_ir(ir, templates.get("python"), fragments=fragments)
+    if run_autopep8:
+        import autopep8
+        with phase("autopep8"):
+            f = autopep8.fix_code(f)
     return f
+
+
+def write_ir(ir: File, out: TextIO, fragments: FragmentCache = None):
+    """Writes the module to the stream class by class."""
+    PythonCompiler().emit_ir(ir, templates.get("python"), out, fragments)
+
+
+def write_file(ir: File, path: Union[str, Path], fragments: FragmentCache = None) -> bool:
+    """Writes the module to the file, when it changed. Returns whether it was written."""
+    return PythonCompiler().emit_file(ir, templates.get("python"), path, fragments)
+
+
+def write_split(ir: File, directory: Union[str, Path], fragments: FragmentCache = None) -> List[Path]:
+    """Writes one module per type into the directory (a package) and returns the written files."""
+    return PythonCompiler().emit_split(ir, templates.get("python"), directory, fragments)
+
+
+def __getattr__(name: str):
+    if name == "file_template":     # compiled on first use
+        return templates.get("python")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,101 @@
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Union, TYPE_CHECKING
+
+from api_schemas.cache import get_cache_dir, hash_key
+from api_schemas.profiling import phase
+
+if TYPE_CHECKING:
+    from mako.template import Template
+
+__all__ = ["TEMPLATE_DIR", "TemplateRegistry", "templates"]
+
+TEMPLATE_DIR = Path(__file__).parent.joinpath("templates")
+
+
+class TemplateRegistry:
+    """Templates of the compilers by name. They are compiled on first use.
+
+    The python modules, that Mako generates from the templates, are persisted to the cache directory (see
+    `get_cache_dir`) and loaded by following processes instead of compiling the templates again. The modules are keyed
+    by the template source, so changed templates are compiled again.
+
+    Users can override the template of a compiler with their own one, which is cached the same way:
+    ```python
+    templates.override("python", Path("my_python.mako"))
+    python.convert(schema)
+    ```
+    """
+
+    def __init__(self, module_directory: Union[str, Path] = None):
+        """
+        :param module_directory: Where the compiled templates are stored. Defaults to `<cache dir>/templates`.
+        """
+        self._module_directory = Path(module_directory) if module_directory else None
+        self._defaults: Dict[str, Path] = {}
+        self._overrides: Dict[str, Union[str, Path]] = {}
+        self._templates: Dict[str, 'Template'] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, path: Union[str, Path]):
+        """Registers the default template file of a compiler."""
+        with self._lock:
+            self._defaults[name] = Path(path)
+            self._templates.pop(name, None)
+
+    def override(self, name: str, template: Union[str, Path]):
+        """Uses the template instead of the default one of the compiler. Strings are the template text, paths a
+        template file."""
+        if name not in self._defaults:
+            raise KeyError(f"Unknown template '{name}'. Available: {', '.join(self._defaults)}")
+        with self._lock:
+            self._overrides[name] = template
+            self._templates.pop(name, None)
+
+    def reset(self, name: str):
+        """Uses the default template of the compiler again."""
+        with self._lock:
+            self._overrides.pop(name, None)
+            self._templates.pop(name, None)
+
+    def get(self, name: str) -> 'Template':
+        template = self._templates.get(name)
+        if template is None:
+            with self._lock:
+                template = self._templates.get(name)
+                if template is None:
+                    with phase("template"):
+                        template = self._compile(name)
+                    self._templates[name] = template
+        return template
+
+    def _compile(self, name: str) -> 'Template':
+        from mako.template import Template
+        source = self._overrides.get(name, self._defaults[name])
+        module_directory = self._module_directory or get_cache_dir("templates")
+        if isinstance(source, str):
+            text = source
+            path = None
+            if module_directory:
+                # Mako only caches the modules of template files
+                path = module_directory.joinpath("overrides", f"{hash_key(text)[:24]}.mako")
+                if not path.exists():
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+                    tmp.write_text(text)
+                    os.replace(tmp, path)
+        else:
+            path = source
+            text = path.read_text()
+        if path is None:
+            return Template(text)
+        module_filename = None
+        if module_directory:
+            key = hash_key(text, str(path.resolve()))
+            module_filename = str(module_directory.joinpath(f"{name}_{key[:24]}.py"))
+        return Template(filename=str(path), module_filename=module_filename)
+
+
+# Templates of all compilers. Every compiler registers its default template.
+templates = TemplateRegistry()
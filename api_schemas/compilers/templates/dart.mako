@@ -0,0 +1,85 @@
+<%def name="header(imports)">\
+/*
+ *
+ * Auto generated Code by python tool.
+ * Changes in this file will be overwritten, when the script is executed again.
+ *
+*/
+
+% for line in imports:
+${line}
+% endfor
+% if not imports:
+
+% endif
+</%def>\
+<%def name="enum_def(enum)">\
+enum ${enum.name} {
+<% values = ",\n  ".join(enum.values) %>\
+  ${values}
+}
+</%def>\
+<%def name="class_def(cls)">\
+class ${cls.name} {
+    % for attr in cls.req_attributes:
+  ${attr.type} ${attr.native_name};
+    % endfor
+    % for attr in cls.opt_attributes:
+  ${attr.type} ${attr.native_name};
+    % endfor
+
+  ${cls.name}(
+    % for attr in cls.req_attributes:
+    this.${attr.native_name},
+    % endfor
+    % if cls.opt_attributes:
+    {
+        % for attr in cls.opt_attributes:
+    this.${attr.native_name},
+        % endfor
+    }
+    % endif
+  );
+
+  ${cls.name}.fromJson(Map<String, dynamic> json) {
+    % for attr in cls.req_attributes:
+    ${attr.native_name} = ${attr.from_json};
+    % endfor
+     % for attr in cls.opt_attributes:
+    if (json.containsKey("${attr.original_name}")) {
+      ${attr.native_name} = ${attr.from_json};
+    }
+    % endfor
+  }
+
+  Map<String, dynamic> toJson() {
+    final Map<String, dynamic> json = new Map<String, dynamic>();
+    % for attr in cls.req_attributes:
+    json["${attr.original_name}"] = ${attr.to_json};
+    % endfor
+    % for attr in cls.opt_attributes:
+    if (${attr.native_name} != null) {
+      json["${attr.original_name}"] = ${attr.to_json};
+    }
+    % endfor
+    return json;
+  }
+}
+</%def>\
+<%def name="enums_begin()">
+// Enunms
+</%def>\
+<%def name="classes_begin()">
+// Data Classes
+</%def>\
+<%def name="end()"></%def>\
+<%
+    header(imports)
+    enums_begin()
+    for enum in enums:
+        enum_def(enum)
+    classes_begin()
+    for cls in classes:
+        class_def(cls)
+    end()
+%>\
@@ -0,0 +1,79 @@
+<%def name="header(imports)">\
+#
+#
+# Auto generated Code by python tool.
+# Changes in this file will be overwritten, when the script is executed again.
+#
+#
+
+
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Any, Union
+import json
+import enum
+% for line in imports:
+${line}
+% endfor
+</%def>\
+<%def name="enum_def(enum)">
+
+class ${enum.name}(enum.Enum):
+    % for i, value in enumerate(enum.values):
+    ${value} = ${i},
+    % endfor
+</%def>\
+<%def name="class_def(cls)">
+
+@dataclass
+class ${cls.name}:
+    % for attr in cls.req_attributes:
+    ${attr.native_name}: '${attr.type}'
+    % endfor
+    % for attr in cls.opt_attributes:
+    ${attr.native_name}: 'Optional[${attr.type}]' = None
+    % endfor
+
+    @classmethod
+    def from_json(cls, data: 'Union[str, dict]'):
+        if type(data) is str:
+            data = json.loads(data)
+        % for attr in cls.req_attributes:
+        ${attr.from_json}
+        % endfor
+        % for attr in cls.opt_attributes:
+        if "${attr.original_name}" in data:
+            ${attr.from_json}
+        else:
+            ${attr.native_name} = None
+        % endfor
+
+        return cls(${", ".join([attr.native_name for attr in cls.req_attributes + cls.opt_attributes])})
+
+    def to_json(self):
+        data = {}
+        % for attr in cls.req_attributes:
+        ${attr.to_json}
+        % endfor
+        % for attr in cls.opt_attributes:
+        if self.${attr.original_name}:
+            ${attr.to_json}
+        % endfor
+        return data
+</%def>\
+<%def name="enums_begin()">
+# Enums
+</%def>\
+<%def name="classes_begin()">
+# Data Classes
+</%def>\
+<%def name="end()"></%def>\
+<%
+    header(imports)
+    enums_begin()
+    for enum in enums:
+        enum_def(enum)
+    classes_begin()
+    for cls in classes:
+        class_def(cls)
+    end()
+%>\
@@ -0,0 +1,363 @@
+"""Daemon, that keeps the parser and the compilers warm and compiles schemas for clients over a Unix domain socket.
+
+usage:
+```
+api_schemas-daemon serve &
+api_schemas-daemon compile api.schema -t python > api.py
+api_schemas-daemon stop
+```
+```python
+with Client() as client:
+    client.compile(schema, ["python"])["python"]
+```
+
+The protocol is one JSON object per line. Requests of a connection can be pipelined, the responses carry the id of
+their request and can arrive out of order.
+```
+-> {"id": 1, "method": "compile", "params": {"schema": "...", "targets": ["python"], "file_name": "api.schema"}}
+<- {"id": 1, "result": {"python": "..."}}
+<- {"id": 2, "error": {"type": "SchemaError", "message": "...", "line": 2, "column": 5, ...}}
+```
+Methods: `ping`, `parse`, `check`, `compile`, `stats` and `shutdown`.
+"""
+import argparse
+import asyncio
+import getpass
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, TYPE_CHECKING, Union
+
+from api_schemas.compilers import available_compilers, get_compiler
+from api_schemas.error_handling import Diagnostic, ErrorLevel, Position, SchemaError
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+__all__ = ["Server", "Client", "DaemonError", "default_socket_path", "main"]
+
+SOCKET_ENV = "API_SCHEMAS_SOCKET"
+
+
+def default_socket_path() -> Path:
+    """`$API_SCHEMAS_SOCKET` or a socket of the user in the temp directory."""
+    path = os.environ.get(SOCKET_ENV)
+    if path:
+        return Path(path)
+    return Path(tempfile.gettempdir()).joinpath(f"api_schemas-{_user_id()}.sock")
+
+
+def _user_id() -> str:
+    getuid = getattr(os, "getuid", None)    # not on Windows
+    if getuid is not None:
+        return str(getuid())
+    try:
+        return getpass.getuser()
+    except Exception:   # no user name in the environment, the error type depends on the python version
+        return "user"
+
+
+def _unix_socket() -> socket.socket:
+    _require_unix_sockets()
+    return socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+
+def _require_unix_sockets():
+    if not hasattr(socket, "AF_UNIX"):     # e.g. python on Windows
+        raise DaemonError("the daemon needs unix domain sockets")
+
+
+def _answers(path: Path) -> bool:
+    """Whether a daemon listens on the socket."""
+    with _unix_socket() as s:
+        s.settimeout(1)
+        try:
+            s.connect(str(path))
+        except OSError:
+            return False
+    return True
+
+
+class DaemonError(Exception):
+    """A request failed for another reason than an error in the schema."""
+
+
+# Warm state of a worker process
+_fragments = None
+
+
+def _warm_up():
+    """Builds the parser and compiles the templates of all compilers, before the first request arrives."""
+    global _fragments
+    from api_schemas.compilers.base import FragmentCache
+    from api_schemas.parser import get_parser
+    get_parser()
+    for name in available_compilers():
+        getattr(get_compiler(name), "file_template", None)
+    _fragments = FragmentCache()
+
+
+def _parse(schema: str, file_name: str) -> dict:
+    from api_schemas.parser import ParserSession
+    ir = ParserSession(file_name).parse(schema)
+    return {
+        "types": [t.name for t in ir.global_types],
+        "communications": [c.name for c in ir.communications],
+        "constants": {c.name: c.value for c in ir.constants},
+    }
+
+
+def _check(schema: str, file_name: str) -> list:
+    from api_schemas.parser import check
+    return [d.to_dict() for d in check(schema, file_name)]
+
+
+def _compile(schema: str, targets: Sequence[str], file_name: str) -> Dict[str, str]:
+    from api_schemas.interning import intern_types
+    from api_schemas.parser import ParserSession
+    if _fragments is None:
+        _warm_up()
+    ir = intern_types(ParserSession(file_name).parse(schema))
+    return {target: get_compiler(target).convert_ir(ir, fragments=_fragments) for target in targets}
+
+
+def _error(e: BaseException) -> dict:
+    if isinstance(e, SchemaError):
+        return {"type": "SchemaError", **e.to_dict()}
+    return {"type": type(e).__name__, "message": str(e)}
+
+
+class Server:
+    """Serves parse and compile requests. Connections are handled by asyncio, the parsing and rendering runs in a
+    pool of warm worker processes."""
+
+    def __init__(self, path: Union[str, Path] = None, workers: int = None, executor: 'Executor' = None):
+        """
+        :param workers: Number of worker processes. Defaults to the number of CPUs.
+        :param executor: Runs the requests instead of a process pool. Its workers are warmed up on first use.
+        """
+        self.path = Path(path) if path else default_socket_path()
+        self.workers = workers
+        self.requests = 0
+        self.errors = 0
+        self.ready = threading.Event()
+        self._executor = executor
+        self._stopped: Optional[asyncio.Event] = None
+        self._connections: Set[asyncio.Task] = set()
+
+    def serve_forever(self):
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        """Serves until a client requests the shutdown.
+
+        :raises DaemonError: When another daemon serves the socket or the platform has no unix domain sockets.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        _require_unix_sockets()
+        if self.path.exists():
+            if _answers(self.path):
+                raise DaemonError(f"A daemon already serves {self.path}")
+            self.path.unlink()      # left over by a killed daemon
+        own_executor = self._executor is None
+        if own_executor:
+            self._executor = ProcessPoolExecutor(self.workers, initializer=_warm_up)
+        self._stopped = asyncio.Event()
+        server = await asyncio.start_unix_server(self._handle, str(self.path))
+        self.ready.set()
+        try:
+            async with server:
+                await self._stopped.wait()
+                server.close()
+                connections = list(self._connections)
+                for task in connections:
+                    task.cancel()
+                await asyncio.gather(*connections, return_exceptions=True)
+        finally:
+            if self.path.exists():
+                self.path.unlink()
+            if own_executor:
+                self._executor.shutdown()
+                self._executor = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        connection = asyncio.current_task()
+        self._connections.add(connection)
+        lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.ensure_future(self._respond(line, writer, lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.wait(tasks)
+        except asyncio.CancelledError:
+            # The daemon stops. Requests, that were received already, are still answered.
+            if tasks:
+                await asyncio.wait(tasks)
+        finally:
+            self._connections.discard(connection)
+            writer.close()
+
+    async def _respond(self, line: bytes, writer: asyncio.StreamWriter, lock: asyncio.Lock):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            response = {"id": request_id, "result": await self._call(request["method"], request.get("params", {}))}
+        except Exception as e:
+            self.errors += 1
+            response = {"id": request_id, "error": _error(e)}
+        async with lock:
+            writer.write(json.dumps(response).encode("utf8") + b"\n")
+            await writer.drain()
+
+    async def _call(self, method: str, params: Dict[str, Any]) -> Any:
+        self.requests += 1
+        loop = asyncio.get_running_loop()
+        file_name = params.get("file_name", "<daemon>")
+        if method == "ping":
+            return "pong"
+        elif method == "parse":
+            return await loop.run_in_executor(self._executor, _parse, params["schema"], file_name)
+        elif method == "check":
+            return await loop.run_in_executor(self._executor, _check, params["schema"], file_name)
+        elif method == "compile":
+            targets = params.get("targets") or available_compilers()
+            for target in targets:
+                get_compiler(target)    # unknown targets fail here
+            return await loop.run_in_executor(self._executor, _compile, params["schema"], targets, file_name)
+        elif method == "stats":
+            return {"requests": self.requests, "errors": self.errors, "pid": os.getpid()}
+        elif method == "shutdown":
+            self._stopped.set()
+            return None
+        raise DaemonError(f"Unknown method '{method}'")
+
+
+class Client:
+    """Synchronous client of the daemon. Errors in the schema are raised as `SchemaError`."""
+
+    def __init__(self, path: Union[str, Path] = None, timeout: float = None):
+        self.path = Path(path) if path else default_socket_path()
+        self._socket = _unix_socket()
+        self._socket.settimeout(timeout)
+        self._socket.connect(str(self.path))
+        self._file = self._socket.makefile("rwb")
+        self._next_id = 0
+
+    def request(self, method: str, **params) -> Any:
+        self._next_id += 1
+        self._file.write(json.dumps({"id": self._next_id, "method": method, "params": params}).encode("utf8") + b"\n")
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise DaemonError("The daemon closed the connection")
+        response = json.loads(line)
+        if "error" in response:
+            raise _to_exception(response["error"])
+        return response["result"]
+
+    def ping(self) -> bool:
+        return self.request("ping") == "pong"
+
+    def parse(self, schema: str, file_name: str = "<daemon>") -> dict:
+        """Checks the schema. Returns the names of its types and communications and its constants."""
+        return self.request("parse", schema=schema, file_name=file_name)
+
+    def check(self, schema: str, file_name: str = "<daemon>") -> List[Diagnostic]:
+        """All errors of the schema."""
+        return [_to_diagnostic(d) for d in self.request("check", schema=schema, file_name=file_name)]
+
+    def compile(self, schema: str, targets: Iterable[str] = None, file_name: str = "<daemon>") -> Dict[str, str]:
+        """Returns the generated code of every target."""
+        return self.request("compile", schema=schema, targets=list(targets or ()), file_name=file_name)
+
+    def stats(self) -> dict:
+        return self.request("stats")
+
+    def shutdown(self):
+        self.request("shutdown")
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _to_diagnostic(d: dict) -> Diagnostic:
+    position = Position(d["line"], d["column"], d["end_line"], d["end_column"])
+    return Diagnostic(ErrorLevel[d["level"]], d["file"], position, d["message"], d["help"], d["formatted"])
+
+
+def _to_exception(error: dict) -> Exception:
+    if error["type"] == "SchemaError":
+        return SchemaError(_to_diagnostic(error))
+    return DaemonError(f"{error['type']}: {error['message']}")
+
+
+def main(argv: Sequence[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="api_schemas-daemon", description="Compiles api schemas in a warm daemon.")
+    parser.add_argument("-s", "--socket", type=Path, default=None,
+                        help=f"Socket of the daemon. Defaults to ${SOCKET_ENV} or {default_socket_path()}")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="Runs the daemon")
+    serve.add_argument("-j", "--jobs", type=int, default=None, help="Number of worker processes")
+    commands.add_parser("stop", help="Stops the daemon")
+    commands.add_parser("ping", help="Checks whether the daemon runs")
+    compile_ = commands.add_parser("compile", help="Compiles a schema with the daemon")
+    compile_.add_argument("schema", type=Path)
+    compile_.add_argument("-t", "--target", default="python", choices=available_compilers())
+    compile_.add_argument("-o", "--out", type=Path, default=None, help="Output file. Defaults to stdout")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        try:
+            Server(args.socket, args.jobs).serve_forever()
+        except DaemonError as e:
+            print(e, file=sys.stderr)
+            return 1
+        return 0
+    try:
+        client = Client(args.socket)
+    except DaemonError as e:
+        print(e, file=sys.stderr)
+        return 1
+    except OSError as e:
+        print(f"The daemon doesn't run: {e}", file=sys.stderr)
+        return 2
+    with client:
+        if args.command == "stop":
+            client.shutdown()
+        elif args.command == "ping":
+            print(client.stats())
+        elif args.command == "compile":
+            try:
+                code = client.compile(args.schema.read_text(encoding="utf8"), [args.target], str(args.schema))
+            except SchemaError as e:
+                print(e, file=sys.stderr)
+                return 1
+            if args.out is None:
+                sys.stdout.write(code[args.target])
+            else:
+                from api_schemas.compilers.output import ChangedFileWriter
+                with ChangedFileWriter(args.out) as out:
+                    out.write(code[args.target])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
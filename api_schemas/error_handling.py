@@ -1,14 +1,27 @@
-import sys
-from dataclasses import dataclass
+import re
+from copy import copy
+from dataclasses import dataclass, field
 from enum import Enum
+from typing import Iterator, List, Optional, TYPE_CHECKING
 
-from lark import UnexpectedToken
+if TYPE_CHECKING:
+    from lark import UnexpectedInput
 
+# File name of errors in schemas, that aren't read from a file
+DEFAULT_FILE_NAME = "<schema>"
 
-def on_syntax_error(x: UnexpectedToken, ctx: 'Context'):
-    ctx.position = Position(x.line, x.column, x.line, x.column)
-    token = x.token.type
-    help_msg = ""
+
+def on_syntax_error(x: 'UnexpectedInput', ctx: 'Context') -> bool:
+    """Reports a syntax error of lark. Returns whether lark should resume parsing, which it does for unexpected
+    characters, when the context collects diagnostics. They are skipped."""
+    line = x.line + ctx.line_offset
+    ctx.position = Position(line, x.column, line, x.column)
+    token = getattr(x, "token", None)
+    if token is None:
+        error(ErrorLevel.ERROR, ctx, f"SyntaxError: unexpected character {x.char!r}")
+        return True
+    token = token.type
+    help_msg = None
     if x.token.type == "_NL":
         token = "\\n"
     elif x.token.type == "_END":
@@ -16,16 +29,20 @@ def on_syntax_error(x: UnexpectedToken, ctx: 'Context'):
         help_msg = "Maybe you are missing a body"
     elif x.token.type == "_BEGIN":
         token = "'Begin of indentation'"
-    _print_error(ErrorLevel.ERROR, ctx, f"SyntaxError: unexpected Token {token}. expected: {x.expected}", help_msg)
-    exit(-1)
+    error(ErrorLevel.ERROR, ctx, f"SyntaxError: unexpected Token {token}. expected: {x.expected}", help_msg)
+    return False
 
 
 def error(lvl: 'ErrorLevel', ctx: 'Context', msg: str, help_msg: str = None):
-    _print_error(lvl, ctx, msg, help_msg)
-    exit(-2)
+    """Raises the error as `SchemaError` or adds it to the diagnostics of the context, when it collects them."""
+    diagnostic = Diagnostic(lvl, ctx.file_name, copy(ctx.position), msg, help_msg,
+                            _format_error(lvl, ctx, msg, help_msg))
+    if ctx.diagnostics is None:
+        raise SchemaError(diagnostic)
+    ctx.diagnostics.add(diagnostic)
 
 
-def _print_error(lvl: 'ErrorLevel', ctx: 'Context', msg: str, help_msg: str):
+def _format_error(lvl: 'ErrorLevel', ctx: 'Context', msg: str, help_msg: str) -> str:
     err_map = {
         ErrorLevel.DEBUG: "DEBUG",
         ErrorLevel.INFO: "INFO",
@@ -39,7 +56,95 @@ def _print_error(lvl: 'ErrorLevel', ctx: 'Context', msg: str, help_msg: str):
     if help_msg:
         msg += f"\n" \
                f"\033[92m ? {help_msg}\033[00m"
-    print(msg, file=sys.stderr)
+    return msg
+
+
+@dataclass
+class Diagnostic:
+    """An error or warning in a schema."""
+    level: 'ErrorLevel'
+    file_name: str
+    position: 'Position'
+    msg: str
+    help_msg: Optional[str] = None
+    formatted: str = ""     # message with the location and the marked line
+
+    def __str__(self):
+        return self.formatted or self.msg
+
+    def to_dict(self) -> dict:
+        """JSON serializable form of the diagnostic."""
+        return {
+            "level": self.level.name,
+            "file": self.file_name,
+            "line": self.position.line_begin,
+            "column": self.position.column_begin,
+            "end_line": self.position.line_end,
+            "end_column": self.position.column_end,
+            "message": self.msg,
+            "help": self.help_msg,
+            "formatted": self.formatted,
+        }
+
+
+class Diagnostics:
+    """Collects all errors and warnings of a parse instead of raising the first error.
+
+    usage:
+    ```python
+    diagnostics = Diagnostics()
+    ir = ParserSession("api.schema", diagnostics=diagnostics).parse(text)
+    for d in diagnostics.errors:
+        print(d)
+    ```
+    """
+
+    def __init__(self):
+        self.items: List[Diagnostic] = []
+
+    def add(self, diagnostic: Diagnostic):
+        self.items.append(diagnostic)
+
+    @property
+    def errors(self) -> List[Diagnostic]:
+        return [d for d in self.items if d.level == ErrorLevel.ERROR]
+
+    @property
+    def warnings(self) -> List[Diagnostic]:
+        return [d for d in self.items if d.level == ErrorLevel.WARNING]
+
+    def __iter__(self) -> Iterator[Diagnostic]:
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __str__(self):
+        return "\n".join(str(d) for d in self.items)
+
+
+class SchemaError(Exception):
+    """An error in a schema. Raised instead of exiting the process, so callers can report it and go on.
+
+    `str(err)` is the message with the location and the marked line.
+    """
+
+    def __init__(self, diagnostic: Diagnostic):
+        super().__init__(str(diagnostic))
+        self.diagnostic = diagnostic
+        self.level = diagnostic.level
+        self.file_name = diagnostic.file_name
+        self.position = diagnostic.position
+        self.msg = diagnostic.msg
+        self.help_msg = diagnostic.help_msg
+
+    def to_dict(self) -> dict:
+        """JSON serializable form of the error."""
+        return self.diagnostic.to_dict()
+
+    def __reduce__(self):
+        # pickled when it is returned from a worker process
+        return SchemaError, (self.diagnostic,)
 
 
 class ErrorLevel(Enum):
@@ -49,14 +154,26 @@ class ErrorLevel(Enum):
     ERROR = 3
 
 
+_NEWLINE = re.compile("\n")
+
+
 @dataclass
 class Context:
     file_name: str
     file_content: str
     position: 'Position'
+    line_offset: int = 0    # lines of the file before file_content, when only a part of the file is parsed
+    diagnostics: Optional[Diagnostics] = None   # collects the errors instead of raising them
+    _line_starts: Optional[List[int]] = field(default=None, init=False, repr=False, compare=False)
 
     def get_line(self, i: int):
-        return self.file_content.split("\n")[i - 1].replace("\t", " ")     # line 1 is first line   # TODO: handle \t
+        """Line i of the file. Line 1 is first line. The offsets of all lines are computed once per context."""
+        if self._line_starts is None:
+            self._line_starts = [0] + [m.end() for m in _NEWLINE.finditer(self.file_content)]
+        i = i - 1 - self.line_offset
+        begin = self._line_starts[i]
+        end = self._line_starts[i + 1] - 1 if i + 1 < len(self._line_starts) else len(self.file_content)
+        return self.file_content[begin:end].replace("\t", " ")    # TODO: handle \t
 
     def with_pos(self, pos: 'Position') -> 'Context':
         self.position = pos
@@ -0,0 +1,346 @@
+"""Parser, that builds the IR directly from the lines of a schema. Used by `parse(text, backend="fast")`.
+
+Every construct of the grammar fits on one line and blocks are indented, so the parser matches a line at a time with
+a regex and keeps the open blocks on a stack. There is no token stream, no parse tree and no recursion.
+
+The parser only accepts schemas, that the lark parser accepts with the same IR. It returns None for everything else,
+e.g. syntax errors or identifiers, that the lark lexer splits into keywords. They are parsed again by lark, so errors
+are reported at the same positions as with the lark backend.
+"""
+import re
+import sys
+from typing import Callable, List, Optional, Tuple, TYPE_CHECKING
+
+from .error_handling import Position
+from .intermediate_representation import *
+
+if TYPE_CHECKING:
+    from .parser import ParserSession
+
+__all__ = ["parse_fast"]
+
+_IDENTIFIER = r"[a-zA-Z][-a-zA-Z0-9_]*"
+_CONSTANT = re.compile(rf"({_IDENTIFIER})[ \t]*=[ \t]*([^ \t#\r].*)\Z")
+_TYPEDEF = re.compile(rf"typedef[ \t]+({_IDENTIFIER})[ \t]*")
+_IMPORT = re.compile(rf"import[ \t]+({_IDENTIFIER}(?:\.{_IDENTIFIER})*)\Z")
+_ATTRIBUTE = re.compile(rf"(\?)?[ \t]*(?:({_IDENTIFIER})|(\*))?[ \t]*(\[\])?[ \t]*:[ \t]*")
+_REFERENCE = re.compile(rf"\$[ \t]*({_IDENTIFIER})\Z")
+_ENUM = re.compile(rf"({_IDENTIFIER})[ \t]*{{[ \t]*({_IDENTIFIER}(?:[ \t]*,[ \t]*{_IDENTIFIER})*)[ \t]*}}\Z")
+_ENUM_SEPARATOR = re.compile(r"[ \t]*,[ \t]*")
+_NAME = re.compile(rf"({_IDENTIFIER})\Z")
+_METHOD = re.compile(r"(?:GET|HEAD|POST|PUT|DELETE|CONNECT|OPTIONS|TRACE|PATCH)\Z", re.IGNORECASE)
+_STATUS_CODE = re.compile(r"[0-9]+\Z")
+
+_PRIMITIVES = {"str": Primitive.Str, "int": Primitive.Int, "float": Primitive.Float, "bool": Primitive.Bool,
+               "any": Primitive.Any}
+_PRIMITIVE_NAMES = tuple(_PRIMITIVES)
+# Keywords, that lark lexes at the start of a line in place of an identifier, that starts with them
+_KEYWORDS = ("typedef", "Websocket", "WS")
+_HTTP_METHODS = ("get", "head", "post", "put", "delete", "connect", "options", "trace", "patch")
+
+# What the lines of a block are
+_FILE, _BODY, _CONSTANTS, _COMMUNICATION, _REQUEST, _RESPONSES, _WS, _WS_EVENTS = range(8)
+
+
+class _Fallback(Exception):
+    """The schema has to be parsed by lark."""
+
+
+class _Block:
+    """A line, that can have an indented block, e.g. an object attribute and its body. Its node is built, when the
+    block ends."""
+    __slots__ = ("kind", "required", "build", "items", "level")
+
+    def __init__(self, kind: Optional[int], required: bool, build: Callable[[list], object]):
+        self.kind = kind            # of the lines in the block
+        self.required = required   # the line must have a block
+        self.build = build
+        self.items = []             # nodes of the lines in the block
+        self.level = 0              # indentation of the block
+
+    def finish(self):
+        if self.required and not self.items:
+            raise _Fallback
+        return self.build(self.items)
+
+
+def parse_fast(text: str, session: 'ParserSession') -> Optional[File]:
+    """Parses the schema. Returns None, when the schema has to be parsed by lark instead.
+
+    The typedefs and the references are added to the session, when the schema is parsed.
+    """
+    parser = _Parser(session.line_offset)
+    try:
+        file = parser.parse(text)
+    except _Fallback:
+        return None
+    session.references.extend(parser.references)
+    session.imports.extend(parser.imports)
+    for typedef in parser.typedefs:
+        session.sym_table[typedef.name] = typedef
+    return file
+
+
+class _Parser:
+
+    def __init__(self, line_offset: int):
+        self.line_offset = line_offset
+        self.typedefs: List[Typedef] = []
+        self.references: List[Tuple[ReferenceType, Position]] = []
+        self.imports: List[Tuple[str, Position]] = []
+        self.after_constant = False     # the previous line is a constant
+
+    def parse(self, text: str) -> File:
+        handlers = {_FILE: self._file_line, _BODY: self._body_line, _CONSTANTS: self._constants_line,
+                    _COMMUNICATION: self._communication_line, _REQUEST: self._request_line,
+                    _RESPONSES: self._responses_line, _WS: self._ws_line, _WS_EVENTS: self._ws_events_line}
+        root = _Block(_FILE, False, _file)
+        stack = [root]
+        pending: Optional[_Block] = None     # the previous line, when it can have a block
+        for number, line in enumerate(text.split("\n"), 1):
+            content = line.lstrip(" \t")
+            if not content:
+                continue    # blank lines don't change the indentation
+            indentation = len(line) - len(content)
+            is_comment = content[0] == "#"
+            if is_comment and indentation:
+                raise _Fallback     # lark sees an empty line inside the block
+            # same indentation levels as the GrammarIndenter
+            level = indentation + 3 * line.count("\t", 0, indentation)
+            if level > stack[-1].level:
+                if pending is None or pending.kind is None:
+                    raise _Fallback
+                pending.level = level
+                stack.append(pending)
+            else:
+                if pending is not None:
+                    stack[-1].items.append(pending.finish())
+                while level < stack[-1].level:
+                    block = stack.pop()
+                    stack[-1].items.append(block.finish())
+                if level != stack[-1].level:
+                    raise _Fallback
+            pending = None
+            if is_comment:
+                continue
+            constant = _CONSTANT.match(content)
+            pending = handlers[stack[-1].kind](stack[-1], content, constant, indentation, number)
+            self.after_constant = constant is not None
+        if pending is not None:
+            stack[-1].items.append(pending.finish())
+        while len(stack) > 1:
+            block = stack.pop()
+            stack[-1].items.append(block.finish())
+        return root.finish()
+
+    def _file_line(self, block: _Block, content: str, constant, indentation: int, number: int) -> Optional[_Block]:
+        if constant:
+            return self._constant(block, constant)
+        code = _code(content)
+        if code.startswith("typedef"):
+            return self._typedef(block, code, indentation, number)
+        if code == "WS" or code == "Websocket":
+            return _Block(_WS, True, _ws_events)
+        if code.startswith("import") and code[6:7] in (" ", "\t"):
+            m = _IMPORT.match(code)
+            if m is None:
+                raise _Fallback
+            line = number + self.line_offset
+            column = indentation + m.start(1) + 1
+            self.imports.append((m.group(1), Position(line, column, line, column + len(m.group(1)))))
+            return None
+        m = _NAME.match(code)
+        if m is None or _keyword_prefix(code, self.after_constant):
+            raise _Fallback
+        name = sys.intern(code)
+        return _Block(_COMMUNICATION, True, lambda items: _communication(name, items))
+
+    def _typedef(self, block: _Block, code: str, indentation: int, number: int) -> Optional[_Block]:
+        m = _TYPEDEF.match(code)
+        if m is None:
+            raise _Fallback
+        name = sys.intern(m.group(1))
+        start = m.end()
+        if start == len(code):
+            return _Block(_BODY, True, lambda items: self._define(Typedef(name, _object(name, items))))
+        if code[start] == "$":
+            ref = self._reference(_REFERENCE.match(code, start), indentation, number)
+            block.items.append(self._define(Typedef(name, ref)))
+            return None
+        if code[start] == "{":
+            enum = self._enum(_ENUM.match(code, m.start(1)))
+            block.items.append(self._define(Typedef(enum.name, enum)))
+            return None
+        primitive = _PRIMITIVES.get(code[start:])
+        if primitive is None:
+            raise _Fallback
+        return _Block(_CONSTANTS, False,
+                      lambda items: self._define(Typedef(name, PrimitiveType(primitive, tuple(items)))))
+
+    def _body_line(self, block: _Block, content: str, constant, indentation: int, number: int) -> Optional[_Block]:
+        if constant:
+            return self._constant(block, constant)
+        code = _code(content)
+        m = _ATTRIBUTE.match(code)
+        if m is None:
+            raise _Fallback
+        optional, name, wildcard, array = m.groups()
+        is_optional = optional is not None
+        is_array = array is not None
+        is_wildcard = wildcard is not None
+        if is_wildcard:
+            name = "*"
+        elif name is not None:
+            if not is_optional and _keyword_prefix(name, self.after_constant):
+                raise _Fallback
+            name = sys.intern(name)
+        elif is_array:
+            name = ""   # json is an array
+        else:
+            raise _Fallback
+        start = m.end()
+        if start == len(code):
+            raise _Fallback
+        if code[start] == "$":
+            ref = self._reference(_REFERENCE.match(code, start), indentation, number)
+            block.items.append(TypeAttribute(name, ref, is_optional, is_array, is_wildcard))
+            return None
+        enum = _ENUM.match(code, start)
+        if enum is not None:
+            block.items.append(TypeAttribute(name, self._enum(enum), is_optional, is_array, is_wildcard))
+            return None
+        m = _NAME.match(code, start)
+        if m is None:
+            raise _Fallback
+        type_name = m.group(1)
+        primitive = _PRIMITIVES.get(type_name)
+        if primitive is not None:
+            return _Block(_CONSTANTS, False, lambda items: TypeAttribute(
+                name, PrimitiveType(primitive, tuple(items)), is_optional, is_array, is_wildcard))
+        if type_name.startswith(_PRIMITIVE_NAMES):
+            raise _Fallback     # lexed as primitive and identifier
+        type_name = sys.intern(type_name)
+        return _Block(_BODY, True, lambda items: TypeAttribute(
+            name, _object(type_name, items), is_optional, is_array, is_wildcard))
+
+    def _constants_line(self, block: _Block, content: str, constant, indentation: int, number: int) -> None:
+        if not constant:
+            raise _Fallback
+        return self._constant(block, constant)
+
+    def _communication_line(self, block: _Block, content: str, constant, indentation: int, number: int) -> _Block:
+        if constant:
+            return self._constant(block, constant)
+        method = _code(content)
+        if _METHOD.match(method) is None:
+            raise _Fallback
+        return _Block(_REQUEST, True, lambda items: _request(method, items))
+
+    def _request_line(self, block: _Block, content: str, constant, indentation: int, number: int) -> _Block:
+        code = _code(content)
+        if code == "->" and not block.items:
+            return _Block(_BODY, False, lambda items: tuple(items))
+        if code == "<-" and len(block.items) == 1:
+            return _Block(_RESPONSES, True, lambda items: tuple(items))
+        raise _Fallback
+
+    def _responses_line(self, block: _Block, content: str, constant, indentation: int, number: int) -> _Block:
+        code = _code(content)
+        if _STATUS_CODE.match(code) is None:
+            raise _Fallback
+        status = int(code)
+        return _Block(_BODY, False, lambda items: Response(status, tuple(items)))
+
+    def _ws_line(self, block: _Block, content: str, constant, indentation: int, number: int) -> _Block:
+        code = _code(content)
+        if (code == "->" and not block.items) or (code == "<-" and len(block.items) == 1):
+            return _Block(_WS_EVENTS, False, lambda items: tuple(items))
+        raise _Fallback
+
+    def _ws_events_line(self, block: _Block, content: str, constant, indentation: int, number: int) -> _Block:
+        code = _code(content)
+        if _NAME.match(code) is None or _keyword_prefix(code, self.after_constant):
+            raise _Fallback
+        name = sys.intern(code)
+        return _Block(_BODY, True, lambda items: WSEvent(name, tuple(items)))
+
+    def _constant(self, block: _Block, m) -> None:
+        name = m.group(1)
+        if block.kind in (_REQUEST, _RESPONSES, _WS, _WS_EVENTS) or \
+                _keyword_prefix(name, self.after_constant or block.kind == _COMMUNICATION):
+            raise _Fallback
+        if block.kind != _FILE and block.items and type(block.items[-1]) is not Constant:
+            raise _Fallback     # constants come first
+        block.items.append(Constant(sys.intern(name), m.group(2)))
+        return None
+
+    def _reference(self, m, indentation: int, number: int) -> ReferenceType:
+        if m is None:
+            raise _Fallback
+        name = m.group(1)
+        line = number + self.line_offset
+        column = indentation + m.start(1) + 1
+        ref = ReferenceType(sys.intern(name))
+        self.references.append((ref, Position(line, column, line, column + len(name))))
+        return ref
+
+    @staticmethod
+    def _enum(m) -> EnumType:
+        if m is None or m.group(1).startswith(_PRIMITIVE_NAMES):
+            raise _Fallback
+        values = tuple(sys.intern(v) for v in _ENUM_SEPARATOR.split(m.group(2)))
+        return EnumType(sys.intern(m.group(1)), values)
+
+    def _define(self, typedef: Typedef) -> Typedef:
+        self.typedefs.append(typedef)
+        return typedef
+
+
+def _code(content: str) -> str:
+    """The line without its comment and the trailing whitespace."""
+    i = content.find("#")
+    if i >= 0:
+        content = content[:i]
+    elif content[-1] == "\r":
+        content = content[:-1]
+    return content.rstrip(" \t")
+
+
+def _keyword_prefix(name: str, after_constant: bool) -> bool:
+    """Whether lark lexes the start of the identifier at the start of a line as keyword. HTTP methods are only lexed
+    after a constant or in a communication."""
+    return name.startswith(_KEYWORDS) or (after_constant and name.lower().startswith(_HTTP_METHODS))
+
+
+def _object(name: str, items: list) -> ObjectType:
+    i = 0
+    while i < len(items) and type(items[i]) is Constant:
+        i += 1
+    return ObjectType(name, tuple(items[:i]), tuple(items[i:]))
+
+
+def _communication(name: str, items: list) -> Communication:
+    constants = tuple(c for c in items if type(c) is Constant)
+    requests = tuple(r for r in items if type(r) is Request)
+    if not requests:
+        raise _Fallback
+    return Communication(name, constants, requests)
+
+
+def _request(method: str, items: list) -> Request:
+    if len(items) != 2:
+        raise _Fallback
+    return Request(method, items[0], items[1])
+
+
+def _ws_events(items: list) -> WSEvents:
+    if len(items) != 2:
+        raise _Fallback
+    return WSEvents(items[0], items[1])
+
+
+def _file(items: list) -> File:
+    return File(tuple(c for c in items if type(c) is Communication),
+                tuple(t for t in items if type(t) is Typedef),
+                tuple(c for c in items if type(c) is Constant),
+                next((e for e in reversed(items) if type(e) is WSEvents), None))
@@ -0,0 +1,228 @@
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple, Union
+
+from .blocks import ParsedBlock, split_blocks, parse_block, link_blocks, shift_position
+from .error_handling import Context, SchemaError, DEFAULT_FILE_NAME
+from .intermediate_representation import File
+from .parser import link, reject_imports
+from .prelude import DEFAULT_PRELUDE, Prelude, resolve_prelude, symbols
+
+__all__ = ["IncrementalParser"]
+
+
+class IncrementalParser:
+    """Parser for a schema that is edited over time, e.g. in watch mode or in an editor.
+
+    Only the top level blocks that changed since the previous parse are parsed again. All other blocks reuse their
+    IR nodes and only the references to types that changed are linked again. The returned `File` shares these nodes
+    with the previous one, so the previous one must not be used anymore after an update.
+
+    usage:
+    ```python
+    parser = IncrementalParser()
+    ir = parser.parse(text)
+    ir = parser.parse(new_text)
+    ir = parser.edit(10, 12, "str")
+    ```
+    """
+
+    def __init__(self, file_name: str = DEFAULT_FILE_NAME, prelude: Union[str, Prelude, None] = DEFAULT_PRELUDE):
+        self.file_name = file_name
+        self.prelude = resolve_prelude(prelude)
+        self.text = ""
+        self.file: Optional[File] = None
+        self.reparsed_blocks = 0    # blocks parsed by the last update
+        # One entry per top level block
+        self._texts: List[str] = []
+        self._offsets: List[int] = []
+        self._lines: List[int] = []
+        self._parsed: List[ParsedBlock] = []
+        # Number of communications, typedefs and constants in front of every block and the end
+        self._counts: Tuple[List[int], List[int], List[int]] = ([0], [0], [0])
+        self._position: Dict[int, int] = {}    # id(parsed block) -> index
+        self._defs: Dict[str, List[ParsedBlock]] = defaultdict(list)
+        self._uses: Dict[str, List[Tuple[ParsedBlock, int]]] = defaultdict(list)  # block and index of reference
+
+    def parse(self, text: str) -> File:
+        """Parses the new text of the schema and returns its IR."""
+        if not text.endswith("\n"):
+            text += "\n"
+        if self.file is None:
+            return self._parse_all(text)
+        n = len(self._texts)
+        a = 0
+        while a < n and text.startswith(self._texts[a], self._offsets[a]):
+            a += 1
+        # The last equal block may be continued in the new text
+        a = max(a - 1, 0)
+        b = n
+        delta = len(text) - len(self.text)
+        while b - 1 > a:
+            offset = self._offsets[b - 1] + delta
+            if offset < self._offsets[a] or text[offset - 1] != "\n" \
+                    or not text.startswith(self._texts[b - 1], offset):
+                break
+            b -= 1
+        return self._update(text, a, b)
+
+    def edit(self, start: int, end: int, replacement: str) -> File:
+        """Replaces the characters `start` to `end` of the current text and returns the new IR."""
+        text = self.text[:start] + replacement + self.text[end:]
+        if self.file is None or not text.endswith("\n"):
+            return self.parse(text)
+        # Changing the first character of a block may join it with the block in front of it
+        a = max(bisect_right(self._offsets, start) - 2, 0)
+        b = bisect_right(self._offsets, end)
+        return self._update(text, a, b)
+
+    def _parse_all(self, text: str) -> File:
+        blocks = split_blocks(text)
+        parsed = [parse_block(block, self.file_name) for block in blocks]
+        self.file = link_blocks(parsed, text, self.file_name, prelude=self.prelude)
+        self.text = text
+        self.reparsed_blocks = len(blocks)
+        self._texts = [b.text for b in blocks]
+        self._offsets = []
+        offset = 0
+        for t in self._texts:
+            self._offsets.append(offset)
+            offset += len(t)
+        self._lines = [b.line for b in blocks]
+        self._parsed = parsed
+        self._counts = _cumulative_counts(parsed, (0, 0, 0))
+        self._position = {id(p): i for i, p in enumerate(parsed)}
+        self._defs.clear()
+        self._uses.clear()
+        self._register(parsed)
+        return self.file
+
+    def _update(self, text: str, a: int, b: int) -> File:
+        """Parses the blocks a to b (exclusive) of the previous text again. All blocks before and after them are
+        unchanged."""
+        n = len(self._texts)
+        delta = len(text) - len(self.text)
+        begin = self._offsets[a] if a < n else len(self.text)
+        end = self._offsets[b] + delta if b < n else len(text)
+        region_text = text[begin:end]
+        first_line = self._lines[a] if a < n else self._lines[-1] + self._texts[-1].count("\n")
+        old_blocks: Dict[str, List[ParsedBlock]] = defaultdict(list)
+        for t, p in zip(self._texts[a:b], self._parsed[a:b]):
+            old_blocks[t].append(p)
+        blocks = split_blocks(region_text)
+        parsed = []
+        new = []
+        for block in blocks:
+            block.line += first_line - 1
+            candidates = old_blocks.get(block.text)
+            if candidates:
+                parsed.append(candidates.pop(0))
+            else:
+                p = parse_block(block, self.file_name)
+                if p.error:
+                    self.file = None
+                    return link_blocks([p], text, self.file_name, prelude=self.prelude)   # reports the syntax error
+                parsed.append(p)
+                new.append(p)
+        removed = [p for candidates in old_blocks.values() for p in candidates]
+        line_delta = region_text.count("\n") - sum(t.count("\n") for t in self._texts[a:b])
+
+        # update the block lists
+        offsets = []
+        offset = begin
+        for block in blocks:
+            offsets.append(offset)
+            offset += len(block.text)
+        self._texts[a:b] = [block.text for block in blocks]
+        self._offsets[a:] = offsets + [o + delta for o in self._offsets[b:]]
+        self._lines[a:] = [block.line for block in blocks] + [line + line_delta for line in self._lines[b:]]
+        old_region = self._parsed[a:b]
+        self._parsed[a:b] = parsed
+        for p in old_region:
+            del self._position[id(p)]
+        if len(parsed) == b - a:
+            for i, p in enumerate(parsed):
+                self._position[id(p)] = a + i
+        else:
+            for i in range(a, len(self._parsed)):
+                self._position[id(self._parsed[i])] = i
+        self._unregister(removed)
+        self._register(new)
+
+        try:
+            self._reject_imports(text)
+            self._relink(text, a, a + len(parsed), old_region + new)
+        except SchemaError:
+            self.file = None    # references are partially linked, start over the next time
+            raise
+
+        old_counts = self._counts
+        region_counts = _cumulative_counts(parsed, tuple(c[a] for c in old_counts))
+        file_lists = []
+        counts = []
+        for old_list, old_count, region_count, old_part in zip(
+                (self.file.communications, self.file.global_types, self.file.constants),
+                old_counts, region_counts, ("communications", "global_types", "constants")):
+            region = tuple(x for p in parsed for x in getattr(p.file, old_part))
+            file_lists.append(old_list[:old_count[a]] + region + old_list[old_count[b]:])
+            count_delta = region_count[-1] - old_count[b]
+            counts.append(old_count[:a] + region_count + [c + count_delta for c in old_count[b + 1:]])
+        self._counts = tuple(counts)
+        ws_events = self.file.ws_events
+        if any(p.file.ws_events is not None for p in old_region + parsed):
+            ws_events = next((p.file.ws_events for p in reversed(self._parsed) if p.file.ws_events is not None),
+                             None)
+        self.file = File(*file_lists, ws_events)
+        self.text = text
+        self.reparsed_blocks = len(new)
+        return self.file
+
+    def _relink(self, text: str, a: int, b: int, changed: List[ParsedBlock]):
+        """Links the references of the blocks a to b and all references to types defined in changed blocks."""
+        names = {t.name for p in changed for t in p.file.global_types}
+        uses = [(self._position[id(p)], i, p) for name in names for p, i in self._uses[name]]
+        uses.extend((pos, i, self._parsed[pos]) for pos in range(a, b)
+                    for i in range(len(self._parsed[pos].references)))
+        references = []
+        for (pos, i), p in sorted({(pos, i): p for pos, i, p in uses}.items()):
+            ref, position = p.references[i]
+            references.append((ref, shift_position(position, self._lines[pos] - p.line)))
+        sym_table = {}
+        for ref, _ in references:
+            if ref.name not in sym_table and self._defs.get(ref.name):
+                d = max(self._defs[ref.name], key=lambda d: self._position[id(d)])
+                sym_table[ref.name] = [t for t in d.file.global_types if t.name == ref.name][-1]
+        sym_table = symbols(sym_table, self.prelude)
+        if any(ref.name not in sym_table for ref, _ in references):
+            # a name is not defined, report it with all names
+            sym_table = symbols({t.name: t for p in self._parsed for t in p.file.global_types}, self.prelude)
+        link(references, sym_table, Context(self.file_name, text, None))
+
+    def _reject_imports(self, text: str):
+        for line, p in zip(self._lines, self._parsed):
+            if p.imports:
+                name, position = p.imports[0]
+                reject_imports([(name, shift_position(position, line - p.line))], Context(self.file_name, text, None))
+
+    def _register(self, parsed: List[ParsedBlock]):
+        for p in parsed:
+            for t in p.file.global_types:
+                self._defs[t.name].append(p)
+            for i, (ref, _) in enumerate(p.references):
+                self._uses[ref.name].append((p, i))
+
+    def _unregister(self, parsed: List[ParsedBlock]):
+        for p in parsed:
+            for t in p.file.global_types:
+                self._defs[t.name] = [d for d in self._defs[t.name] if d is not p]
+            for ref, _ in p.references:
+                self._uses[ref.name] = [u for u in self._uses[ref.name] if u[0] is not p]
+
+
+def _cumulative_counts(parsed: List[ParsedBlock], start: Tuple[int, int, int]) \
+        -> Tuple[List[int], List[int], List[int]]:
+    counts = tuple([c] for c in start)
+    for p in parsed:
+        for count, part in zip(counts, (p.file.communications, p.file.global_types, p.file.constants)):
+            count.append(count[-1] + len(part))
+    return counts
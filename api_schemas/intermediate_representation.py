@@ -1,10 +1,49 @@
 import re
-from dataclasses import dataclass, field
-from typing import List, Union
+from dataclasses import dataclass, field, fields
+from typing import List, Tuple, Union, Optional
 from enum import Enum
 
 __all__ = ["ObjectType", "EnumType", "File", "TypeAttribute", "Communication", "Constant", "Request",
-           "Response", "Type", "Typedef", "PrimitiveType", "Primitive", "WSEvent", "WSEvents"]
+           "Response", "Type", "Typedef", "PrimitiveType", "Primitive", "WSEvent", "WSEvents", "ReferenceType",
+           "resolve_type"]
+
+
+def node(cls=None, *, frozen: bool = True):
+    """`dataclass` with `__slots__` and without a per instance `__dict__`. IR nodes are immutable by default.
+
+    Same as `dataclass(frozen=frozen, slots=True)` of python 3.10, which can't be used here yet.
+    """
+    def wrap(cls):
+        cls = dataclass(cls, frozen=frozen)
+        names = tuple(f.name for f in fields(cls))
+        cls_dict = dict(cls.__dict__)
+        for name in names:
+            cls_dict.pop(name, None)    # defaults are part of __init__
+        cls_dict.pop("__dict__", None)
+        cls_dict.pop("__weakref__", None)
+        cls_dict["__slots__"] = names
+        cls_dict["__getstate__"] = _getstate
+        cls_dict["__setstate__"] = _setstate
+        slotted = type(cls)(cls.__name__, cls.__bases__, cls_dict)
+        slotted.__qualname__ = cls.__qualname__
+        for fn in cls_dict.values():
+            # the generated __setattr__ of frozen classes refers to the class
+            for cell in getattr(fn, "__closure__", None) or ():
+                if cell.cell_contents is cls:
+                    cell.cell_contents = slotted
+        return slotted
+
+    return wrap if cls is None else wrap(cls)
+
+
+def _getstate(self):
+    return tuple(getattr(self, name) for name in self.__slots__)
+
+
+def _setstate(self, state):
+    # frozen nodes can't use setattr, when they are unpickled
+    for name, value in zip(self.__slots__, state):
+        object.__setattr__(self, name, value)
 
 
 class Primitive(Enum):
@@ -15,38 +54,55 @@ class Primitive(Enum):
     Any = 4
 
 
-@dataclass
+@node
 class PrimitiveType:
     primitive: Primitive
-    constants: List["Constant"] = field(default_factory=list)
+    constants: Tuple["Constant", ...] = ()
 
     def constants_dicts(self):
         return {c.name: c.value for c in self.constants}
 
 
-@dataclass
+@node
 class ObjectType:
     name: str
-    values: List["Constant"]
-    attributes: List["TypeAttribute"]
+    values: Tuple["Constant", ...]
+    attributes: Tuple["TypeAttribute", ...]
 
 
-@dataclass
+@node
 class EnumType:
     name: str
-    values: List[str]
+    values: Tuple[str, ...]
 
 
-Type = Union[PrimitiveType, ObjectType, EnumType]
+@node(frozen=False)
+class ReferenceType:
+    """A `$Name` reference to a global type. All references to a type share its `Typedef`.
+
+    The only mutable node: references are linked after all typedefs are parsed.
+    """
+    name: str
+    typedef: Optional["Typedef"] = field(default=None, repr=False, compare=False)    # set when linked
+
+    def __hash__(self):
+        return hash(self.name)
+
+    def resolve(self) -> "Type":
+        """Returns the referenced type. References to aliases are followed."""
+        return resolve_type(self)
 
 
-@dataclass
+Type = Union[PrimitiveType, ObjectType, EnumType, ReferenceType]
+
+
+@node
 class Typedef:
     name: str
     type: Type
 
 
-@dataclass
+@node
 class TypeAttribute:
     name: str
     type: Type
@@ -55,50 +111,57 @@ class TypeAttribute:
     is_wildcard: bool = False
 
 
-@dataclass
+@node
 class Response:
     code: int
-    attributes: List[TypeAttribute]
+    attributes: Tuple[TypeAttribute, ...]
 
 
-@dataclass
+@node
 class Request:
     method: str
-    parameters: List[TypeAttribute]
-    responses: List[Response]
+    parameters: Tuple[TypeAttribute, ...]
+    responses: Tuple[Response, ...]
 
 
-@dataclass
+@node
 class Communication:
     name: str
-    values: List["Constant"]
-    requests: List[Request]
+    values: Tuple["Constant", ...]
+    requests: Tuple[Request, ...]
 
 
-@dataclass
+@node
 class Constant:
     name: str
     value: str  # For now only string constants
 
 
-@dataclass
+@node
 class File:
-    communications: List[Communication]
-    global_types: List[Typedef]
-    constants: List[Constant]
-    ws_events: 'WSEvents'
+    communications: Tuple[Communication, ...]
+    global_types: Tuple[Typedef, ...]
+    constants: Tuple[Constant, ...]
+    ws_events: Optional['WSEvents']
 
 
-@dataclass
+@node
 class WSEvents:
-    client: List['WSEvent']
-    server: List['WSEvent']
+    client: Tuple['WSEvent', ...]
+    server: Tuple['WSEvent', ...]
 
 
-@dataclass
+@node
 class WSEvent:
     name: str
-    data: List[TypeAttribute]
+    data: Tuple[TypeAttribute, ...]
+
+
+def resolve_type(t: Type) -> Type:
+    """Returns the type itself or the type a reference points to."""
+    while type(t) is ReferenceType:
+        t = t.typedef.type
+    return t
 
 
 def url_params_from_uri(uri: str) -> List[str]:
@@ -0,0 +1,130 @@
+from typing import Any, Dict, Tuple
+
+from .intermediate_representation import *
+from .profiling import phase
+
+__all__ = ["Interner", "intern_types"]
+
+
+class Interner:
+    """Hash-consing of IR nodes.
+
+    Structurally equal `ObjectType`, `EnumType`, `PrimitiveType`, `TypeAttribute` and `Constant` nodes are replaced
+    by one shared instance. E.g. the `err_msg: str` attribute of every error response becomes a single node.
+    An interner can be used for several files, to share the nodes between them.
+
+    Nodes are compared by their name, their values and the identity of their (already interned) children. Global
+    types are not followed, every file links its references to its own typedefs.
+    """
+
+    def __init__(self):
+        self._table: Dict[tuple, Any] = {}
+        self.nodes = 0      # nodes passed to the interner
+        self.shared = 0     # nodes replaced by an equal node
+
+    def intern_file(self, file: File) -> File:
+        """Returns a copy of the file, with all equal nodes shared. The file itself is not changed."""
+        memo: Dict[int, Any] = {}
+        references: Dict[str, ReferenceType] = {}
+        old_references: Dict[str, ReferenceType] = {}
+
+        def interned(node):
+            return memo[id(node)]
+
+        def intern(root):
+            # post-order with an explicit stack, deeply nested types don't hit the recursion limit
+            stack = [(root, False)]
+            while stack:
+                node, children_done = stack.pop()
+                if id(node) in memo:
+                    continue
+                if children_done:
+                    memo[id(node)] = self._intern(node, interned, references, old_references)
+                else:
+                    stack.append((node, True))
+                    stack.extend((child, False) for child in _children(node))
+            return memo[id(root)]
+
+        typedefs = tuple(Typedef(t.name, intern(t.type)) for t in file.global_types)
+        communications = tuple(
+            Communication(c.name, _map(intern, c.values), tuple(
+                Request(r.method, _map(intern, r.parameters),
+                        tuple(Response(res.code, _map(intern, res.attributes)) for res in r.responses))
+                for r in c.requests))
+            for c in file.communications)
+        constants = _map(intern, file.constants)
+        ws_events = None
+        if file.ws_events is not None:
+            ws_events = WSEvents(*[tuple(WSEvent(e.name, _map(intern, e.data)) for e in events)
+                                   for events in (file.ws_events.client, file.ws_events.server)])
+        by_name = {t.name: t for t in typedefs}
+        for name, ref in references.items():
+            ref.typedef = by_name.get(name, old_references[name].typedef)
+        return File(communications, typedefs, constants, ws_events)
+
+    def _intern(self, node, intern, references: Dict[str, ReferenceType], old_references: Dict[str, ReferenceType]):
+        t = type(node)
+        if t is ReferenceType:
+            # references are leaves, they are shared per file
+            if node.name not in references:
+                references[node.name] = ReferenceType(node.name)
+                old_references[node.name] = node
+            return references[node.name]
+        if t is Constant:
+            key = (t, node.name, node.value)
+            args = (node.name, node.value)
+        elif t is PrimitiveType:
+            constants = _map(intern, node.constants)
+            key = (t, node.primitive, _ids(constants))
+            args = (node.primitive, constants)
+        elif t is EnumType:
+            key = (t, node.name, node.values)
+            args = (node.name, node.values)
+        elif t is ObjectType:
+            values = _map(intern, node.values)
+            attributes = _map(intern, node.attributes)
+            key = (t, node.name, _ids(values), _ids(attributes))
+            args = (node.name, values, attributes)
+        elif t is TypeAttribute:
+            attribute_type = intern(node.type)
+            key = (t, node.name, id(attribute_type), node.is_optional, node.is_array, node.is_wildcard)
+            args = (node.name, attribute_type, node.is_optional, node.is_array, node.is_wildcard)
+        else:
+            raise ValueError(f"Unknown type: {t}")
+        self.nodes += 1
+        shared = self._table.get(key)
+        if shared is not None:
+            self.shared += 1
+            return shared
+        new = t(*args)
+        self._table[key] = new
+        return new
+
+
+def intern_types(file: File, interner: Interner = None) -> File:
+    """Returns a copy of the file, where all structurally equal types and attributes are shared.
+    See `Interner`."""
+    if interner is None:
+        interner = Interner()
+    with phase("intern"):
+        return interner.intern_file(file)
+
+
+def _children(node) -> Tuple[Any, ...]:
+    """The nodes, that `Interner._intern` interns before the node itself."""
+    t = type(node)
+    if t is ObjectType:
+        return node.values + node.attributes
+    if t is TypeAttribute:
+        return node.type,
+    if t is PrimitiveType:
+        return node.constants
+    return ()
+
+
+def _ids(nodes: Tuple[Any, ...]) -> tuple:
+    return tuple(id(n) for n in nodes)
+
+
+def _map(fn, nodes: Tuple[Any, ...]) -> tuple:
+    return tuple(fn(n) for n in nodes)
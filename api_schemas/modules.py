@@ -0,0 +1,276 @@
+"""Schemas, that are split over several files. A schema imports the typedefs of other schemas by their module name:
+```
+import common.money     # common/money.schema
+
+typedef Order
+    total: $Money
+```
+Modules are searched in the directory of the importing schema first and then in the search path. Every module is
+parsed once and reused, until its text or one of the modules it imports changes. Typedefs of the schema shadow
+imported typedefs, earlier imports shadow later ones and all of them shadow the prelude. Imports aren't transitive.
+A bundle renames shadowed typedefs, e.g. `Money` of `common.money` becomes `CommonMoneyMoney`.
+
+usage:
+```python
+loader = ModuleLoader(["schemas/shared"])
+module = loader.load_file("schemas/api.schema")
+PythonCompiler().compile_ir(module.bundle(), template)
+```
+"""
+import copy
+import re
+import threading
+from collections import ChainMap
+from dataclasses import dataclass, field, fields, is_dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+from .cache import hash_key
+from .error_handling import Diagnostics, ErrorLevel, error
+from .intermediate_representation import EnumType, File, ObjectType, ReferenceType, Typedef
+from .parser import ParserSession, link
+from .prelude import DEFAULT_PRELUDE, Prelude, resolve_prelude
+from .profiling import phase
+
+__all__ = ["Module", "ModuleLoader", "MODULE_EXTENSION"]
+
+MODULE_EXTENSION = ".schema"
+
+
+@dataclass(frozen=True, eq=False)
+class Module:
+    name: str       # as it was imported first, e.g. `common.money`. The file name for loaded files
+    path: Path      # as it was found, e.g. relative to a directory of the search path
+    digest: str     # hash of the text
+    file: File
+    imports: Tuple["Module", ...]
+    types: Mapping[str, Typedef]    # read-only, the typedefs of the module without the imported ones
+
+    def modules(self) -> Iterator["Module"]:
+        """The module and all modules it imports directly or indirectly. Every module once, imported ones first."""
+        seen = set()
+        stack = [(self, False)]
+        while stack:
+            module, expanded = stack.pop()
+            if expanded:
+                yield module
+            elif id(module) not in seen:
+                seen.add(id(module))
+                stack.append((module, True))
+                stack.extend((m, False) for m in reversed(module.imports))
+
+    def bundle(self) -> File:
+        """The file with the typedefs of all imported modules in front of its own, so compilers generate code, that
+        doesn't depend on the code of other modules.
+
+        Type names are unique in the bundle. An imported typedef, whose name is taken by the module or by an earlier
+        import, is renamed with the module name as prefix and the references to it follow. The modules aren't
+        changed, the bundle is a copy then.
+        """
+        modules = list(self.modules())  # the module itself is the last one
+        typedefs = tuple(t for m in modules for t in m.file.global_types)
+        file = File(self.file.communications, typedefs, self.file.constants, self.file.ws_events)
+        taken = set(self.types)
+        shadowed = []
+        for m in modules[:-1]:
+            for t in m.file.global_types:
+                if t.name in taken:
+                    shadowed.append((m, t))
+                else:
+                    taken.add(t.name)
+        if not shadowed:
+            return file
+        names = {}
+        for m, t in shadowed:
+            name = _prefix(m.name) + t.name
+            while name in taken:
+                name += "_"
+            taken.add(name)
+            names[id(t)] = name
+        return _renamed(file, names)
+
+
+def _prefix(module_name: str) -> str:
+    return "".join(part[:1].upper() + part[1:] for part in re.split(r"[.\-_]", module_name))
+
+
+def _renamed(file: File, names: Dict[int, str]) -> File:
+    """Copy of the file with the typedefs renamed. `names` maps the id of a typedef to its new name."""
+    own = {id(t) for t in file.global_types}
+    # typedefs of the prelude are shared, not copied
+    memo = {id(ref.typedef): ref.typedef for ref in _references(file) if id(ref.typedef) not in own}
+    copied = copy.deepcopy(file, memo)
+    renamed = {}
+    typedefs = []
+    for t in file.global_types:
+        new = memo[id(t)]
+        if id(t) in names:
+            name = names[id(t)]
+            new_type = new.type
+            if isinstance(new_type, ObjectType) and new_type.name == t.name:
+                new_type = ObjectType(name, new_type.values, new_type.attributes)
+            elif isinstance(new_type, EnumType) and new_type.name == t.name:
+                new_type = EnumType(name, new_type.values)
+            renamed[id(new)] = new = Typedef(name, new_type)
+        typedefs.append(new)
+    for ref in _references(copied):
+        typedef = renamed.get(id(ref.typedef))
+        if typedef is not None:
+            ref.name = typedef.name
+            ref.typedef = typedef
+    return File(copied.communications, tuple(typedefs), copied.constants, copied.ws_events)
+
+
+def _references(file: File) -> Iterator[ReferenceType]:
+    """All references in the file. Referenced typedefs aren't followed."""
+    seen = set()
+    stack = [file]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, tuple):
+            stack.extend(node)
+        elif is_dataclass(node) and id(node) not in seen:
+            seen.add(id(node))
+            if isinstance(node, ReferenceType):
+                yield node
+            else:
+                stack.extend(getattr(node, f.name) for f in fields(node))
+
+
+@dataclass
+class _Load:
+    """State of a single `load` call."""
+    diagnostics: Optional[Diagnostics]
+    stack: List[Tuple[Path, str]] = field(default_factory=list)    # modules, that are being loaded
+    loaded: Dict[Path, Module] = field(default_factory=dict)    # absolute path -> module
+    parsed: Dict[Path, Tuple[Module, Tuple[str, ...]]] = field(default_factory=dict)   # see `ModuleLoader._modules`
+
+
+class ModuleLoader:
+    """Loads schemas and the modules they import. Modules are cached by their file, so a loader should live as long
+    as the files are compiled, e.g. in watch mode. Errors carry the file names of the modules.
+
+    A loader can be shared by threads.
+    """
+
+    def __init__(self, search_path: Sequence[Union[str, Path]] = (),
+                 prelude: Union[str, Prelude, None] = DEFAULT_PRELUDE, backend: str = "lark",
+                 extension: str = MODULE_EXTENSION):
+        """
+        :param search_path: Directories, that imports are searched in after the directory of the importing schema.
+        :param prelude: See `parse`.
+        :param backend: See `ParserSession`.
+        """
+        self.search_path = [Path(p) for p in search_path]
+        self.prelude = resolve_prelude(prelude)
+        self.backend = backend
+        self.extension = extension
+        self.parsed = 0     # modules parsed by the last load, all others were reused
+        # absolute path of the module -> module and the names of its imports
+        self._modules: Dict[Path, Tuple[Module, Tuple[str, ...]]] = {}
+        self._lock = threading.RLock()
+
+    def load(self, name: str, diagnostics: Diagnostics = None) -> Module:
+        """Loads the module from the search path and all modules it imports.
+
+        :param diagnostics: Collects the errors of all modules instead of raising the first one. Modules with errors
+            aren't cached.
+        """
+        path = self.find(name)
+        if path is None:
+            raise ValueError(f"No module named '{name}' in: {', '.join(map(str, self.search_path))}")
+        return self._load_root(path, name, None, diagnostics)
+
+    def load_file(self, path: Union[str, Path], text: str = None, diagnostics: Diagnostics = None) -> Module:
+        """Loads the schema file and all modules it imports.
+
+        :param text: The text of the file, when it was read already.
+        :param diagnostics: See `load`.
+        """
+        path = Path(path)
+        return self._load_root(path, path.stem, text, diagnostics)
+
+    def find(self, name: str, directory: Path = None) -> Optional[Path]:
+        """The file of the module. The directory is searched before the search path."""
+        relative = Path(*name.split("."))
+        relative = relative.with_name(relative.name + self.extension)
+        for d in ([directory] if directory is not None else []) + self.search_path:
+            path = d.joinpath(relative)
+            if path.is_file():
+                return path
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._modules.clear()
+
+    def _load_root(self, path: Path, name: str, text: Optional[str], diagnostics: Optional[Diagnostics]) -> Module:
+        with self._lock:
+            state = _Load(diagnostics)
+            errors = len(diagnostics.errors) if diagnostics is not None else 0
+            module = self._load(path, name, state, text)
+            self.parsed = len(state.parsed)
+            if diagnostics is None or len(diagnostics.errors) == errors:
+                self._modules.update(state.parsed)
+            return module
+
+    def _load(self, path: Path, name: str, state: _Load, text: str = None) -> Module:
+        key = path.resolve()
+        module = state.loaded.get(key)
+        if module is not None:
+            return module
+        if text is None:
+            text = path.read_text(encoding="utf8")
+        digest = hash_key(text)
+        state.stack.append((key, name))
+        try:
+            module = self._reuse(key, digest, state)
+            if module is None:
+                module = self._parse(key, path, name, text, digest, state)
+        finally:
+            state.stack.pop()
+        state.loaded[key] = module
+        return module
+
+    def _reuse(self, key: Path, digest: str, state: _Load) -> Optional[Module]:
+        """The cached module, when its text and the modules it imports didn't change."""
+        cached, names = self._modules.get(key, (None, ()))
+        if cached is None or cached.digest != digest:
+            return None
+        for name, module in zip(names, cached.imports):
+            path = self.find(name, cached.path.parent)
+            if path is None or path.resolve() != module.path.resolve() or self._load(path, name, state) is not module:
+                return None
+        return cached
+
+    def _parse(self, key: Path, path: Path, name: str, text: str, digest: str, state: _Load) -> Module:
+        session = ParserSession(str(path), diagnostics=state.diagnostics, backend=self.backend, prelude=self.prelude)
+        file = session.parse(text, link_references=False)
+        ctx = session.ctx
+        imports: Dict[Path, Module] = {}
+        names = []
+        for import_name, pos in session.imports:
+            dependency = self.find(import_name, path.parent)
+            if dependency is None:
+                searched = ", ".join(map(str, [path.parent] + self.search_path))
+                error(ErrorLevel.ERROR, ctx.with_pos(pos), f"ImportError: no module named '{import_name}'",
+                      f"Searched in: {searched}")
+                continue
+            stack = [k for k, _ in state.stack]
+            dependency_key = dependency.resolve()
+            if dependency_key in stack:
+                cycle = " -> ".join([n for _, n in state.stack[stack.index(dependency_key):]] + [import_name])
+                error(ErrorLevel.ERROR, ctx.with_pos(pos), f"ImportError: circular import {cycle}")
+                continue
+            if dependency_key not in imports:
+                imports[dependency_key] = self._load(dependency, import_name, state)
+                names.append(import_name)
+        sym_tables = [session.sym_table] + [m.types for m in imports.values()]
+        if self.prelude is not None:
+            sym_tables.append(self.prelude.types)
+        with phase("link"):
+            link(session.references, ChainMap(*sym_tables), ctx)
+        module = Module(name, path, digest, file, tuple(imports.values()), MappingProxyType(dict(session.sym_table)))
+        state.parsed[key] = (module, tuple(names))
+        return module
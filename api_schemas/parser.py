@@ -1,17 +1,29 @@
-from dataclasses import dataclass
+from copy import copy
+from functools import lru_cache
 from pathlib import Path
-from typing import Union, List, Tuple, Any, Dict
+from typing import Union, List, Tuple, Any, Dict, Iterable, Mapping, Optional, TYPE_CHECKING
 import difflib
+import sys
 
-from lark import Lark, Tree, Token, Visitor, Transformer
+import lark
+from lark import Lark, Token, UnexpectedInput
+from lark.exceptions import VisitError
+from lark.visitors import Transformer_NonRecursive
+from lark.indenter import DedentError
 from lark.indenter import Indenter
 
-from .error_handling import on_syntax_error, Context, Position, error, ErrorLevel
+from . import profiling
+from .cache import get_cache_dir, hash_key, IRCache
+from .error_handling import on_syntax_error, Context, Position, error, ErrorLevel, Diagnostics, DEFAULT_FILE_NAME
 from .intermediate_representation import *
+from .prelude import DEFAULT_PRELUDE, Prelude, resolve_prelude, symbols
+from .profiling import phase
 
-# globals
-sym_table: Dict[str, Type]
-ctx: Context
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+GRAMMAR_FILE = Path(__file__).parent.joinpath("grammar.lark")
+BACKENDS = ("lark", "fast")
 
 # types
 AllTypes = Type.__args__
@@ -19,19 +31,211 @@ Child = Union[Token, Any]
 Children = List[Child]
 
 
-def parse(text: str) -> File:
-    global sym_table, ctx
-    sym_table = {}
-
-    if text[-1] != "\n":
-        text += "\n"
-    grammar_file = Path(__file__).parent.joinpath("grammar.lark")
-    parser = Lark.open(grammar_file, parser="lalr", postlex=GrammarIndenter())
-    ctx = Context("TODO: FILENAME", text, None)
-    parse_tree = parser.parse(text, on_error=lambda err: on_syntax_error(err, ctx))
-    transformer = TransformToIR()
-    res = transformer.transform(parse_tree)
-    return res
+def parse(text: str, cache: IRCache = None, backend: str = "lark",
+          prelude: Union[str, Prelude, None] = DEFAULT_PRELUDE) -> File:
+    """Parses the schema into its intermediate representation.
+
+    When a cache is given, unchanged schemas are loaded from it instead of being parsed.
+    :param backend: `lark` or `fast`, see `ParserSession`. Both return the same IR and errors.
+    :param prelude: Types, that the schema can reference without defining them. See `prelude`.
+    """
+    prelude = resolve_prelude(prelude)
+    if cache is None:
+        return ParserSession(backend=backend, prelude=prelude).parse(text)
+    ir = cache.get(text, prelude)
+    if ir is None:
+        ir = ParserSession(backend=backend, prelude=prelude).parse(text)
+        cache.put(text, ir, prelude)
+    return ir
+
+
+def check(text: str, file_name: str = DEFAULT_FILE_NAME, backend: str = "lark",
+          prelude: Union[str, Prelude, None] = DEFAULT_PRELUDE) -> Diagnostics:
+    """Parses the schema and returns all its errors at once instead of raising the first one."""
+    diagnostics = Diagnostics()
+    ParserSession(file_name, diagnostics=diagnostics, backend=backend, prelude=prelude).parse(text)
+    return diagnostics
+
+
+def parse_many(texts: Iterable[str], executor: 'Executor' = None) -> List[File]:
+    """Parses all schemas concurrently and returns their IRs in the same order.
+
+    Uses a thread pool when no executor is given. Every schema is parsed in its own `ParserSession`.
+    """
+    if executor is None:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor() as executor:
+            return list(executor.map(parse, texts))
+    return list(executor.map(parse, texts))
+
+
+class ParserSession:
+    """State of a single parse: The symbol table, the references to link and the error context.
+
+    A session must not be shared between concurrent parses, but the underlying lark parser is.
+    """
+
+    def __init__(self, file_name: str = DEFAULT_FILE_NAME, line_offset: int = 0, diagnostics: Diagnostics = None,
+                 backend: str = "lark", prelude: Union[str, Prelude, None] = DEFAULT_PRELUDE):
+        """
+        :param line_offset: Lines in front of the parsed text, when only a part of a file is parsed.
+        :param diagnostics: Collects all errors instead of raising the first one. See `parse`.
+        :param backend: `lark` parses with the grammar. `fast` builds the IR directly from the lines of the schema
+            (see `fast_parser`) and falls back to lark for schemas with errors.
+        :param prelude: References to types, that the text doesn't define, are linked to the prelude.
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown parser backend '{backend}'. Available: {', '.join(BACKENDS)}")
+        self.backend = backend
+        self.prelude = resolve_prelude(prelude)
+        self.file_name = file_name
+        self.line_offset = line_offset
+        self.diagnostics = diagnostics
+        self.sym_table: Dict[str, Typedef] = {}
+        self.references: List[Tuple[ReferenceType, Position]] = []
+        self.imports: List[Tuple[str, Position]] = []     # names of the imported modules
+        self.ctx: Optional[Context] = None
+
+    def parse(self, text: str, link_references: bool = True) -> File:
+        """
+        :param link_references: Link all `$Name` references to their typedefs. Can be disabled, when the text is
+            only a part of a file and the references are linked later with all other parts. Schemas with imports
+            are linked by `modules.ModuleLoader`.
+
+        When the session collects diagnostics, the errors of the whole text are added to them and the IR of the
+        blocks without syntax errors is returned.
+        """
+        if not text.endswith("\n"):
+            text += "\n"
+        with phase("parse"):
+            if self.diagnostics is not None:
+                return self._parse_collecting(text, link_references)
+            return self._parse(text, link_references)
+
+    def _parse(self, text: str, link_references: bool) -> File:
+        self.ctx = Context(self.file_name, text, None, self.line_offset)
+        res = self._parse_fast(text)
+        if res is None:
+            res = self._parse_block(get_parser(), text)     # raises the errors, the context doesn't collect them
+        if link_references:
+            self._link()
+        return res
+
+    def _parse_collecting(self, text: str, link_references: bool) -> File:
+        """Parses every top level block on its own. A syntax error skips the rest of its block, parsing goes on with
+        the next block (panic mode recovery)."""
+        from .blocks import split_blocks    # blocks imports this module
+        parser = get_parser()
+        line_offset = self.line_offset
+        communications, typedefs, constants, ws_events = [], [], [], None
+        for block in split_blocks(text):
+            self.line_offset = line_offset + block.line - 1
+            self.ctx = Context(self.file_name, block.text, None, self.line_offset, self.diagnostics)
+            file = self._parse_fast(block.text)
+            if file is None:
+                file = self._parse_block(parser, block.text)
+                if file is None:
+                    continue
+            communications.extend(file.communications)
+            typedefs.extend(file.global_types)
+            constants.extend(file.constants)
+            if file.ws_events is not None:
+                ws_events = file.ws_events
+        self.line_offset = line_offset
+        self.ctx = Context(self.file_name, text, None, line_offset, self.diagnostics)
+        if link_references:
+            self._link()
+        return File(tuple(communications), tuple(typedefs), tuple(constants), ws_events)
+
+    def _link(self):
+        reject_imports(self.imports, self.ctx)
+        with phase("link"):
+            link(self.references, symbols(self.sym_table, self.prelude), self.ctx)
+
+    def _parse_block(self, parser: Lark, text: str) -> Optional[File]:
+        """Parses a top level block or a whole file with lark. Returns None, when it has errors. They are added to the
+        diagnostics or raised as `SchemaError`."""
+        try:
+            with phase("lalr"):
+                tree = parser.parse(text, on_error=lambda err: on_syntax_error(err, self.ctx))
+        except UnexpectedInput:
+            return None     # reported by on_syntax_error
+        except DedentError as e:
+            line = self.line_offset + text.count("\n")
+            error(ErrorLevel.ERROR, self.ctx.with_pos(Position(line, 1, line, 1)), f"IndentationError: {e}")
+            return None
+        try:
+            with phase("transform"):
+                return TransformToIR(self).transform(tree)
+        except VisitError as e:
+            line = self.line_offset + 1
+            error(ErrorLevel.ERROR, self.ctx.with_pos(Position(line, 1, line, 1)),
+                  f"SyntaxError: invalid {e.obj.data}: {e.orig_exc}")
+            return None
+
+    def _parse_fast(self, text: str) -> Optional[File]:
+        """IR of the fast backend or None, when the text has to be parsed by lark."""
+        if self.backend != "fast":
+            return None
+        from .fast_parser import parse_fast
+        with phase("fast"):
+            return parse_fast(text, self)
+
+
+def reject_imports(imports: List[Tuple[str, Position]], ctx: Context):
+    """Reports the first import. Only `api_schemas.modules.ModuleLoader` resolves imports."""
+    if imports:
+        name, pos = imports[0]
+        error(ErrorLevel.ERROR, ctx.with_pos(pos), f"ImportError: can't import '{name}' without a module loader",
+              "Load the schema with `api_schemas.modules.ModuleLoader`")
+
+
+def link(references: Iterable[Tuple[ReferenceType, Position]], sym_table: Mapping[str, Typedef], ctx: Context):
+    """Links the references to their typedefs in a single pass. Types can be referenced before they are defined."""
+    references = list(references)
+    for ref, pos in references:
+        typedef = sym_table.get(ref.name)
+        if typedef is None:
+            matches = difflib.get_close_matches(ref.name, sym_table.keys(), 1)
+            help_msg = f"Did you mean: {matches[0]}" if matches else None
+            error(ErrorLevel.ERROR, ctx.with_pos(pos), f"NameError: name '{ref.name} is not defined", help_msg)
+        ref.typedef = typedef
+    for ref, pos in references:
+        if ref.typedef is not None:
+            check_alias_cycle(ref, pos, ctx)
+
+
+def check_alias_cycle(ref: ReferenceType, pos: Position, ctx: Context):
+    """Aliases must end at a type that is not an alias."""
+    seen = []
+    t = ref
+    while type(t) is ReferenceType:
+        if t.name in seen:
+            cycle = " -> ".join(seen[seen.index(t.name):] + [t.name])
+            error(ErrorLevel.ERROR, ctx.with_pos(pos), f"TypeError: circular alias {cycle}")
+            return
+        seen.append(t.name)
+        if t.typedef is None:
+            return  # not defined, reported by link
+        t = t.typedef.type
+
+
+@lru_cache(maxsize=None)
+def get_parser() -> Lark:
+    """Returns the parser shared by all parse calls of this process.
+
+    Building the LALR tables is more expensive than parsing most schemas. They are therefore built once per process
+    and persisted to the cache directory (see `get_cache_dir`), keyed by the grammar and the lark version. Following
+    processes load the tables instead of rebuilding them.
+    """
+    grammar = GRAMMAR_FILE.read_text()
+    options = {}
+    cache_dir = get_cache_dir("grammar")
+    if cache_dir:
+        key = hash_key(grammar, lark.__version__)
+        options["cache"] = str(cache_dir.joinpath(f"lalr_{key[:24]}.tmp"))
+    with phase("grammar"):
+        return Lark(grammar, parser="lalr", postlex=GrammarIndenter(), **options)
 
 
 primitive_type_mapping = {
@@ -43,7 +247,13 @@ primitive_type_mapping = {
 }
 
 
-class TransformToIR(Transformer):
+class TransformToIR(Transformer_NonRecursive):
+    """Transforms the parse tree into the IR. Non-recursive, so deeply nested objects don't hit the recursion
+    limit."""
+
+    def __init__(self, session: ParserSession):
+        super().__init__()
+        self.session = session
 
     @staticmethod
     def file(children: Children) -> File:
@@ -60,24 +270,33 @@ class TransformToIR(Transformer):
                 constants.append(c)
             elif type(c) == WSEvents:
                 ws_events = c
+            elif type(c) == str:
+                pass    # import, collected by the session
             else:
                 raise ValueError(f"Unknown type: {type(c)}")
-        return File(communications, typedefs, constants, ws_events)
+        return File(tuple(communications), tuple(typedefs), tuple(constants), ws_events)
 
     @staticmethod
-    def block(children: Children) -> Union[Communication, Typedef, Constant, WSEvents]:
-        check_type(children[0], [Communication, Typedef, Constant, WSEvents])
+    def block(children: Children) -> Union[Communication, Typedef, Constant, WSEvents, str]:
+        check_type(children[0], [Communication, Typedef, Constant, WSEvents, str])
         return children[0]
 
     @staticmethod
     def constant(children: Children) -> Constant:
         check_type(children[0], "IDENTIFIER")
         check_type(children[1], "CONST_VALUE")
-        return Constant(children[0].value, children[1].value)
+        return Constant(sys.intern(children[0].value), children[1].value)
+
+    def import_module(self, children: Children) -> str:
+        check_type(children[1], "MODULE")
+        t = children[1]
+        line = t.line + self.session.line_offset
+        self.session.imports.append((t.value, Position(line, t.column, line, t.column + len(t.value))))
+        return t.value
 
     @staticmethod
     def communication(children: Children) -> Communication:
-        name = children[0].value
+        name = sys.intern(children[0].value)
         attributes = []
         requests = []
         for c in children[1:]:
@@ -86,7 +305,7 @@ class TransformToIR(Transformer):
             else:
                 check_type(c, Request)
                 requests.append(c)
-        return Communication(name, attributes, requests)
+        return Communication(name, tuple(attributes), tuple(requests))
 
     @staticmethod
     def request(children: Children) -> Request:
@@ -96,25 +315,25 @@ class TransformToIR(Transformer):
         return Request(method, parameters, responses)
 
     @staticmethod
-    def request_def(children: Children) -> List[Union[Constant, TypeAttribute]]:
+    def request_def(children: Children) -> Tuple[Union[Constant, TypeAttribute], ...]:
         if len(children) == 2:
             return children[1]
-        return []   # no body
+        return ()   # no body
 
     @staticmethod
-    def response_def(children: Children) -> List[Response]:
-        return children[1:]
+    def response_def(children: Children) -> Tuple[Response, ...]:
+        return tuple(children[1:])
 
     @staticmethod
     def response(children: Children) -> Response:
         code = int(children[0].value)   # TODO: check + error message if fail
-        attributes = children[1] if len(children) == 2 else []
+        attributes = children[1] if len(children) == 2 else ()
         return Response(code, attributes)
 
     @staticmethod
-    def body(children: Children) -> List[Union[Constant, TypeAttribute]]:
+    def body(children: Children) -> Tuple[Union[Constant, TypeAttribute], ...]:
         check_children(children, [Constant, TypeAttribute])
-        return children
+        return tuple(children)
 
     @staticmethod
     def attribute(children: Children) -> TypeAttribute:
@@ -129,7 +348,7 @@ class TransformToIR(Transformer):
             name = ""   # json is an array
             is_wildcard = False
         else:
-            name = children[token_idx].value
+            name = sys.intern(children[token_idx].value)
             is_wildcard = children[token_idx].type == "WILDCARD"
             token_idx += 1
         if isinstance(children[token_idx], Token) and children[token_idx].type == "ARRAY":
@@ -148,20 +367,20 @@ class TransformToIR(Transformer):
     def primitive(children: Children) -> PrimitiveType:
         check_type(children[0], "PRIMITIVE")
         check_children(children[1:], Constant)
-        return PrimitiveType(primitive_type_mapping[children[0].value], children[1:])
+        return PrimitiveType(primitive_type_mapping[children[0].value], tuple(children[1:]))
 
     @staticmethod
     def enum(children: Children) -> EnumType:
         check_type(children[0], "IDENTIFIER")
         check_children(children[1:], "IDENTIFIER")
-        name = children[0].value
-        values = [c.value for c in children[1:]]
+        name = sys.intern(children[0].value)
+        values = tuple(sys.intern(c.value) for c in children[1:])
         return EnumType(name, values)
 
     @staticmethod
     def object(children: Children) -> ObjectType:
         check_type(children[0], "IDENTIFIER")
-        name = children[0].value
+        name = sys.intern(children[0].value)
         values: List[Constant] = []
         attributes: List[TypeAttribute] = []
         for c in children[1]:
@@ -170,49 +389,38 @@ class TransformToIR(Transformer):
             else:
                 check_type(c, TypeAttribute)
                 attributes.append(c)
-        return ObjectType(name, values, attributes)
+        return ObjectType(name, tuple(values), tuple(attributes))
 
-    @staticmethod
-    def global_type(children: Children) -> Type:
+    def global_type(self, children: Children) -> ReferenceType:
         check_type(children[0], "IDENTIFIER")
-        name = children[0].value
-        if name not in sym_table:
-            t = children[0]
-            matches = difflib.get_close_matches(name, sym_table.keys(), 1)
-            help_msg = "A type must be defined before it can be referenced."
-            if matches:
-                help_msg = f"Did you mean: {matches[0]}"
-            pos = Position(t.line, t.column, t.line, t.column + len(t.value))
-            error(ErrorLevel.ERROR, ctx.with_pos(pos), f"NameError: name '{name} is not defined", help_msg)
-        return sym_table[name]
-
-    @staticmethod
-    def typedef_primitive(children: Children) -> Typedef:
+        t = children[0]
+        line = t.line + self.session.line_offset
+        pos = Position(line, t.column, line, t.column + len(t.value))
+        ref = ReferenceType(sys.intern(t.value))
+        self.session.references.append((ref, pos))
+        return ref
+
+    def typedef_primitive(self, children: Children) -> Typedef:
         check_type(children[1], "IDENTIFIER")
         check_type(children[2], PrimitiveType)
-        sym_table[children[1].value] = children[2]
-        return Typedef(children[1].value, children[2])
+        return self._define(Typedef(sys.intern(children[1].value), children[2]))
 
-    @staticmethod
-    def alias(children: Children) -> Typedef:
+    def alias(self, children: Children) -> Typedef:
         check_type(children[1], "IDENTIFIER")
-        check_type(children[2], AllTypes)
-        name = children[1].value
-        # TODO: new child with new name?
-        sym_table[name] = children[2]
-        return Typedef(name, sym_table[name])
+        check_type(children[2], ReferenceType)
+        return self._define(Typedef(sys.intern(children[1].value), children[2]))
 
-    @staticmethod
-    def typedef_enum(children: Children) -> Typedef:
+    def typedef_enum(self, children: Children) -> Typedef:
         check_type(children[1], EnumType)
-        sym_table[children[1].name] = children[1]
-        return Typedef(children[1].name, children[1])
+        return self._define(Typedef(children[1].name, children[1]))
 
-    @staticmethod
-    def typedef_object(children: Children) -> Typedef:
+    def typedef_object(self, children: Children) -> Typedef:
         check_type(children[1], ObjectType)
-        sym_table[children[1].name] = children[1]
-        return Typedef(children[1].name, children[1])
+        return self._define(Typedef(children[1].name, children[1]))
+
+    def _define(self, typedef: Typedef) -> Typedef:
+        self.session.sym_table[typedef.name] = typedef
+        return typedef
 
     @staticmethod
     def ws_events(children: Children) -> WSEvents:
@@ -223,15 +431,15 @@ class TransformToIR(Transformer):
         return WSEvents(client_events, server_events)
 
     @staticmethod
-    def ws_events_list(children: Children) -> List[WSEvent]:
+    def ws_events_list(children: Children) -> Tuple[WSEvent, ...]:
         check_children(children, WSEvent)
-        return children
+        return tuple(children)
 
     @staticmethod
     def ws_event(children: Children) -> WSEvent:
         check_type(children[0], "IDENTIFIER")
-        check_type(children[1], list)
-        return WSEvent(children[0].value, children[1])
+        check_type(children[1], tuple)
+        return WSEvent(sys.intern(children[0].value), children[1])
 
 
 class GrammarIndenter(Indenter):
@@ -242,6 +450,29 @@ class GrammarIndenter(Indenter):
     DEDENT_type = "_END"
     tab_len = 4
 
+    def process(self, stream):
+        profile = profiling.active()
+        if profile is not None:
+            stream = profile.timed("lex", stream)
+        # The indentation state lives on a copy, so the parser can be used by several threads at once
+        return Indenter.process(copy(self), stream)
+
+    def handle_NL(self, token):
+        """Same as `Indenter.handle_NL`, but the layout tokens don't hold the indentation. They stay on the parser
+        stack until their block is reduced, in deeply nested schemas that would be the indentation of every line."""
+        indent_str = token.rsplit("\n", 1)[1]
+        indent = indent_str.count(" ") + indent_str.count("\t") * self.tab_len
+        yield Token.new_borrow_pos(self.NL_type, "\n", token)
+        if indent > self.indent_level[-1]:
+            self.indent_level.append(indent)
+            yield Token.new_borrow_pos(self.INDENT_type, "", token)
+        else:
+            while indent < self.indent_level[-1]:
+                self.indent_level.pop()
+                yield Token.new_borrow_pos(self.DEDENT_type, "", token)
+            if indent != self.indent_level[-1]:
+                raise DedentError(f"Unexpected dedent to column {indent}. Expected dedent to {self.indent_level[-1]}")
+
 
 def check_type(child: Child, type_: Union[Union[str, type], List[Union[str, type]]]):
     """Helper method for assertions"""
@@ -0,0 +1,98 @@
+"""Preludes: typedefs, that every schema can reference without defining them, e.g. `$int32` of the `std` prelude.
+
+A prelude is parsed once per process (or loaded from the IR cache) and its symbol table is shared read-only by all
+parses. Typedefs of a schema shadow the typedefs of its prelude.
+
+usage:
+```python
+register_prelude("company", company_types)     # builds on the std types
+parse(schema, prelude="company")
+parse(schema, prelude=None)                     # no prelude
+```
+"""
+import threading
+from collections import ChainMap
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple, Union
+
+from .cache import IRCache, hash_key
+from .intermediate_representation import File, Typedef
+from .std_types import std_types
+
+__all__ = ["Prelude", "DEFAULT_PRELUDE", "register_prelude", "get_prelude", "available_preludes", "resolve_prelude",
+           "symbols"]
+
+DEFAULT_PRELUDE = "std"
+
+# name -> (schema text, name of the base prelude)
+_sources: Dict[str, Tuple[str, Optional[str]]] = {DEFAULT_PRELUDE: (std_types, None)}
+_loaded: Dict[str, "Prelude"] = {}
+_lock = threading.RLock()
+
+
+@dataclass(frozen=True)
+class Prelude:
+    name: str
+    key: str    # hash of the texts of the prelude and its bases, part of the cache keys of schemas
+    file: File
+    types: Mapping[str, Typedef]    # read-only, includes the types of the base prelude
+
+
+def register_prelude(name: str, text: str, base: Optional[str] = DEFAULT_PRELUDE):
+    """Adds or replaces a prelude. Its types can reference the types of the base prelude."""
+    if base is not None and base not in _sources:
+        raise ValueError(f"Unknown prelude '{base}'. Available: {', '.join(available_preludes())}")
+    with _lock:
+        _sources[name] = (text, base)
+        _loaded.clear()     # preludes based on a replaced one are loaded again
+
+
+def available_preludes() -> List[str]:
+    return sorted(_sources)
+
+
+def get_prelude(name: str) -> Prelude:
+    """Returns the prelude. It is parsed on first use."""
+    prelude = _loaded.get(name)
+    if prelude is not None:
+        return prelude
+    with _lock:
+        if name not in _loaded:
+            try:
+                text, base = _sources[name]
+            except KeyError:
+                raise ValueError(f"Unknown prelude '{name}'. Available: {', '.join(available_preludes())}") \
+                    from None
+            _loaded[name] = _load(name, text, get_prelude(base) if base is not None else None)
+        return _loaded[name]
+
+
+def resolve_prelude(prelude: Union[str, Prelude, None]) -> Optional[Prelude]:
+    """The prelude of a name. Preludes and None are returned as they are."""
+    if prelude is None or isinstance(prelude, Prelude):
+        return prelude
+    return get_prelude(prelude)
+
+
+def symbols(sym_table: Mapping[str, Typedef], prelude: Optional[Prelude]) -> Mapping[str, Typedef]:
+    """The typedefs, that references of a schema are linked to."""
+    if prelude is None:
+        return sym_table
+    return ChainMap(sym_table, prelude.types)
+
+
+def _load(name: str, text: str, base: Optional[Prelude]) -> Prelude:
+    from .parser import ParserSession
+    try:
+        cache = IRCache()
+    except (ValueError, OSError):
+        cache = None    # disk caching is disabled
+    file = cache.get(text, base) if cache else None
+    if file is None:
+        file = ParserSession(f"<prelude {name}>", prelude=base).parse(text)
+        if cache:
+            cache.put(text, file, base)
+    types = dict(base.types) if base else {}
+    types.update((t.name, t) for t in file.global_types)
+    return Prelude(name, hash_key(base.key if base else "", text), file, MappingProxyType(types))
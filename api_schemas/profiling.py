@@ -0,0 +1,195 @@
+"""Wall time, calls and allocations of the phases of parsing and code generation.
+
+usage:
+```python
+with Profile() as profile:
+    python.convert(schema)
+print(profile.report())
+profile.write_chrome_trace("trace.json")    # open in chrome://tracing or https://ui.perfetto.dev
+```
+
+The phases are `compile`, `parse` with `fast` (the fast backend), `lalr` (lark, including `lex`), `transform` and
+`link`, `intern`, `render` and `autopep8`. `grammar` and `template` are the one time setup of the parser and of the
+templates.
+
+While no profile is active, a phase costs a global lookup and the tokens aren't timed. The phases are coarse, so
+this doesn't show in the timings.
+"""
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+__all__ = ["Profile", "Event", "PhaseStats", "phase", "active"]
+
+# The profile, that records the phases of all threads
+_active: Optional["Profile"] = None
+_DISABLED = nullcontext()
+
+
+def active() -> Optional["Profile"]:
+    return _active
+
+
+def phase(name: str):
+    """Context manager, that records the phase in the active profile. Does nothing, when no profile is active."""
+    profile = _active
+    if profile is None:
+        return _DISABLED
+    return profile.phase(name)
+
+
+@dataclass
+class Event:
+    name: str
+    start: float        # time.perf_counter() in seconds
+    duration: float
+    self_time: float    # duration without the nested phases
+    calls: int = 1      # events of a repeated phase (lexing of single tokens) are merged
+    allocations: int = 0    # net number of allocated memory blocks
+    memory: int = 0         # net allocated bytes, when tracemalloc traces
+    pid: int = field(default_factory=os.getpid)
+    tid: int = field(default_factory=threading.get_ident)
+
+
+@dataclass
+class PhaseStats:
+    calls: int = 0
+    total: float = 0
+    self_time: float = 0
+    allocations: int = 0
+    memory: int = 0
+
+
+class Profile:
+    """Records the phases, that run while the profile is active (`with profile:`). Events of other processes can be
+    added with `extend`."""
+
+    def __init__(self, trace_memory: bool = False):
+        """
+        :param trace_memory: Measures the allocated bytes of the phases with tracemalloc, which slows them down.
+        """
+        self.trace_memory = trace_memory
+        self.events: List[Event] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._previous: Optional[Profile] = None
+        self._started_tracemalloc = False
+
+    def __enter__(self) -> "Profile":
+        global _active
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._previous, _active = _active, self
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        global _active
+        _active = self._previous
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        stack = self._stack()
+        stack.append(0.0)   # duration of the nested phases
+        memory = tracemalloc.get_traced_memory()[0] if self.trace_memory else 0
+        blocks = sys.getallocatedblocks()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            allocations = sys.getallocatedblocks() - blocks
+            if self.trace_memory:
+                memory = tracemalloc.get_traced_memory()[0] - memory
+            nested = stack.pop()
+            if stack:
+                stack[-1] += duration
+            self._add(Event(name, start, duration, duration - nested, allocations=allocations, memory=memory))
+
+    def timed(self, name: str, items: Iterable) -> Iterator:
+        """Yields the items and records the time spent to get them as one event, e.g. the lexing of the tokens, that
+        are consumed by the parser."""
+        iterator = iter(items)
+        start = time.perf_counter()
+        duration = 0.0
+        calls = 0
+        try:
+            while True:
+                begin = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    duration += time.perf_counter() - begin
+                calls += 1
+                yield item
+        finally:
+            stack = self._stack()
+            if stack:
+                stack[-1] += duration
+            self._add(Event(name, start, duration, duration, calls))
+
+    def extend(self, events: Iterable[Event]):
+        with self._lock:
+            self.events.extend(events)
+
+    def _add(self, event: Event):
+        with self._lock:
+            self.events.append(event)
+
+    def _stack(self) -> List[float]:
+        try:
+            return self._local.stack
+        except AttributeError:
+            self._local.stack = []
+            return self._local.stack
+
+    def stats(self) -> Dict[str, PhaseStats]:
+        """Totals of every phase in the order of their first event."""
+        stats: Dict[str, PhaseStats] = {}
+        for event in sorted(self.events, key=lambda e: e.start):
+            s = stats.setdefault(event.name, PhaseStats())
+            s.calls += event.calls
+            s.total += event.duration
+            s.self_time += event.self_time
+            s.allocations += event.allocations
+            s.memory += event.memory
+        return stats
+
+    def report(self) -> str:
+        """Table of the phases. `self` is the time without nested phases, the self times add up to the total."""
+        lines = [f"{'phase':12s} {'calls':>8s} {'total ms':>10s} {'self ms':>10s} {'blocks':>10s}"
+                 + (f" {'memory kB':>10s}" if self.trace_memory else "")]
+        for name, s in self.stats().items():
+            line = f"{name:12s} {s.calls:8d} {s.total * 1000:10.2f} {s.self_time * 1000:10.2f} {s.allocations:10d}"
+            if self.trace_memory:
+                line += f" {s.memory / 1024:10.1f}"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def chrome_trace(self) -> dict:
+        """The events in the Chrome trace event format."""
+        events = []
+        for e in self.events:
+            args = {"allocations": e.allocations}
+            if e.calls != 1:
+                args["calls"] = e.calls
+            if self.trace_memory:
+                args["memory"] = e.memory
+            events.append({"name": e.name, "cat": "api_schemas", "ph": "X", "ts": e.start * 1e6,
+                           "dur": e.duration * 1e6, "pid": e.pid, "tid": e.tid, "args": args})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path: Union[str, Path]):
+        Path(path).write_text(json.dumps(self.chrome_trace()), encoding="utf8")
@@ -0,0 +1,37 @@
+"""Single line edit of a schema with 5000 typedefs, full parse vs. `IncrementalParser`.
+
+Run with `python -m benchmarks.bench_incremental`.
+"""
+import statistics
+import time
+
+from api_schemas import parse
+from api_schemas.incremental import IncrementalParser
+
+
+def schema(n: int) -> str:
+    return "".join(f"typedef T{i}\n    a: int\n    b: $T{i - 1}\n" if i else "typedef T0 str\n" for i in range(n))
+
+
+def main(n: int = 5000, edits: int = 50):
+    text = schema(n)
+    t = time.perf_counter()
+    parse(text)
+    full = time.perf_counter() - t
+
+    parser = IncrementalParser()
+    parser.parse(text)
+    pos = text.index(f"typedef T{n // 2}\n") + len(f"typedef T{n // 2}\n") + len("    a: ")
+    times = []
+    for i in range(edits):
+        replacement = "str" if i % 2 == 0 else "int"
+        t = time.perf_counter()
+        parser.edit(pos, pos + 3, replacement)
+        times.append(time.perf_counter() - t)
+    print(f"full parse:              {full * 1000:8.2f} ms")
+    print(f"incremental (median):    {statistics.median(times) * 1000:8.2f} ms")
+    print(f"incremental (max):       {max(times) * 1000:8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
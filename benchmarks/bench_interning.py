@@ -0,0 +1,45 @@
+"""Memory of the IR and size of the generated code with and without interning.
+
+Run with `python -m benchmarks.bench_interning`.
+"""
+import gc
+import tracemalloc
+
+from api_schemas import parse
+from api_schemas.compilers import python
+from api_schemas.interning import intern_types
+
+
+def schema(communications: int) -> str:
+    response = "            {code}\n                err_msg: str\n                err: Error\n" \
+               "                    code: int\n                    details: str\n"
+    blocks = []
+    for i in range(communications):
+        responses = "".join(response.format(code=code) for code in (400, 404, 500))
+        blocks.append(f"c{i}\n    GET\n        ->\n            id: int\n        <-\n{responses}")
+    events = "".join(f"        e{i}\n            err: Error\n                code: int\n                details: str\n"
+                     for i in range(communications))
+    return "".join(blocks) + f"WS\n    ->\n{events}    <-\n"
+
+
+def measure(fn):
+    gc.collect()
+    tracemalloc.start()
+    res = fn()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return res, size
+
+
+def main(communications: int = 1000):
+    text = schema(communications)
+    _, plain = measure(lambda: parse(text))
+    _, interned = measure(lambda: intern_types(parse(text)))
+    print(f"IR plain:          {plain / 1024:10.1f} KiB")
+    print(f"IR interned:       {interned / 1024:10.1f} KiB")
+    code = python.convert(text)
+    print(f"generated python:  {len(code) / 1024:10.1f} KiB, {code.count('class APIError')} APIError class")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""Memory of the compact IR (slotted frozen nodes, tuples, interned names) compared to the previous layout (plain
+dataclasses with a `__dict__` per node, lists and one string per token).
+
+Run with `python -m benchmarks.bench_ir_layout`.
+"""
+from dataclasses import dataclass, field, fields, is_dataclass
+from typing import List, Optional
+import gc
+import tracemalloc
+
+from api_schemas import parse, ReferenceType as CompactReference
+
+
+# previous layout of `intermediate_representation.py`
+@dataclass
+class PrimitiveType:
+    primitive: object
+    constants: List["Constant"] = field(default_factory=list)
+
+
+@dataclass
+class ObjectType:
+    name: str
+    values: List["Constant"]
+    attributes: List["TypeAttribute"]
+
+
+@dataclass
+class EnumType:
+    name: str
+    values: List[str]
+
+
+@dataclass
+class ReferenceType:
+    name: str
+    typedef: Optional["Typedef"] = field(default=None, repr=False, compare=False)
+
+
+@dataclass
+class Typedef:
+    name: str
+    type: object
+
+
+@dataclass
+class TypeAttribute:
+    name: str
+    type: object
+    is_optional: bool = False
+    is_array: bool = False
+    is_wildcard: bool = False
+
+
+@dataclass
+class Response:
+    code: int
+    attributes: List[TypeAttribute]
+
+
+@dataclass
+class Request:
+    method: str
+    parameters: List[TypeAttribute]
+    responses: List[Response]
+
+
+@dataclass
+class Communication:
+    name: str
+    values: List["Constant"]
+    requests: List[Request]
+
+
+@dataclass
+class Constant:
+    name: str
+    value: str
+
+
+@dataclass
+class File:
+    communications: List[Communication]
+    global_types: List[Typedef]
+    constants: List[Constant]
+    ws_events: "WSEvents"
+
+
+@dataclass
+class WSEvents:
+    client: List["WSEvent"]
+    server: List["WSEvent"]
+
+
+@dataclass
+class WSEvent:
+    name: str
+    data: List[TypeAttribute]
+
+
+def to_legacy(file) -> File:
+    """Copies the IR into the previous layout. Strings are copied, like every token had its own string."""
+    references = []
+
+    def convert(node):
+        if isinstance(node, str):
+            return "".join(list(node))
+        if isinstance(node, tuple):
+            return [convert(n) for n in node]
+        if type(node) is CompactReference:
+            ref = ReferenceType(convert(node.name))
+            references.append(ref)
+            return ref
+        if is_dataclass(node):
+            cls = globals()[type(node).__name__]
+            return cls(*[convert(getattr(node, f.name)) for f in fields(node)])
+        return node
+
+    legacy = convert(file)
+    sym_table = {t.name: t for t in legacy.global_types}
+    for ref in references:
+        ref.typedef = sym_table[ref.name]
+    return legacy
+
+
+def schema(types: int) -> str:
+    blocks = []
+    for i in range(types):
+        blocks.append(f"typedef Item{i}\n    id: int\n    name: str\n    ?tags[]: str\n"
+                      f"    state: State{{open, closed}}\n    owner: $User\n"
+                      f"    meta: Meta\n        created: int\n        updated: int\n")
+    blocks.append("typedef User\n    id: int\n    name: str\n")
+    events = "".join(f"        changed{i}\n            item: $Item{i}\n" for i in range(types))
+    blocks.append(f"WS\n    ->\n{events}    <-\n")
+    return "".join(blocks)
+
+
+def measure(fn):
+    gc.collect()
+    tracemalloc.start()
+    res = fn()
+    gc.collect()    # linked references are cycles, free the discarded IRs
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return res, size
+
+
+def main(types: int = 2000):
+    text = schema(types)
+    _, legacy = measure(lambda: to_legacy(parse(text)))
+    _, compact = measure(lambda: parse(text))
+    print(f"typedefs:          {types:10d}")
+    print(f"IR previous:       {legacy / 1024:10.1f} KiB")
+    print(f"IR compact:        {compact / 1024:10.1f} KiB ({compact / legacy:.0%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""Time of `format_name` with the memoized `NameFormatter`, compared to the previous implementation, that built the
+format map and converted the name on every call.
+
+Run with `python -m benchmarks.bench_names`.
+"""
+import time
+
+from api_schemas.compilers.base import CaseConverter, NameTypes
+from api_schemas.compilers.python import PythonCompiler
+
+
+def previous_format_name(compiler: PythonCompiler, name: str, name_type: NameTypes) -> str:
+    name_format = compiler._get_name_format_map()[name_type]
+    name = CaseConverter.convert(name, CaseConverter.basic_match(name), name_format.case)
+    return name_format.format.format(name)
+
+
+def measure(fn, names, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for name, name_type in names:
+            fn(name, name_type)
+    return time.perf_counter() - start
+
+
+def main(distinct: int = 2000, repeat: int = 50):
+    # Type names are formatted for every attribute, that uses them
+    names = [(f"user_item_{i}", NameTypes.CLASS) for i in range(distinct)]
+    names += [(f"createdAt{i}", NameTypes.ATTRIBUTE) for i in range(distinct)]
+    calls = len(names) * repeat
+    compiler = PythonCompiler()
+    previous = measure(lambda n, t: previous_format_name(compiler, n, t), names, repeat)
+    memoized = measure(compiler.format_name, names, repeat)
+    print(f"calls:     {calls:10d}")
+    print(f"previous:  {previous / calls * 1e9:10.0f} ns/call")
+    print(f"memoized:  {memoized / calls * 1e9:10.0f} ns/call ({previous / memoized:.0f}x)")
+    print(f"cache:     {compiler.name_formatter.cache_info()}")
+
+
+if __name__ == '__main__':
+    main()
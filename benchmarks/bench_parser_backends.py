@@ -0,0 +1,21 @@
+"""Parse time of the lark and the fast backend on generated schemas.
+
+Run with `python -m benchmarks.bench_parser_backends`.
+"""
+from api_schemas import parse
+from benchmarks.generator import generate
+from benchmarks.suite import PRESETS, measure
+
+
+def main(presets=("small", "medium")):
+    print(f"{'schema':10s} {'lines':>8s} {'lark ms':>10s} {'fast ms':>10s} {'speedup':>8s}")
+    for name in presets:
+        text = generate(PRESETS[name])
+        assert parse(text, backend="fast") == parse(text)
+        lark = measure(lambda: parse(text, backend="lark"), repeat=3)
+        fast = measure(lambda: parse(text, backend="fast"), repeat=3)
+        print(f"{name:10s} {text.count(chr(10)):8d} {lark * 1000:10.2f} {fast * 1000:10.2f} {lark / fast:7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
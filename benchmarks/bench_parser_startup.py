@@ -0,0 +1,44 @@
+"""Cold start and warm parse times of `api_schemas.parse`.
+
+Run with `python -m benchmarks.bench_parser_startup`.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import timeit
+
+from api_schemas import parse
+from api_schemas.cache import CACHE_DIR_ENV
+from tests.example_schemas import everything
+
+COLD_START = """\
+import time
+t = time.perf_counter()
+from api_schemas.parser import get_parser
+get_parser()
+print(time.perf_counter() - t)
+"""
+
+
+def cold_start(cache_dir: str) -> float:
+    """Builds the parser in a fresh interpreter and returns the seconds it took."""
+    env = {**os.environ, CACHE_DIR_ENV: cache_dir}
+    out = subprocess.run([sys.executable, "-c", COLD_START], env=env, capture_output=True, text=True, check=True)
+    return float(out.stdout)
+
+
+def main(repeat: int = 5, number: int = 200):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        no_cache = min(cold_start("") for _ in range(repeat))
+        cold_start(cache_dir)   # populate the table cache
+        table_cache = min(cold_start(cache_dir) for _ in range(repeat))
+    parse(everything)
+    warm = min(timeit.repeat(lambda: parse(everything), number=number, repeat=repeat)) / number
+    print(f"cold start (no table cache): {no_cache * 1000:8.2f} ms")
+    print(f"cold start (table cache):    {table_cache * 1000:8.2f} ms")
+    print(f"warm parse:                  {warm * 1000:8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Scaling of `collect_types` on wide and deep schemas. The time per type stays constant, when the walk is linear.
+
+Run with `python -m benchmarks.bench_type_graph`.
+"""
+import time
+
+from api_schemas import parse
+from api_schemas.compilers.base import collect_types
+
+
+def wide(types: int) -> str:
+    """Many types that all use the same shared types."""
+    blocks = ["typedef Shared\n    id: int\n    state: State {open, closed}\n"]
+    for i in range(types):
+        blocks.append(f"typedef T{i}\n    a: $Shared\n    b: $Shared\n    c[]: $Shared\n    d: Inner{i}\n"
+                      f"        s: $Shared\n")
+    return "".join(blocks)
+
+
+def deep(types: int) -> str:
+    """A chain of types, where every type uses the next one."""
+    blocks = [f"typedef T{i}\n    next: $T{i + 1}\n    first: $T0\n" for i in range(types)]
+    blocks.append(f"typedef T{types}\n    i: int\n")
+    return "".join(blocks)
+
+
+def measure(ir, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        collect_types(ir)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    for name, schema in (("wide", wide), ("deep", deep)):
+        for types in (1000, 2000, 4000, 8000):
+            ir = parse(schema(types))
+            duration = measure(ir)
+            print(f"{name} {types:5d} types: {duration * 1000:8.2f} ms {duration / types * 1e6:6.2f} us/type")
+
+
+if __name__ == '__main__':
+    main()
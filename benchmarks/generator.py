@@ -0,0 +1,102 @@
+"""Seeded generator of synthetic schemas and of JSON data, that matches them.
+
+usage:
+```python
+text = generate(SchemaSpec(typedefs=500, width=8, depth=2, communications=50, ws_events=20, seed=1))
+```
+"""
+import random
+from dataclasses import dataclass
+from typing import Any, List
+
+from api_schemas import Primitive, PrimitiveType, ObjectType, EnumType, TypeAttribute, resolve_type
+
+__all__ = ["SchemaSpec", "generate", "sample_json"]
+
+PRIMITIVES = ("str", "int", "float", "bool", "any")
+INDENT = "    "
+
+
+@dataclass(frozen=True)
+class SchemaSpec:
+    typedefs: int = 100
+    width: int = 8              # attributes of every object
+    depth: int = 2              # levels of nested objects below a typedef
+    communications: int = 10
+    ws_events: int = 10         # events of the client and of the server
+    seed: int = 0
+
+
+def generate(spec: SchemaSpec) -> str:
+    """The same spec always generates the same schema.
+
+    The first tenth of the typedefs are leaves without references, the other typedefs reference only leaves. The size
+    of a type with all its referenced types therefore grows linear with the spec and not exponential.
+    """
+    rnd = random.Random(spec.seed)
+    out: List[str] = []
+    leaves = max(spec.typedefs // 10, 1)
+    for i in range(spec.typedefs):
+        out.append(f"typedef T{i}\n")
+        _attributes(rnd, out, spec, f"T{i}", 1, spec.depth, 0 if i < leaves else leaves)
+    for i in range(spec.communications):
+        out.append(f"c{i}\n{INDENT}uri = /c{i}/<id>\n")
+        out.append(f"{INDENT}GET\n{INDENT * 2}->\n{INDENT * 3}id: int\n{INDENT * 2}<-\n")
+        out.append(f"{INDENT * 3}200\n")
+        _attributes(rnd, out, spec, f"C{i}Get", 4, spec.depth, spec.typedefs)
+        out.append(f"{INDENT * 3}404\n{INDENT * 4}err_msg: str\n")
+        out.append(f"{INDENT}POST\n{INDENT * 2}->\n")
+        _attributes(rnd, out, spec, f"C{i}Post", 3, spec.depth, spec.typedefs)
+        out.append(f"{INDENT * 2}<-\n{INDENT * 3}201\n")
+    if spec.ws_events:
+        out.append(f"WS\n{INDENT}->\n")
+        for i in range(spec.ws_events):
+            out.append(f"{INDENT * 2}client{i}\n")
+            _attributes(rnd, out, spec, f"Client{i}", 3, spec.depth, spec.typedefs)
+        out.append(f"{INDENT}<-\n")
+        for i in range(spec.ws_events):
+            out.append(f"{INDENT * 2}server{i}\n")
+            _attributes(rnd, out, spec, f"Server{i}", 3, spec.depth, spec.typedefs)
+    return "".join(out)
+
+
+def _attributes(rnd: random.Random, out: List[str], spec: SchemaSpec, prefix: str, indent: int, depth: int,
+                references: int):
+    """Writes `spec.width` attributes. The first one is a nested object, until the depth is reached. References
+    point to one of the first `references` typedefs."""
+    ind = INDENT * indent
+    for k in range(max(spec.width, 1)):
+        modifiers = ("?" if rnd.random() < 0.2 else "", "[]" if rnd.random() < 0.2 else "")
+        name = f"{modifiers[0]}a{k}{modifiers[1]}"
+        kind = rnd.random()
+        if depth > 0 and (k == 0 or kind < 0.1):
+            out.append(f"{ind}{name}: {prefix}O{k}\n")
+            _attributes(rnd, out, spec, f"{prefix}O{k}", indent + 1, depth - 1, references)
+        elif references and kind < 0.35:
+            out.append(f"{ind}{name}: $T{rnd.randrange(references)}\n")
+        elif kind < 0.45:
+            out.append(f"{ind}{name}: {prefix}E{k}{{A, B, C}}\n")
+        else:
+            out.append(f"{ind}{name}: {rnd.choice(PRIMITIVES)}\n")
+
+
+_PRIMITIVE_VALUES = {Primitive.Str: "text", Primitive.Int: 42, Primitive.Float: 1.5, Primitive.Bool: True,
+                     Primitive.Any: 7}
+
+
+def sample_json(t, array_length: int = 2) -> Any:
+    """JSON data of the type. All optional attributes are set."""
+    t = resolve_type(t)
+    if type(t) is ObjectType:
+        return {a.name: _sample_attribute(a, array_length) for a in t.attributes}
+    elif type(t) is EnumType:
+        return t.values[0]
+    elif type(t) is PrimitiveType:
+        return _PRIMITIVE_VALUES[t.primitive]
+    raise TypeError(t)
+
+
+def _sample_attribute(attribute: TypeAttribute, array_length: int) -> Any:
+    if attribute.is_array:
+        return [sample_json(attribute.type, array_length) for _ in range(array_length)]
+    return sample_json(attribute.type, array_length)
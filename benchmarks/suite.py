@@ -0,0 +1,163 @@
+"""Benchmark suite of parsing, code generation and the generated `from_json`/`to_json` on synthetic schemas.
+
+Run with `python -m benchmarks.suite`. The results are compared to a baseline, that is saved with `--save-baseline`:
+```
+python -m benchmarks.suite --save-baseline baseline.json     # before a change
+python -m benchmarks.suite --baseline baseline.json          # fails, when a benchmark got slower than the threshold
+```
+Every result is the best time of one call in seconds, lower is better. The json results are per object.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from api_schemas import __version__, parse
+from api_schemas.compilers.base import NameTypes
+from api_schemas.compilers.dart import DartCompiler
+from api_schemas.compilers.python import PythonCompiler
+from api_schemas.compilers.template_registry import templates
+from benchmarks.generator import SchemaSpec, generate, sample_json
+
+PRESETS: Dict[str, SchemaSpec] = {
+    "small": SchemaSpec(typedefs=20, width=6, depth=1, communications=5, ws_events=5),
+    "medium": SchemaSpec(typedefs=200, width=8, depth=2, communications=40, ws_events=20),
+    "large": SchemaSpec(typedefs=1000, width=12, depth=3, communications=200, ws_events=100),
+    "wide": SchemaSpec(typedefs=50, width=80, depth=1, communications=0, ws_events=0),
+    "deep": SchemaSpec(typedefs=50, width=3, depth=12, communications=0, ws_events=0),
+}
+
+COMPILERS = {"python": PythonCompiler, "dart": DartCompiler}
+
+DEFAULT_THRESHOLD = 0.15     # 15% slower is a regression
+RESULTS_VERSION = 1
+
+
+def measure(fn: Callable[[], object], repeat: int = 5, min_time: float = 0.1) -> float:
+    """Best time of a single call. Every repetition calls `fn` often enough to run at least `min_time` seconds."""
+    start = time.perf_counter()
+    fn()
+    number = max(1, int(min_time / max(time.perf_counter() - start, 1e-9)))
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def bench_preset(name: str, spec: SchemaSpec, targets: Sequence[str], repeat: int) -> Dict[str, float]:
+    text = generate(spec)
+    results = {f"parse/{name}": measure(lambda: parse(text), repeat)}
+    for target in targets:
+        compiler = COMPILERS[target]()
+        template = templates.get(target)
+        results[f"compile_dataclasses/{target}/{name}"] = \
+            measure(lambda: compiler.compile_dataclasses(text, template), repeat)
+    if "python" in targets:
+        results.update(bench_json(name, text, repeat))
+    return results
+
+
+def bench_json(name: str, text: str, repeat: int) -> Dict[str, float]:
+    """Time of `from_json` and `to_json` of the generated python classes, per object of every typedef."""
+    ir = parse(text)
+    compiler = PythonCompiler()
+    scope = {}
+    exec(PythonCompiler().compile_dataclasses(text, templates.get("python")), scope)
+    cases: List[Tuple[type, dict]] = []
+    for typedef in ir.global_types:
+        cls = scope[compiler.format_name(typedef.name, NameTypes.CLASS)]
+        cases.append((cls, sample_json(typedef.type)))
+    objects = [cls.from_json(data) for cls, data in cases]
+
+    def from_json():
+        for cls, data in cases:
+            cls.from_json(data)
+
+    def to_json():
+        for obj in objects:
+            obj.to_json()
+
+    return {
+        f"from_json/python/{name}": measure(from_json, repeat) / len(cases),
+        f"to_json/python/{name}": measure(to_json, repeat) / len(cases),
+    }
+
+
+def run(presets: Sequence[str], targets: Sequence[str], repeat: int = 5, filter_: str = None) -> dict:
+    results = {}
+    for name in presets:
+        for key, seconds in bench_preset(name, PRESETS[name], targets, repeat).items():
+            if filter_ is None or filter_ in key:
+                results[key] = seconds
+    return {
+        "version": RESULTS_VERSION,
+        "meta": {
+            "api_schemas": __version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "presets": {name: asdict(PRESETS[name]) for name in presets},
+        },
+        "results": results,
+    }
+
+
+def compare(results: dict, baseline: dict,
+            threshold: float = DEFAULT_THRESHOLD) -> List[Tuple[str, float, float, bool]]:
+    """Compares the benchmarks, that are in both. Returns (name, baseline seconds, seconds, regressed)."""
+    rows = []
+    for name, seconds in results["results"].items():
+        base = baseline["results"].get(name)
+        if base is not None:
+            rows.append((name, base, seconds, seconds > base * (1 + threshold)))
+    return rows
+
+
+def _format_time(seconds: float) -> str:
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:9.2f} ms"
+    return f"{seconds * 1e6:9.2f} us"
+
+
+def main(argv: Sequence[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("-p", "--preset", action="append", choices=list(PRESETS),
+                        help="Schema sizes to run. Defaults to small and medium")
+    parser.add_argument("-t", "--target", action="append", choices=list(COMPILERS), help="Defaults to all")
+    parser.add_argument("-k", "--filter", help="Only benchmarks, whose name contains the text")
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument("-o", "--out", type=Path, help="Writes the results as JSON")
+    parser.add_argument("--baseline", type=Path, help="Compares the results to a saved baseline")
+    parser.add_argument("--save-baseline", type=Path, help="Writes the results as new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Relative slowdown, that is a regression (default: {DEFAULT_THRESHOLD})")
+    args = parser.parse_args(argv)
+
+    results = run(args.preset or ["small", "medium"], args.target or list(COMPILERS), args.repeat, args.filter)
+    for path in (args.out, args.save_baseline):
+        if path:
+            path.write_text(json.dumps(results, indent=1), encoding="utf8")
+    if not args.baseline:
+        for name, seconds in results["results"].items():
+            print(f"{name:40s} {_format_time(seconds)}")
+        return 0
+    rows = compare(results, json.loads(args.baseline.read_text(encoding="utf8")), args.threshold)
+    for name, base, seconds, regressed in rows:
+        print(f"{name:40s} {_format_time(base)} -> {_format_time(seconds)} {seconds / base - 1:+7.1%}"
+              + ("  REGRESSION" if regressed else ""))
+    regressions = sum(1 for row in rows if row[3])
+    if regressions:
+        print(f"{regressions} benchmark(s) regressed by more than {args.threshold:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,14 @@
+import tempfile
+import unittest
+from unittest import mock
+
+from api_schemas.cache import CACHE_DIR_ENV
+
+
+def use_temporary_cache_dir(test: unittest.TestCase):
+    """Points the on-disk caches to a directory of the test, so tests neither fill nor depend on the user's cache."""
+    directory = tempfile.TemporaryDirectory()
+    test.addCleanup(directory.cleanup)
+    patcher = mock.patch.dict("os.environ", {CACHE_DIR_ENV: directory.name})
+    patcher.start()
+    test.addCleanup(patcher.stop)
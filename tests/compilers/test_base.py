@@ -0,0 +1,98 @@
+import unittest
+
+from api_schemas import parse
+from api_schemas.compilers.base import collect_types, CaseConverter, NameFormat, NameFormatter, NameTypes
+from api_schemas.compilers.python import PythonCompiler
+from api_schemas.interning import intern_types
+from tests.example_schemas import everything, websockets_3
+
+shared = """\
+typedef A
+    x: $Shared
+    y: $Shared
+    b: B
+        s: $Shared
+        e: E {X, Y}
+
+typedef Shared
+    v: int
+
+typedef C
+    s[]: $Shared
+    a: $A
+"""
+
+
+def names(ir):
+    return [t.name for t in collect_types(ir)]
+
+
+class TestCollectTypes(unittest.TestCase):
+
+    def test_once(self):
+        self.assertEqual(["Shared", "E", "B", "A", "C"], names(parse(shared)))
+
+    def test_dependency_order(self):
+        types = names(parse(everything))
+        self.assertEqual(len(set(types)), len(types))
+        self.assertLess(types.index("E"), types.index("Example"))
+        self.assertLess(types.index("Example"), types.index("Q"))
+        self.assertIn("event_data_a", types)
+        self.assertLess(types.index("Name"), types.index("event_data_a"))
+
+    def test_nested_types_of_globals(self):
+        self.assertIn("D", names(parse(everything)))
+
+    def test_interned(self):
+        schema = "typedef A\n    e: E {X, Y}\ntypedef B\n    e: E {X, Y}\n"
+        self.assertEqual(["E", "A", "E", "B"], names(parse(schema)))
+        self.assertEqual(["E", "A", "B"], names(intern_types(parse(schema))))
+
+    def test_recursive(self):
+        self.assertEqual(["B", "A"], names(parse("typedef A\n    b: $B\ntypedef B\n    a: $A\n")))
+
+    def test_websockets(self):
+        self.assertEqual(["X", "event_data_join"], names(parse(websockets_3)))
+        self.assertEqual(["A"], names(parse("typedef A\n    i: int\n")))   # no WS block
+
+    def test_deep(self):
+        depth = 5000
+        schema = "".join(f"typedef T{i}\n    next: $T{i + 1}\n" for i in range(depth))
+        schema += f"typedef T{depth}\n    i: int\n"
+        self.assertEqual([f"T{i}" for i in range(depth, -1, -1)], names(parse(schema)))
+
+
+class TestNameFormatter(unittest.TestCase):
+
+    def test_case_converter(self):
+        self.assertEqual("user_id", CaseConverter.convert_unknown("userId", CaseConverter.SNAKE))
+        self.assertEqual("user_id", CaseConverter.convert_unknown("UserId", CaseConverter.SNAKE))
+        self.assertEqual("UserId", CaseConverter.convert_unknown("user_id", CaseConverter.PASCAL))
+        self.assertEqual("USER_ID", CaseConverter.convert_unknown("userId", CaseConverter.UPPER))
+        self.assertEqual("userId", CaseConverter.convert_unknown("user_id", CaseConverter.CAMEL))
+
+    def test_memoized(self):
+        formatter = NameFormatter({NameTypes.CLASS: NameFormat(CaseConverter.PASCAL, "API{}"),
+                                   NameTypes.ATTRIBUTE: NameFormat(CaseConverter.SNAKE)})
+        self.assertEqual("APIUserId", formatter.format("user_id", NameTypes.CLASS))
+        self.assertEqual("APIUserId", formatter.format("user_id", NameTypes.CLASS))
+        self.assertEqual("user_id", formatter.format("userId", NameTypes.ATTRIBUTE))
+        info = formatter.cache_info()
+        self.assertEqual((1, 2), (info.hits, info.misses))
+
+    def test_bounded(self):
+        formatter = NameFormatter({NameTypes.CLASS: NameFormat(CaseConverter.PASCAL)}, max_size=10)
+        for i in range(100):
+            formatter.format(f"name_{i}", NameTypes.CLASS)
+        self.assertEqual(10, formatter.cache_info().currsize)
+
+    def test_compiler(self):
+        compiler = PythonCompiler()
+        self.assertIs(compiler.name_formatter, compiler.name_formatter)
+        self.assertEqual("APIUserItem", compiler.format_name("user_item", NameTypes.CLASS))
+        self.assertEqual("APIUserItem", compiler.format_name("user_item", NameTypes.CLASS))
+        self.assertEqual(1, compiler.name_formatter.cache_info().hits)
+
+
+if __name__ == '__main__':
+    unittest.main()
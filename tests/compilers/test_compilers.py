@@ -1,6 +1,7 @@
 import unittest
+from api_schemas import compilers
 from api_schemas.compilers import python, dart
-from tests.example_schemas import everything
+from tests.example_schemas import everything, websockets_2
 
 
 class TestCompilers(unittest.TestCase):
@@ -14,3 +15,39 @@ class TestCompilers(unittest.TestCase):
     def test_dart(self):
         res = dart.convert(everything)
         # print(res)
+
+    def test_recursive_types(self):
+        res = python.convert("typedef Node\n\tvalue: int\n\t?next: $Node\n\tchildren[]: $Node\n" + websockets_2)
+        scope = {}
+        exec(res, scope)
+        node = scope["APINode"].from_json({"value": 1, "children": [{"value": 2, "children": []}]})
+        self.assertEqual(2, node.children[0].value)
+
+    def test_python_json_round_trip(self):
+        res = python.convert("typedef A\n\ti[]: int\n\te[]: E{x, y}\n\to[]: $B\n\t?b: $B\ntypedef B\n\tv: str\n")
+        scope = {}
+        exec(res, scope)
+        data = {"i": [1, 2], "e": ["y", "x"], "o": [{"v": "a"}], "b": {"v": "b"}}
+        self.assertEqual(data, scope["APIA"].from_json(data).to_json())
+
+    def test_python_pep8(self):
+        import autopep8
+        for schema in (everything, websockets_2, "typedef E {A, B}\n", "typedef O\n\t?o: int\n"):
+            with self.subTest(schema=schema):
+                res = python.convert(schema)
+                self.assertEqual(autopep8.fix_code(res), res)
+                self.assertEqual(res, python.convert(schema, run_autopep8=True))
+
+
+class TestCompilerRegistry(unittest.TestCase):
+
+    def test_get_compiler(self):
+        self.assertIs(python, compilers.get_compiler("python"))
+        self.assertIs(dart, compilers.dart)
+        self.assertEqual(["python", "dart"], compilers.available_compilers()[:2])
+
+    def test_unknown_compiler(self):
+        with self.assertRaises(ValueError):
+            compilers.get_compiler("java")
+        with self.assertRaises(AttributeError):
+            compilers.java
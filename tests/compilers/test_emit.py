@@ -0,0 +1,84 @@
+import importlib
+import sys
+import tempfile
+import unittest
+from io import StringIO
+from pathlib import Path
+
+from api_schemas import parse
+from api_schemas.compilers import python, dart
+from api_schemas.compilers.base import collect_types, group_types
+from tests.example_schemas import everything
+
+recursive = """\
+typedef Node
+    value: int
+    ?next: $Node
+    ?other: $Other
+typedef Other
+    node: $Node
+    week: $Week
+"""
+
+
+class TestEmit(unittest.TestCase):
+
+    def test_stream_same_as_convert(self):
+        for compiler in (python, dart):
+            with self.subTest(compiler=compiler.__name__):
+                out = StringIO()
+                compiler.write_ir(parse(everything), out)
+                self.assertEqual(compiler.convert(everything), out.getvalue())
+
+    def test_stream_writes_per_class(self):
+        class Sink(StringIO):
+            writes = 0
+
+            def write(self, s):
+                Sink.writes += 1
+                return super().write(s)
+
+        ir = parse(everything)
+        python.write_ir(ir, Sink())
+        self.assertEqual(len(collect_types(ir)) + 4, Sink.writes)
+
+    def test_group_types(self):
+        groups = group_types(collect_types(parse(everything + recursive)))
+        names = [[t.name for t in group] for group in groups]
+        self.assertIn(["Other", "Node"], names)
+        self.assertLess(names.index(["Week"]), names.index(["Other", "Node"]))
+        self.assertEqual(len(collect_types(parse(everything + recursive))), sum(len(g) for g in groups))
+
+    def test_split_python(self):
+        with tempfile.TemporaryDirectory() as directory:
+            package = Path(directory).joinpath("generated_split")
+            paths = python.write_split(parse(everything + recursive), package)
+            self.assertIn(package.joinpath("week.py"), paths)
+            self.assertIn("from .example import APIExample\n", package.joinpath("q.py").read_text())
+            recursive_module = package.joinpath("other.py").read_text()     # recursive types share a file
+            self.assertIn("class APINode:", recursive_module)
+            self.assertIn("class APIOther:", recursive_module)
+            sys.path.insert(0, directory)
+            try:
+                node = importlib.import_module("generated_split.other")
+                q = importlib.import_module("generated_split.q")
+                data = {"value": 1, "other": {"node": {"value": 2}, "week": "Monday"}}
+                self.assertEqual(2, node.APINode.from_json(data).other.node.value)
+                self.assertTrue(hasattr(q, "APIQ"))
+            finally:
+                sys.path.remove(directory)
+                for name in list(sys.modules):
+                    if name.startswith("generated_split"):
+                        del sys.modules[name]
+
+    def test_split_dart(self):
+        with tempfile.TemporaryDirectory() as directory:
+            paths = dart.write_split(parse(everything), directory)
+            q = Path(directory).joinpath("q.dart")
+            self.assertIn(q, paths)
+            self.assertIn("import 'example.dart';", q.read_text())
+            self.assertIn("class APIQ {", q.read_text())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from api_schemas import parse
+from api_schemas.compilers import python, dart
+from api_schemas.compilers.base import FragmentCache
+from api_schemas.compilers.output import ChangedFileWriter
+from api_schemas.compilers.pipeline import compile_targets
+from tests.example_schemas import everything
+
+changed = everything.replace("    a: $Example\n", "    a: $Example\n    c: int\n")   # typedef Q
+
+
+class TestFragmentCache(unittest.TestCase):
+
+    def test_unchanged(self):
+        fragments = FragmentCache()
+        first = python.convert_ir(parse(everything), fragments=fragments)
+        misses = fragments.misses
+        self.assertEqual(python.convert(everything), first)
+        self.assertEqual(first, python.convert_ir(parse(everything), fragments=fragments))
+        self.assertEqual(misses, fragments.misses)
+        self.assertEqual(misses, fragments.hits)
+
+    def test_changed_type(self):
+        fragments = FragmentCache()
+        python.convert_ir(parse(everything), fragments=fragments)
+        misses = fragments.misses
+        res = python.convert_ir(parse(changed), fragments=fragments)
+        self.assertEqual(python.convert(changed), res)
+        self.assertEqual(misses + 1, fragments.misses)
+
+    def test_changed_attribute_type(self):
+        fragments = FragmentCache()
+        python.convert_ir(parse(everything), fragments=fragments)
+        misses = fragments.misses
+        schema = everything.replace("    b: int\n", "    b: float\n")   # Example, used by Q
+        self.assertEqual(python.convert(schema), python.convert_ir(parse(schema), fragments=fragments))
+        self.assertEqual(misses + 1, fragments.misses)
+
+    def test_compilers(self):
+        fragments = FragmentCache()
+        outputs = compile_targets(everything, fragments=fragments)
+        self.assertEqual(python.convert(everything), outputs["python"])
+        self.assertEqual(dart.convert(everything), outputs["dart"])
+        self.assertEqual(0, fragments.hits)
+
+    def test_max_size(self):
+        fragments = FragmentCache(max_size=3)
+        python.convert_ir(parse(everything), fragments=fragments)
+        self.assertEqual(3, len(fragments))
+
+
+class TestWriteIfChanged(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name).joinpath("api.py")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, content: str) -> bool:
+        with ChangedFileWriter(self.path) as out:
+            for i in range(0, len(content), 3):
+                out.write(content[i:i + 3])
+        return out.changed
+
+    def test_changed_file_writer(self):
+        self.assertTrue(self.write("abcdefg"))
+        os.utime(self.path, (0, 0))
+        self.assertFalse(self.write("abcdefg"))
+        self.assertEqual(0, self.path.stat().st_mtime)
+        self.assertTrue(self.write("abcdef"))
+        self.assertTrue(self.write("abcdefgh"))
+        self.assertTrue(self.write("abXdefgh"))
+        self.assertEqual("abXdefgh", self.path.read_text())
+        self.assertEqual([self.path], list(self.path.parent.iterdir()))
+
+    def test_error(self):
+        self.write("abc")
+        with self.assertRaises(ValueError):
+            with ChangedFileWriter(self.path) as out:
+                out.write("x")
+                raise ValueError()
+        self.assertEqual("abc", self.path.read_text())
+        self.assertEqual([self.path], list(self.path.parent.iterdir()))
+
+    def test_write_file(self):
+        fragments = FragmentCache()
+        self.assertTrue(python.write_file(parse(everything), self.path, fragments))
+        self.assertEqual(python.convert(everything), self.path.read_text())
+        self.assertFalse(python.write_file(parse(everything), self.path, fragments))
+        self.assertTrue(python.write_file(parse(changed), self.path, fragments))
+        self.assertEqual(python.convert(changed), self.path.read_text())
+
+    def test_write_split(self):
+        directory = Path(self.directory.name)
+        python.write_split(parse(everything), directory)
+        for path in directory.iterdir():
+            os.utime(path, (0, 0))
+        python.write_split(parse(changed), directory)
+        changed_files = [p.name for p in directory.iterdir() if p.stat().st_mtime != 0]
+        self.assertEqual(["q.py"], changed_files)
+
+
+if __name__ == '__main__':
+    unittest.main()
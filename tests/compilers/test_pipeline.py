@@ -0,0 +1,47 @@
+import unittest
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from unittest import mock
+
+from api_schemas import parse
+from api_schemas import parser
+from api_schemas.compilers import python, dart
+from api_schemas.compilers.pipeline import compile_targets
+from tests.example_schemas import everything
+
+
+class TestPipeline(unittest.TestCase):
+
+    def test_same_as_convert(self):
+        outputs = compile_targets(everything)
+        self.assertEqual(["python", "dart"], list(outputs))
+        self.assertEqual(python.convert(everything), outputs["python"])
+        self.assertEqual(dart.convert(everything), outputs["dart"])
+
+    def test_one_parse(self):
+        with mock.patch.object(parser, "parse", wraps=parse) as parse_mock:
+            compile_targets(everything, ["python", "dart"])
+        self.assertEqual(1, parse_mock.call_count)
+
+    def test_ir(self):
+        ir = parse(everything)
+        with ThreadPoolExecutor(2) as executor:
+            outputs = compile_targets(ir, ["dart", "python"], executor)
+        self.assertEqual(["dart", "python"], list(outputs))
+        self.assertEqual(python.convert(everything), outputs["python"])
+
+    def test_process_pool(self):
+        with ProcessPoolExecutor(2) as executor:
+            outputs = compile_targets(everything, ["python", "dart"], executor)
+        self.assertEqual(python.convert(everything), outputs["python"])
+        self.assertEqual(dart.convert(everything), outputs["dart"])
+
+    def test_single_target(self):
+        self.assertEqual(["dart"], list(compile_targets(everything, ["dart"])))
+
+    def test_unknown_target(self):
+        with self.assertRaises(ValueError):
+            compile_targets(everything, ["java"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import mako.template
+
+from api_schemas.compilers import python
+from api_schemas.compilers.template_registry import TemplateRegistry, TEMPLATE_DIR, templates
+from tests import use_temporary_cache_dir
+from tests.example_schemas import everything
+
+override = """\
+<%def name="header(imports)">HEADER
+</%def>\\
+<%def name="enums_begin()"></%def>\\
+<%def name="enum_def(enum)">enum ${enum.name}
+</%def>\\
+<%def name="classes_begin()"></%def>\\
+<%def name="class_def(cls)">class ${cls.name}
+</%def>\\
+<%def name="end()"></%def>\\
+"""
+
+
+class TestTemplateRegistry(unittest.TestCase):
+
+    def setUp(self):
+        use_temporary_cache_dir(self)
+        self.directory = tempfile.TemporaryDirectory()
+        self.module_directory = Path(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def registry(self) -> TemplateRegistry:
+        registry = TemplateRegistry(self.module_directory)
+        registry.register("python", TEMPLATE_DIR.joinpath("python.mako"))
+        return registry
+
+    def test_lazy(self):
+        registry = self.registry()
+        self.assertEqual([], list(self.module_directory.iterdir()))
+        template = registry.get("python")
+        self.assertIs(template, registry.get("python"))
+        self.assertEqual(1, len(list(self.module_directory.glob("python_*.py"))))
+
+    def test_module_cache(self):
+        self.registry().get("python")
+        with mock.patch.object(mako.template, "_compile_module_file", wraps=mako.template._compile_module_file) as m:
+            self.registry().get("python")
+        self.assertEqual(0, m.call_count)
+
+    def test_override(self):
+        registry = self.registry()
+        registry.override("python", override)
+        self.assertEqual("HEADER\n", registry.get("python").get_def("header").render(imports=[]))
+        template_file = Path(self.directory.name).joinpath("override.mako")
+        template_file.write_text(override)
+        registry.override("python", template_file)
+        self.assertEqual("HEADER\n", registry.get("python").get_def("header").render(imports=[]))
+        self.assertEqual(2, len(list(self.module_directory.glob("python_*.py"))))
+        registry.reset("python")
+        self.assertIn("@dataclass", registry.get("python").source)
+        with self.assertRaises(KeyError):
+            registry.override("java", override)
+
+    def test_override_compiler(self):
+        templates.override("python", override)
+        try:
+            res = python.convert(everything)
+        finally:
+            templates.reset("python")
+        self.assertTrue(res.startswith("HEADER\n"))
+        self.assertIn("class APIExample\n", res)
+        self.assertIn("enum APIWeek\n", res)
+        self.assertIn("@dataclass", python.convert(everything))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from api_schemas import parse, SchemaError
+from api_schemas.blocks import split_blocks, parse_parallel
+from .example_schemas import everything, typedef_everything
+
+
+class TestBlocks(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.executor = ThreadPoolExecutor(4)
+
+    def tearDown(self) -> None:
+        self.executor.shutdown()
+
+    def assert_same_error(self, text: str):
+        with self.assertRaises(SchemaError) as serial:
+            parse(text)
+        with self.assertRaises(SchemaError) as parallel:
+            parse_parallel(text, self.executor)
+        self.assertEqual(str(serial.exception), str(parallel.exception))
+
+    def test_split(self):
+        blocks = split_blocks("# comment\nx = 1\n\ntypedef A\n    a: int\n# b\ntypedef B {X}\n")
+        self.assertEqual([1, 4, 7], [b.line for b in blocks])
+        self.assertEqual("# comment\nx = 1\n\n", blocks[0].text)
+        self.assertEqual("typedef A\n    a: int\n# b\n", blocks[1].text)
+
+    def test_same_as_serial(self):
+        self.assertEqual(parse(everything), parse_parallel(everything, self.executor))
+        big = "\n".join(f"typedef T{i}\n    a: $T{i - 1}\n    b: E{i} {{A, B}}\n" for i in range(1, 100))
+        big = "typedef T0 int\n" + big + "typedef Q $T99\n"
+        self.assertEqual(parse(big), parse_parallel(big, self.executor))
+
+    def test_empty(self):
+        for text in ("", "\n"):
+            self.assertEqual(parse(text), parse_parallel(text, self.executor))
+
+    def test_shared_types(self):
+        res = parse_parallel(typedef_everything, self.executor)
+        q = res.global_types[3]
+        self.assertIs(res.global_types[2], q.type.attributes[0].type.typedef)
+        self.assertIs(q, res.global_types[4].type.typedef)
+
+    def test_process_pool(self):
+        self.assertEqual(parse(everything), parse_parallel(everything))
+
+    def test_errors(self):
+        self.assert_same_error("typedef A\n    a: int\ntypedef Y\n\tx: $X\n")
+        self.assert_same_error("typedef A $B\ntypedef B $A\n")
+        self.assert_same_error("x = 1\npeople\n\tGET\n\t\t->\n\t\t<-\n")
+        self.assert_same_error("x = 1\ntypedef\ntypedef B\n    b: $C\n")
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+import zlib
+from unittest import mock
+
+from api_schemas import parse
+from api_schemas.cache import IRCache
+from api_schemas.compilers import python
+from . import use_temporary_cache_dir
+from .example_schemas import everything, typedef_everything, websockets_3
+
+
+class TestIRCache(unittest.TestCase):
+
+    def setUp(self) -> None:
+        use_temporary_cache_dir(self)
+        self.dir = tempfile.TemporaryDirectory()
+        self.cache = IRCache(self.dir.name)
+
+    def tearDown(self) -> None:
+        self.dir.cleanup()
+
+    def test_hit_skips_parsing(self):
+        expected = parse(everything, cache=self.cache)
+        self.assertEqual((0, 1), (self.cache.hits, self.cache.misses))
+        with mock.patch("api_schemas.parser.ParserSession.parse") as session_parse:
+            res = parse(everything, cache=self.cache)
+            session_parse.assert_not_called()
+        self.assertEqual(expected, res)
+        self.assertEqual((1, 1), (self.cache.hits, self.cache.misses))
+
+    def test_shared_types_stay_shared(self):
+        res = parse(typedef_everything, cache=self.cache)
+        res = IRCache(self.dir.name).get(typedef_everything)
+        q = res.global_types[3].type
+        self.assertIs(res.global_types[2], q.attributes[0].type.typedef)
+
+    def test_lru_eviction(self):
+        parse(everything, cache=self.cache)
+        parse(typedef_everything, cache=self.cache)
+        self.cache.max_size = sum(p.stat().st_size for p in self.cache._entries()) + 1
+        path = self.cache._path(self.cache.key(everything))
+        os.utime(path, (0, 0))     # least recently used
+        self.cache.get(typedef_everything)
+        parse(websockets_3, cache=self.cache)
+        self.assertFalse(path.exists())
+        self.assertIsNotNone(self.cache.get(typedef_everything))
+
+    def test_corrupt_entry(self):
+        parse(everything, cache=self.cache)
+        self.cache._path(self.cache.key(everything)).write_bytes(b"garbage")
+        self.assertIsNone(self.cache.get(everything))
+        self.assertEqual(parse(everything), parse(everything, cache=self.cache))
+
+    def test_unpickling_error(self):
+        parse(everything, cache=self.cache)
+        path = self.cache._path(self.cache.key(everything))
+        path.write_bytes(zlib.compress(b"\x80\x04K\x01)R."))     # calls 1(), raises TypeError
+        self.assertIsNone(self.cache.get(everything))
+        self.assertFalse(path.exists())
+
+    def test_size_of_replaced_entries(self):
+        parse(everything, cache=self.cache)
+        size = self.cache._size
+        ir = parse(everything)
+        for _ in range(3):
+            self.cache.put(everything, ir)
+        self.assertEqual(size, self.cache._size)
+        self.assertEqual(size, sum(p.stat().st_size for p in self.cache._entries()))
+
+    def test_compiler(self):
+        self.assertEqual(python.convert(everything), python.convert(everything, cache=self.cache))
+        self.assertEqual(python.convert(everything), python.convert(everything, cache=self.cache))
+        self.assertEqual(1, self.cache.hits)
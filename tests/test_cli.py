@@ -0,0 +1,145 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from api_schemas.cli import main, find_schemas, MANIFEST_NAME
+from api_schemas.compilers import python, dart
+from .example_schemas import everything, websockets_2
+
+
+class TestCli(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.dir.name)
+        self.schemas = self.root.joinpath("schemas")
+        self.out = self.root.joinpath("out")
+        self.schemas.joinpath("sub").mkdir(parents=True)
+        self.schemas.joinpath("a.schema").write_text(everything)
+        self.schemas.joinpath("sub", "b.schema").write_text(websockets_2)
+        self.schemas.joinpath("notes.txt").write_text("not a schema")
+
+    def tearDown(self) -> None:
+        self.dir.cleanup()
+
+    def run_cli(self, *args: str):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            code = main([str(self.schemas), "-o", str(self.out), *args])
+        return code, stdout.getvalue(), stderr.getvalue()
+
+    def test_compile(self):
+        code, stdout, _ = self.run_cli("-j", "1")
+        self.assertEqual(0, code)
+        self.assertEqual(python.convert(everything), self.out.joinpath("python", "a.py").read_text())
+        self.assertEqual(dart.convert(websockets_2), self.out.joinpath("dart", "sub", "b.dart").read_text())
+        self.assertIn("2 compiled, 0 unchanged, 0 failed", stdout)
+        self.assertTrue(self.out.joinpath(MANIFEST_NAME).exists())
+
+    def test_process_pool(self):
+        code, stdout, _ = self.run_cli("-j", "2", "-t", "python")
+        self.assertEqual(0, code)
+        self.assertEqual(["a.py", "sub"], sorted(os.listdir(self.out.joinpath("python"))))
+        self.assertFalse(self.out.joinpath("dart").exists())
+
+    def test_skip_unchanged(self):
+        self.run_cli("-j", "1")
+        mtime = self.out.joinpath("python", "a.py").stat().st_mtime_ns
+        self.schemas.joinpath("sub", "b.schema").write_text(websockets_2 + "\ntypedef Extra\n    i: int\n")
+        _, stdout, _ = self.run_cli("-j", "1")
+        self.assertIn("1 compiled, 1 unchanged, 0 failed", stdout)
+        self.assertEqual(mtime, self.out.joinpath("python", "a.py").stat().st_mtime_ns)
+        self.assertIn("APIExtra", self.out.joinpath("python", "sub", "b.py").read_text())
+        # other options compile again
+        _, stdout, _ = self.run_cli("-j", "1", "-t", "python")
+        self.assertIn("2 compiled", stdout)
+        _, stdout, _ = self.run_cli("-j", "1", "-t", "python", "--force")
+        self.assertIn("2 compiled", stdout)
+
+    def test_missing_output_compiles_again(self):
+        self.run_cli("-j", "1")
+        self.out.joinpath("dart", "a.dart").unlink()
+        _, stdout, _ = self.run_cli("-j", "1")
+        self.assertIn("1 compiled, 1 unchanged", stdout)
+        self.assertTrue(self.out.joinpath("dart", "a.dart").exists())
+
+    def test_errors_are_aggregated(self):
+        self.schemas.joinpath("bad.schema").write_text("typedef A\n    x: $Missing\n")
+        self.schemas.joinpath("bad2.schema").write_text("typedef B\n    y: $Other\ntypedef\n")
+        code, stdout, stderr = self.run_cli("-j", "2")
+        self.assertEqual(1, code)
+        self.assertIn("2 compiled, 0 unchanged, 2 failed", stdout)
+        self.assertIn("2 schema(s) failed", stderr)
+        self.assertIn(f"{self.schemas.joinpath('bad.schema')}:2:", stderr)
+        self.assertIn("name 'Other", stderr)
+        self.assertIn(f"{self.schemas.joinpath('bad2.schema')}:3:", stderr)    # all errors of a schema
+        self.assertTrue(self.out.joinpath("python", "a.py").exists())
+        # failed schemas are not recorded and fail again
+        code, stdout, _ = self.run_cli("-j", "1")
+        self.assertEqual(1, code)
+        self.assertIn("0 compiled, 2 unchanged, 2 failed", stdout)
+
+    def test_imports(self):
+        shared = self.root.joinpath("shared")
+        shared.mkdir()
+        shared.joinpath("money.schema").write_text("typedef Money\n    cents: int\n")
+        self.schemas.joinpath("c.schema").write_text("import money\n\ntypedef Order\n    total: $Money\n")
+        code, _, stderr = self.run_cli("-j", "2", "-t", "python", "-I", str(shared))
+        self.assertEqual(0, code, stderr)
+        self.assertIn("class APIMoney", self.out.joinpath("python", "c.py").read_text())
+        # a changed module compiles the schemas, that import it
+        shared.joinpath("money.schema").write_text("typedef Money\n    cents: int\n    currency: str\n")
+        _, stdout, _ = self.run_cli("-j", "1", "-t", "python", "-I", str(shared))
+        self.assertIn("1 compiled, 2 unchanged", stdout)
+        self.assertIn("currency", self.out.joinpath("python", "c.py").read_text())
+        code, _, stderr = self.run_cli("-j", "1", "-t", "python")
+        self.assertEqual(1, code)
+        self.assertIn(f"{self.schemas.joinpath('c.schema')}:1:8 ERROR: ImportError: no module named 'money'", stderr)
+
+    def test_profile(self):
+        trace = self.root.joinpath("trace.json")
+        code, stdout, _ = self.run_cli("-j", "2", "--profile", str(trace))
+        self.assertEqual(0, code)
+        self.assertIn("transform", stdout)
+        self.assertIn("render", stdout)
+        self.assertIn('"ph": "X"', trace.read_text())
+
+    def test_find_schemas(self):
+        pattern = str(self.schemas.joinpath("**", "*.schema"))
+        schemas = find_schemas([pattern, str(self.schemas.joinpath("a.schema"))])
+        self.assertEqual({self.schemas.joinpath("a.schema"), self.schemas.joinpath("sub", "b.schema")}, set(schemas))
+        relative = find_schemas([str(self.schemas)])[self.schemas.joinpath("sub", "b.schema")]
+        self.assertEqual(Path("sub", "b.schema"), relative)
+
+    def test_glob_keeps_layout(self):
+        self.schemas.joinpath("sub", "a.schema").write_text(websockets_2)
+        pattern = str(self.schemas.joinpath("**", "a.schema"))
+        schemas = find_schemas([pattern])
+        self.assertEqual({Path("a.schema"), Path("sub", "a.schema")}, set(schemas.values()))
+        code = main([pattern, "-o", str(self.out), "-j", "2", "-t", "dart", "-q"])
+        self.assertEqual(0, code)
+        self.assertEqual(dart.convert(websockets_2), self.out.joinpath("dart", "sub", "a.dart").read_text())
+
+    def test_same_output_is_rejected(self):
+        self.schemas.joinpath("sub", "a.schema").write_text(websockets_2)
+        with self.assertRaises(ValueError):
+            find_schemas([str(self.schemas.joinpath("a.schema")), str(self.schemas.joinpath("sub", "a.schema"))])
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            code = main([str(self.schemas.joinpath("a.schema")), str(self.schemas.joinpath("sub", "*.schema")),
+                         "-o", str(self.out)])
+        self.assertEqual(2, code)
+        self.assertIn("would both be compiled to a.schema", stderr.getvalue())
+        self.assertFalse(self.out.exists())
+
+    def test_no_schemas(self):
+        code, _, stderr = self.run_cli("-p", "*.api")
+        self.assertEqual(2, code)
+        self.assertIn("No schemas found", stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+import asyncio
+import contextlib
+import io
+import socket
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from api_schemas import SchemaError
+from api_schemas.compilers import python, dart
+from api_schemas.daemon import Server, Client, DaemonError, main, default_socket_path
+from .example_schemas import everything, websockets_2
+
+
+def start(test: unittest.TestCase, **kwargs) -> Server:
+    directory = tempfile.TemporaryDirectory()
+    test.addCleanup(directory.cleanup)
+    server = Server(Path(directory.name).joinpath("daemon.sock"), **kwargs)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    test.assertTrue(server.ready.wait(10))
+
+    def stop():
+        with Client(server.path) as client:
+            client.shutdown()
+        thread.join(10)
+    test.addCleanup(stop)
+    return server
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "needs unix domain sockets")
+class TestDaemon(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.executor = ThreadPoolExecutor(4)
+        self.addCleanup(self.executor.shutdown)
+        self.server = start(self, executor=self.executor)
+
+    def test_compile(self):
+        with Client(self.server.path) as client:
+            self.assertTrue(client.ping())
+            outputs = client.compile(everything, ["python", "dart"])
+            self.assertEqual(python.convert(everything), outputs["python"])
+            self.assertEqual(dart.convert(everything), outputs["dart"])
+            self.assertEqual(["python", "dart"], list(client.compile(websockets_2)))
+
+    def test_parse(self):
+        with Client(self.server.path) as client:
+            res = client.parse("x = 1\ntypedef A\n    a: int\ntypedef B {X, Y}\n")
+        self.assertEqual({"types": ["A", "B"], "communications": [], "constants": {"x": "1"}}, res)
+
+    def test_check(self):
+        with Client(self.server.path) as client:
+            diagnostics = client.check("typedef\ntypedef A\n    a: $B\n", "a.schema")
+            self.assertEqual([1, 3], [d.position.line_begin for d in diagnostics])
+            self.assertEqual([], client.check(everything))
+
+    def test_errors_dont_stop_the_daemon(self):
+        with Client(self.server.path) as client:
+            with self.assertRaises(SchemaError) as cm:
+                client.compile("typedef A\n    x: $Missing\n", ["python"], "a.schema")
+            self.assertEqual(("a.schema", 2), (cm.exception.file_name, cm.exception.position.line_begin))
+            self.assertIn("a.schema:2:", str(cm.exception))
+            with self.assertRaises(SchemaError):
+                client.parse("typedef\n")
+            with self.assertRaises(DaemonError):
+                client.compile(everything, ["java"])
+            with self.assertRaises(DaemonError):
+                client.request("unknown")
+            self.assertIn("APIExample", client.compile(everything, ["python"])["python"])
+            self.assertEqual(4, client.stats()["errors"])
+
+    def test_concurrent_clients(self):
+        expected = python.convert(everything)
+
+        def run(_):
+            with Client(self.server.path) as client:
+                return [client.compile(everything, ["python"])["python"] for _ in range(3)]
+
+        with ThreadPoolExecutor(4) as executor:
+            results = [r for rs in executor.map(run, range(8)) for r in rs]
+        self.assertEqual([expected] * 24, results)
+
+    def test_refuses_to_replace_a_running_daemon(self):
+        with self.assertRaises(DaemonError):
+            asyncio.run(Server(self.server.path, executor=self.executor).serve())
+        with Client(self.server.path) as client:
+            self.assertTrue(client.ping())
+
+    def test_replaces_a_stale_socket(self):
+        path = self.server.path.with_name("stale.sock")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.bind(str(path))   # nobody listens
+        server = Server(path, executor=self.executor)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        self.assertTrue(server.ready.wait(10))
+        with Client(path) as client:
+            client.shutdown()
+        thread.join(10)
+        self.assertFalse(path.exists())
+
+    def test_shutdown_with_open_connections(self):
+        server = start(self, executor=self.executor)
+        with Client(server.path) as idle, Client(server.path) as client:
+            self.assertTrue(client.ping())
+            self.doCleanups()   # stops the daemon, while the idle client is connected
+            self.assertEqual(b"", idle._file.readline())
+
+    def test_client_command(self):
+        schema = self.server.path.with_name("api.schema")
+        schema.write_text(everything)
+        out = self.server.path.with_name("api.py")
+        self.assertEqual(0, main(["-s", str(self.server.path), "compile", str(schema), "-o", str(out)]))
+        self.assertEqual(python.convert(everything), out.read_text())
+
+
+class TestPlatform(unittest.TestCase):
+
+    def test_without_getuid(self):
+        with mock.patch("api_schemas.daemon.os") as os_module, mock.patch("getpass.getuser", return_value="alice"):
+            del os_module.getuid
+            os_module.environ = {}
+            self.assertEqual("api_schemas-alice.sock", default_socket_path().name)
+
+    def test_without_unix_sockets(self):
+        with mock.patch("api_schemas.daemon.socket") as socket_module:
+            del socket_module.AF_UNIX
+            with self.assertRaises(DaemonError):
+                Client(Path("daemon.sock"))
+            with self.assertRaises(DaemonError):
+                Server(Path("daemon.sock")).serve_forever()
+            stderr = io.StringIO()
+            with contextlib.redirect_stderr(stderr):
+                self.assertEqual(1, main(["-s", "daemon.sock", "ping"]))
+                self.assertEqual(1, main(["-s", "daemon.sock", "serve"]))
+        self.assertIn("the daemon needs unix domain sockets", stderr.getvalue())
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "needs unix domain sockets")
+class TestDaemonProcessPool(unittest.TestCase):
+
+    def test_compile(self):
+        server = start(self, workers=2)
+        with Client(server.path) as client:
+            self.assertEqual(python.convert(everything), client.compile(everything, ["python"])["python"])
+            with self.assertRaises(SchemaError):
+                client.compile("typedef A\n    x: $Missing\n")
+            self.assertEqual(python.convert(websockets_2), client.compile(websockets_2, ["python"])["python"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import tracemalloc
+import unittest
+
+from api_schemas import ObjectType, parse
+from api_schemas.compilers import dart, python
+from api_schemas.interning import intern_types
+
+DEPTH = 10_000
+MEMORY_BUDGET = 64 * 1024 * 1024    # without the schema text itself
+
+
+def nested_schema(depth: int) -> str:
+    """An object with `depth` levels of nested objects. Indented by one space per level."""
+    lines = ["typedef O0"]
+    for i in range(1, depth + 1):
+        lines.append(" " * i + f"o: O{i}")
+    lines.append(" " * (depth + 1) + "v: int")
+    return "\n".join(lines) + "\n"
+
+
+class TestDeepNesting(unittest.TestCase):
+    """Parsing, interning and the compilers don't recurse per nesting level."""
+
+    @classmethod
+    def setUpClass(cls):
+        schema = nested_schema(DEPTH)
+        tracemalloc.start()
+        try:
+            cls.ir = intern_types(parse(schema))
+            cls.peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def test_memory(self):
+        self.assertLess(self.peak, MEMORY_BUDGET)
+
+    def test_parse(self):
+        t = self.ir.global_types[0].type
+        depth = 0
+        while t.attributes[0].name == "o":
+            t = t.attributes[0].type
+            depth += 1
+        self.assertEqual(DEPTH, depth)
+        self.assertIs(ObjectType, type(t))
+        self.assertEqual("v", t.attributes[0].name)
+
+    def test_fast_backend(self):
+        t = parse(nested_schema(DEPTH), backend="fast").global_types[0].type
+        for _ in range(DEPTH):
+            t = t.attributes[0].type
+        self.assertEqual("v", t.attributes[0].name)
+
+    def test_compile(self):
+        for compiler in (python, dart):
+            code = compiler.convert_ir(self.ir)
+            self.assertEqual(DEPTH + 1, code.count("class "), compiler.__name__)
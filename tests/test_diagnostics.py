@@ -0,0 +1,53 @@
+import unittest
+
+from api_schemas import check, parse, Diagnostics, SchemaError
+from api_schemas.error_handling import Context, ErrorLevel
+from api_schemas.parser import ParserSession
+from .example_schemas import everything
+
+
+class TestDiagnostics(unittest.TestCase):
+
+    def test_all_errors(self):
+        text = "typedef A\n    a: int\ntypedef\ntypedef B\n    b: strr x\ntypedef C\n    c: $D\n"
+        diagnostics = check(text, "api.schema")
+        self.assertEqual([3, 5, 7], [d.position.line_begin for d in diagnostics.errors])
+        self.assertEqual([], diagnostics.warnings)
+        self.assertTrue(all(d.level == ErrorLevel.ERROR for d in diagnostics))
+        self.assertIn("name 'D is not defined", diagnostics.errors[2].msg)
+        self.assertTrue(str(diagnostics).startswith("api.schema:3:8 ERROR: SyntaxError"))
+
+    def test_same_as_first_error(self):
+        for text in ("typedef A\n    x: $Missing\n", "people\n\tGET\n\t\t->\n\t\t<-\n", "typedef A $B\ntypedef B $A\n",
+                     "x = 1\ntypedef A\n    a int\n"):
+            with self.subTest(text=text):
+                with self.assertRaises(SchemaError) as cm:
+                    parse(text)
+                self.assertEqual(cm.exception.to_dict(), check(text).errors[0].to_dict())
+
+    def test_recovery(self):
+        diagnostics = check("typedef A\n    a: in%t\ntypedef B\n    ?: int\ntypedef C\n    c: int\n  d: int\n"
+                            "typedef X $Y\ntypedef Y $X\n")
+        self.assertEqual([2, 3, 7, 8, 9], [d.position.line_begin for d in diagnostics])
+        self.assertIn("IndentationError", diagnostics.errors[2].msg)
+        self.assertIn("circular alias", diagnostics.errors[3].msg)
+
+    def test_valid_blocks_are_parsed(self):
+        diagnostics = Diagnostics()
+        ir = ParserSession(diagnostics=diagnostics).parse(everything + "typedef\n")
+        self.assertEqual(1, len(diagnostics))
+        self.assertEqual(parse(everything), ir)
+        self.assertEqual(0, len(check(everything)))
+
+
+class TestContext(unittest.TestCase):
+
+    def test_get_line(self):
+        ctx = Context("f", "a\n\tb\n\nc", None)
+        self.assertEqual(["a", " b", "", "c"], [ctx.get_line(i) for i in range(1, 5)])
+        ctx = Context("f", "x\ny\n", None, line_offset=10)
+        self.assertEqual(["x", "y", ""], [ctx.get_line(i) for i in range(11, 14)])
+
+
+if __name__ == '__main__':
+    unittest.main()
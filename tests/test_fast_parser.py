@@ -0,0 +1,98 @@
+import random
+import unittest
+
+from api_schemas import SchemaError, check, parse
+from api_schemas.fast_parser import parse_fast
+from api_schemas.parser import ParserSession
+from benchmarks.generator import SchemaSpec, generate
+from .example_schemas import typedef_everything, websockets_1, websockets_2, websockets_3, communication_1, \
+    everything
+
+EXAMPLES = [typedef_everything, websockets_1, websockets_2, websockets_3, communication_1, everything,
+            generate(SchemaSpec(typedefs=8, width=4, depth=2, communications=3, ws_events=2)),
+            "", "\n", "# comment\nx = 10 # not a comment\r\n", "typedef A\r\n\tx: int  # comment\r\n",
+            "import common.types\nimport b  # comment\nimportant = 1\nimport = 2\n"]
+
+INVALID = [
+    "typedef A\n    x: int\n    # comment\n    y: int\n",     # comments are empty lines
+    "typedef A\n    x: int\n# comment\n    y: int\n",
+    "typedef A\n    x: interval\n",        # lexed as `int` `erval`
+    "c\n    getter = 1\n    GET\n        ->\n        <-\n            200\n",
+    "typedefs = 1\n",
+    "typedef A\n    x: $B\n",
+    "typedef A\n    x: int\n  y: int\n",
+    "typedef A\n",
+    "c\n    GET\n        ->\n",
+    "  typedef A int\n",
+    "typedef A\n    : int\n",
+    "typedef A $B\ntypedef B $A\n",
+    "import a.\n",
+    "import a b\n",
+]
+
+TOKENS = ["typedef ", "WS", "->", "<-", "GET", "?", "*", "[]", ":", "$", "{", "}", ",", "=", "#", " ", "\t", "\r",
+          "str", "integer", "getter", "import ", "x", "200", "\n", "\n    ", "\n# c\n"]
+
+
+def outcome(text: str, backend: str):
+    try:
+        return parse(text, backend=backend)
+    except SchemaError as e:
+        return e.msg, e.position
+    except Exception as e:
+        return type(e), str(e)
+
+
+def mutate(rnd: random.Random, text: str) -> str:
+    lines = text.split("\n")
+    for _ in range(rnd.randint(1, 3)):
+        i = rnd.randrange(len(lines))
+        op = rnd.randrange(5)
+        if op == 0 and len(lines) > 1:
+            del lines[i]
+        elif op == 1:
+            lines.insert(i, lines[rnd.randrange(len(lines))])
+        elif op == 2:
+            lines[i] = rnd.choice(["", " ", "    ", "\t", "        "]) + lines[i].lstrip(" \t")
+        elif op == 3:
+            j = rnd.randint(0, len(lines[i]))
+            lines[i] = lines[i][:j] + rnd.choice(TOKENS) + lines[i][j:]
+        elif lines[i]:
+            j = rnd.randrange(len(lines[i]))
+            lines[i] = lines[i][:j] + lines[i][j + rnd.randint(1, 4):]
+    return "\n".join(lines)
+
+
+class TestFastParser(unittest.TestCase):
+
+    def assertSameOutcome(self, text: str):
+        self.assertEqual(outcome(text, "lark"), outcome(text, "fast"), repr(text))
+        self.assertEqual([d.to_dict() for d in check(text)], [d.to_dict() for d in check(text, backend="fast")])
+
+    def test_examples(self):
+        for text in EXAMPLES:
+            with self.subTest(text=text):
+                self.assertIsNotNone(parse_fast(text + "\n", ParserSession()))    # not parsed by lark
+                self.assertSameOutcome(text)
+
+    def test_errors(self):
+        for text in INVALID:
+            with self.subTest(text=text):
+                self.assertSameOutcome(text)
+
+    def test_fuzzed(self):
+        rnd = random.Random(0)
+        for _ in range(400):
+            self.assertSameOutcome(mutate(rnd, rnd.choice(EXAMPLES[:7])))
+
+    def test_line_offset(self):
+        positions = []
+        for backend in ("lark", "fast"):
+            session = ParserSession(line_offset=10, backend=backend)
+            session.parse("typedef A\n    x: $B\n", link_references=False)
+            positions.append(session.references[0][1])
+        self.assertEqual(positions[0], positions[1])
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            parse("x = 1", backend="yacc")
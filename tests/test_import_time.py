@@ -0,0 +1,43 @@
+import subprocess
+import sys
+import unittest
+from typing import Dict
+
+# `import api_schemas` takes about 45 ms without them and 130 ms with lark. Wall times vary too much between CI
+# runners to be asserted, so the tests check, that these modules aren't imported.
+HEAVY_MODULES = ("lark", "mako", "autopep8", "concurrent.futures.process", "multiprocessing")
+
+
+def import_times(statement: str) -> Dict[str, int]:
+    """Cumulative import time of every imported module in microseconds, measured by `python -X importtime`."""
+    res = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], capture_output=True, text=True,
+                         check=True)
+    times = {}
+    for line in res.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestImportTime(unittest.TestCase):
+
+    def assert_not_imported(self, times: Dict[str, int]):
+        for module in HEAVY_MODULES:
+            self.assertNotIn(module, times)
+
+    def test_package(self):
+        self.assert_not_imported(import_times("import api_schemas"))
+
+    def test_compilers(self):
+        self.assert_not_imported(import_times("from api_schemas.compilers import python, dart, pipeline"))
+
+    def test_parse_loads_lark(self):
+        times = import_times("import api_schemas; api_schemas.parse")
+        self.assertIn("lark", times)
+        self.assertNotIn("mako", times)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import random
+import unittest
+from functools import partial
+
+from api_schemas import parse, SchemaError
+from api_schemas.incremental import IncrementalParser
+from .example_schemas import everything
+
+
+class TestIncrementalParser(unittest.TestCase):
+
+    def test_same_as_parse(self):
+        parser = IncrementalParser()
+        self.assertEqual(parse(everything), parser.parse(everything))
+        text = everything.replace("c: float", "c: int\n    c2: bool")
+        self.assertEqual(parse(text), parser.parse(text))
+        self.assertEqual(1, parser.reparsed_blocks)
+        text = "x = 10\n" + text
+        self.assertEqual(parse(text), parser.parse(text))
+        self.assertEqual(1, parser.reparsed_blocks)
+
+    def test_reuse_and_relink(self):
+        parser = IncrementalParser()
+        text = "typedef A\n    a: int\n\ntypedef B\n    b: $A\n\ntypedef C\n    c: str\n"
+        old = parser.parse(text)
+        start = text.index("a: int") + 3
+        new = parser.edit(start, start + 3, "str")
+        self.assertEqual(1, parser.reparsed_blocks)
+        self.assertIsNot(old.global_types[0], new.global_types[0])
+        self.assertIs(old.global_types[2], new.global_types[2])
+        b = new.global_types[1]
+        self.assertIs(old.global_types[1], b)
+        self.assertIs(new.global_types[0], b.type.attributes[0].type.typedef)
+
+    def test_errors(self):
+        parser = IncrementalParser()
+        parser.parse("typedef A\n    a: int\ntypedef B\n    b: $A\n")
+        with self.assertRaises(SchemaError) as expected:
+            parse("x = 1\ntypedef A2\n    a: int\ntypedef B\n    b: $A\n")
+        with self.assertRaises(SchemaError) as msg:
+            parser.parse("x = 1\ntypedef A2\n    a: int\ntypedef B\n    b: $A\n")
+        self.assertEqual(str(expected.exception), str(msg.exception))
+        self.assertEqual(2, len(parser.parse("typedef A\n    a: int\ntypedef B\n    b: $A\n").global_types))
+
+    def test_random_edits(self):
+        rnd = random.Random(4)
+        blocks = [f"typedef T{i}\n    a: int\n    b: $T{i - 1}\n" if i else "typedef T0 str\n" for i in range(30)]
+        blocks += ["x = 1\n", "typedef A $T3\n", "typedef B\n    b: $A\n\n", "# comment\n"]
+        parser = IncrementalParser()
+        text = "".join(blocks)
+        parser.parse(text)
+        for _ in range(200):
+            start = rnd.randrange(len(text))
+            end = min(len(text), start + rnd.randrange(30))
+            replacement = rnd.choice(["", "\n", "    c: str\n", "typedef N\n    n: $T1\n", "int", "T5",
+                                         "typedef T3 $A\n", "    f: $N\n"])
+            new_text = text[:start] + replacement + text[end:]
+            if rnd.random() < 0.5:
+                update = partial(parser.edit, start, end, replacement)
+            else:
+                update = partial(parser.parse, new_text)
+            try:
+                res = parse(new_text)
+                expected = None
+            except SchemaError as e:
+                res = None
+                expected = str(e)
+            with self.subTest(text=new_text):
+                if res is None:
+                    with self.assertRaises(SchemaError) as msg:
+                        update()
+                    self.assertEqual(expected, str(msg.exception))
+                else:
+                    self.assertEqual(res, update())
+                    text = new_text
@@ -0,0 +1,59 @@
+import pickle
+import unittest
+from dataclasses import FrozenInstanceError
+
+from api_schemas import parse, ObjectType, ReferenceType, Typedef
+from .example_schemas import everything
+
+schema = """\
+typedef Item
+    name: str
+    next: $Item
+    state: State{open, closed}
+"""
+
+
+class TestCompactNodes(unittest.TestCase):
+
+    def test_slots(self):
+        item = parse(schema).global_types[0]
+        for node in (item, item.type, item.type.attributes[0], item.type.attributes[1].type):
+            self.assertFalse(hasattr(node, "__dict__"), type(node))
+
+    def test_frozen(self):
+        item = parse(schema).global_types[0]
+        with self.assertRaises(FrozenInstanceError):
+            item.type.name = "Other"
+        with self.assertRaises(AttributeError):
+            item.type.other = 1
+
+    def test_tuples(self):
+        ir = parse(everything)
+        self.assertIsInstance(ir.global_types, tuple)
+        for t in ir.global_types:
+            if type(t.type) is ObjectType:
+                self.assertIsInstance(t.type.attributes, tuple)
+                self.assertIsInstance(t.type.values, tuple)
+
+    def test_interned_names(self):
+        ir = parse(schema + schema.replace("Item", "Other"))
+        item, other = ir.global_types
+        self.assertIs(item.type.attributes[0].name, other.type.attributes[0].name)
+        self.assertIs(item.type.attributes[2].type.values[0], other.type.attributes[2].type.values[0])
+
+    def test_pickle(self):
+        ir = parse(schema)
+        loaded = pickle.loads(pickle.dumps(ir))
+        self.assertEqual(ir, loaded)
+        item = loaded.global_types[0]
+        self.assertIs(item, item.type.attributes[1].type.typedef)
+
+    def test_reference_hash(self):
+        a = ReferenceType("A", Typedef("A", ObjectType("A", (), ())))
+        self.assertEqual(a, ReferenceType("A"))
+        self.assertEqual(hash(a), hash(ReferenceType("A")))
+        hash(parse(schema))
+
+
+if __name__ == '__main__':
+    unittest.main()
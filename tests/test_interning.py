@@ -0,0 +1,75 @@
+import unittest
+
+from api_schemas import parse
+from api_schemas.interning import Interner, intern_types
+from .example_schemas import everything, websockets_3
+
+errors = """\
+people
+    GET
+        ->
+        <-
+            200
+                name: str
+            404
+                err_msg: str
+            500
+                err_msg: str
+    POST
+        ->
+            name: str
+        <-
+            404
+                err_msg: str
+
+WS
+    ->
+        a
+            b: Name
+                x: str
+        c
+            b: Name
+                x: str
+            d: Name
+                x: int
+    <-
+"""
+
+
+class TestInterning(unittest.TestCase):
+
+    def test_equal_to_original(self):
+        original = parse(everything)
+        res = intern_types(original)
+        self.assertEqual(original, res)
+        self.assertEqual(parse(everything), original)   # original is not changed
+
+    def test_shared_attributes(self):
+        res = intern_types(parse(errors))
+        get, post = res.communications[0].requests
+        err_msg = get.responses[1].attributes[0]
+        self.assertIs(err_msg, get.responses[2].attributes[0])
+        self.assertIs(err_msg, post.responses[0].attributes[0])
+        self.assertIs(post.parameters[0].type, get.responses[0].attributes[0].type)
+
+    def test_shared_objects(self):
+        res = intern_types(parse(errors))
+        a, c = res.ws_events.client
+        self.assertIs(a.data[0].type, c.data[0].type)
+        self.assertIsNot(a.data[0].type, c.data[1].type)
+
+    def test_references(self):
+        res = intern_types(parse("typedef A\n\tb: $B\n\tc: $B\ntypedef B\n\tnext: $B\n\ta: $A\n"))
+        a, b = res.global_types
+        self.assertIs(a.type.attributes[0].type, a.type.attributes[1].type)
+        self.assertIs(b, a.type.attributes[0].type.typedef)
+        self.assertIs(a, b.type.attributes[1].type.typedef)
+        res = intern_types(parse(websockets_3))     # only used by an event
+        self.assertIs(res.global_types[0], res.ws_events.client[0].data[0].type.typedef)
+
+    def test_several_files(self):
+        interner = Interner()
+        first = interner.intern_file(parse(errors))
+        second = interner.intern_file(parse(errors))
+        self.assertIs(first.ws_events.client[0].data[0].type, second.ws_events.client[0].data[0].type)
+        self.assertGreater(interner.shared, interner.nodes / 2)
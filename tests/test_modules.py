@@ -0,0 +1,201 @@
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from api_schemas import parse, parse_parallel, IncrementalParser, Diagnostics, SchemaError
+from api_schemas.compilers.python import PythonCompiler
+from api_schemas.compilers.template_registry import templates
+from api_schemas.interning import intern_types
+from api_schemas.modules import ModuleLoader
+from api_schemas.prelude import get_prelude
+
+money = """\
+typedef Money
+    cents: $int64
+    currency: str
+"""
+
+account = """\
+import common.money
+
+typedef Account
+    id: int
+    balance: $Money
+"""
+
+api = """\
+import common.money
+import account
+
+typedef Order
+    total: $Money
+    owner: $Account
+"""
+
+
+class TestModuleLoader(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.dir.name)
+        self.shared = self.root.joinpath("shared")
+        self.root.joinpath("common").mkdir()
+        self.shared.mkdir()
+        self.write("common/money.schema", money)
+        self.write("shared/account.schema", account)
+        self.write("api.schema", api)
+        self.loader = ModuleLoader([self.shared, self.root])
+
+    def tearDown(self) -> None:
+        self.dir.cleanup()
+
+    def write(self, name: str, text: str) -> Path:
+        path = self.root.joinpath(name)
+        path.write_text(text)
+        return path
+
+    def load(self, name: str = "api.schema"):
+        return self.loader.load_file(self.root.joinpath(name))
+
+    def test_import(self):
+        module = self.load()
+        self.assertEqual(["common.money", "account", "api"], [m.name for m in module.modules()])
+        money_module, account_module = module.imports
+        order = module.file.global_types[0].type
+        self.assertIs(money_module.types["Money"], order.attributes[0].type.typedef)
+        self.assertIs(account_module.types["Account"], order.attributes[1].type.typedef)
+        self.assertIs(money_module, account_module.imports[0])
+        self.assertEqual(self.root.joinpath("common", "money.schema").resolve(), money_module.path)
+
+    def test_load_by_name(self):
+        self.assertEqual("account", self.loader.load("account").name)
+        with self.assertRaises(ValueError):
+            self.loader.load("missing")
+
+    def test_reuse(self):
+        module = self.load()
+        self.assertEqual(3, self.loader.parsed)
+        self.assertIs(module, self.load())
+        self.assertEqual(0, self.loader.parsed)
+        self.write("api.schema", api + "    note: str\n")
+        changed = self.load()
+        self.assertEqual(1, self.loader.parsed)
+        self.assertIsNot(module, changed)
+        self.assertIs(module.imports[0], changed.imports[0])
+        self.write("common/money.schema", money + "    note: str\n")
+        changed = self.load()
+        self.assertEqual(3, self.loader.parsed)
+        self.assertIs(changed.imports[0], changed.imports[1].imports[0])
+
+    def test_local_directory_first(self):
+        self.write("account.schema", "typedef Account str\n")
+        module = self.load()
+        self.assertEqual(self.root.joinpath("account.schema").resolve(), module.imports[1].path)
+        self.root.joinpath("account.schema").unlink()
+        self.assertEqual(self.shared.joinpath("account.schema").resolve(), self.load().imports[1].path)
+
+    def test_shadowing(self):
+        module = self.loader.load_file(self.write("local.schema", api + "\ntypedef Money str\n"))
+        order = module.file.global_types[0].type
+        self.assertIs(module.types["Money"], order.attributes[0].type.typedef)
+
+    def test_not_transitive(self):
+        self.write("b.schema", "import account\n\ntypedef B\n    m: $Money\n")
+        with self.assertRaises(SchemaError) as cm:
+            self.load("b.schema")
+        self.assertIn("name 'Money is not defined", cm.exception.msg)
+
+    def test_missing_module(self):
+        path = self.write("b.schema", "typedef B str\n\nimport common.missing\n")
+        with self.assertRaises(SchemaError) as cm:
+            self.loader.load_file(path)
+        self.assertIn("ImportError: no module named 'common.missing'", cm.exception.msg)
+        self.assertEqual((str(path.resolve()), 3, 8), (cm.exception.file_name, cm.exception.position.line_begin,
+                                                       cm.exception.position.column_begin))
+
+    def test_cycle(self):
+        self.write("a.schema", "import b\n\ntypedef A\n    b: $B\n")
+        path = self.write("b.schema", "import a\n\ntypedef B\n    a: $A\n")
+        with self.assertRaises(SchemaError) as cm:
+            self.load("a.schema")
+        self.assertIn("ImportError: circular import a -> b -> a", cm.exception.msg)
+        self.assertEqual(str(path.resolve()), cm.exception.file_name)
+
+    def test_error_in_dependency(self):
+        path = self.write("common/money.schema", "typedef Money\n    cents: $Cents\n")
+        with self.assertRaises(SchemaError) as cm:
+            self.load()
+        self.assertEqual(str(path.resolve()), cm.exception.file_name)
+        self.assertTrue(str(cm.exception).startswith(f"{path.resolve()}:2:"))
+
+    def test_diagnostics(self):
+        self.write("common/money.schema", "typedef Money\n    cents: $Cents\n")
+        self.write("api.schema", api + "    x: $Unknown\n")
+        diagnostics = Diagnostics()
+        self.loader.load_file(self.root.joinpath("api.schema"), diagnostics=diagnostics)
+        self.assertEqual(["money.schema", "api.schema"], [Path(d.file_name).name for d in diagnostics.errors])
+        self.write("common/money.schema", money)
+        self.write("api.schema", api)
+        self.load()
+        self.assertEqual(3, self.loader.parsed, "modules with errors aren't cached")
+
+    def test_parse_without_loader(self):
+        with self.assertRaises(SchemaError) as cm:
+            parse(api)
+        self.assertIn("ImportError: can't import 'common.money' without a module loader", cm.exception.msg)
+
+    def test_block_parsers_without_loader(self):
+        text = "typedef A str\n\n" + api
+
+        def error(parse_text) -> str:
+            with self.assertRaises(SchemaError) as cm:
+                parse_text(text)
+            return str(cm.exception)
+
+        expected = error(parse)
+        self.assertIn("<schema>:3:8 ERROR: ImportError: can't import 'common.money'", expected)
+        with ThreadPoolExecutor(2) as executor:
+            self.assertEqual(expected, error(lambda t: parse_parallel(t, executor)))
+        self.assertEqual(expected, error(IncrementalParser().parse))
+        # added and removed by edits
+        parser = IncrementalParser()
+        parser.parse("typedef A str\n\ntypedef B str\n")
+        with self.assertRaises(SchemaError) as cm:
+            parser.edit(15, 15, api)
+        self.assertEqual(expected, str(cm.exception))
+        self.assertEqual(parse("typedef A str\n\ntypedef B str\n"), parser.parse("typedef A str\n\ntypedef B str\n"))
+
+    def test_bundle(self):
+        module = self.load()
+        self.assertEqual(["Money", "Account", "Order"], [t.name for t in module.bundle().global_types])
+        scope = {}
+        exec(PythonCompiler().compile_ir(module.bundle(), templates.get("python")), scope)
+        order = scope["APIOrder"].from_json({"total": {"cents": 100, "currency": "EUR"},
+                                             "owner": {"id": 1, "balance": {"cents": 0, "currency": "EUR"}}})
+        self.assertEqual("EUR", order.owner.balance.currency)
+
+    def test_bundle_shadowed(self):
+        self.write("shop.schema", "typedef Item\n    name: str\n\ntypedef Box\n    item: $Item\n    ?size: $int32\n")
+        module = self.loader.load_file(self.write("order.schema", "import shop\n\ntypedef Item\n    id: int\n\n"
+                                                                    "typedef Order\n    box: $Box\n    item: $Item\n"))
+        bundle = module.bundle()
+        self.assertEqual(["ShopItem", "Box", "Item", "Order"], [t.name for t in bundle.global_types])
+        self.assertEqual("Item", module.imports[0].types["Item"].name, "modules aren't changed")
+        box = bundle.global_types[1].type
+        self.assertIs(bundle.global_types[0], box.attributes[0].type.typedef)
+        self.assertIs(get_prelude("std").types["int32"], box.attributes[1].type.typedef)
+        for ir in (bundle, intern_types(bundle)):
+            scope = {}
+            exec(PythonCompiler().compile_ir(ir, templates.get("python")), scope)
+            data = {"box": {"item": {"name": "x"}}, "item": {"id": 1}}
+            order = scope["APIOrder"].from_json(data)
+            self.assertEqual("x", order.box.item.name)
+            self.assertEqual(data, order.to_json())
+            self.assertEqual({"id": 2}, scope["APIItem"].from_json({"id": 2}).to_json())
+            self.assertEqual({"name": "y"}, scope["APIShopItem"].from_json({"name": "y"}).to_json())
+
+    def test_fast_backend(self):
+        loader = ModuleLoader([self.shared, self.root], backend="fast")
+        module = loader.load_file(self.root.joinpath("api.schema"))
+        self.assertEqual(self.load().bundle(), module.bundle())
@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from api_schemas import File, parse_many
+from api_schemas.cache import CACHE_DIR_ENV
+from api_schemas.parser import get_parser
+from . import use_temporary_cache_dir
+
+
+class TestParser(unittest.TestCase):
+
+    def setUp(self) -> None:
+        use_temporary_cache_dir(self)
+
+    def test_parser_is_shared(self):
+        self.assertIs(get_parser(), get_parser())
+
+    def test_table_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            env = {**os.environ, CACHE_DIR_ENV: cache_dir}
+            cmd = [sys.executable, "-c", "from api_schemas import parse; parse('x = 10')"]
+            subprocess.run(cmd, env=env, check=True)
+            cached = list(Path(cache_dir).joinpath("grammar").iterdir())
+            self.assertEqual(1, len(cached))
+            subprocess.run(cmd, env=env, check=True)    # loads the tables
+            self.assertEqual(cached, list(Path(cache_dir).joinpath("grammar").iterdir()))
+
+
+def numbered_schema(i: int) -> str:
+    return f"""\
+typedef Id{i} int
+
+typedef Item{i}
+    id: $Id{i}
+    name_{i}: str
+    kind: Kind{i} {{A{i}, B{i}}}
+
+items_{i}
+    GET
+        ->
+        <-
+            200
+                item: $Item{i}
+"""
+
+
+class TestParseMany(unittest.TestCase):
+
+    def setUp(self) -> None:
+        use_temporary_cache_dir(self)
+
+    def check(self, i: int, res: File):
+        self.assertEqual([f"Id{i}", f"Item{i}"], [t.name for t in res.global_types])
+        item = res.global_types[1].type
+        self.assertEqual(["id", f"name_{i}", "kind"], [a.name for a in item.attributes])
+        self.assertIs(res.global_types[0], item.attributes[0].type.typedef)
+        self.assertEqual((f"A{i}", f"B{i}"), item.attributes[2].type.values)
+        self.assertIs(item, res.communications[0].requests[0].responses[0].attributes[0].type.resolve())
+
+    def test_parse_many(self):
+        schemas = [numbered_schema(i) for i in range(500)]
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)     # switch threads as often as possible
+        try:
+            with ThreadPoolExecutor(max_workers=16) as executor:
+                results = parse_many(schemas, executor)
+        finally:
+            sys.setswitchinterval(interval)
+        self.assertEqual(len(schemas), len(results))
+        for i, res in enumerate(results):
+            self.check(i, res)
+
+    def test_default_executor(self):
+        results = parse_many([numbered_schema(i) for i in range(10)])
+        for i, res in enumerate(results):
+            self.check(i, res)
@@ -0,0 +1,127 @@
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from api_schemas import parse, parse_parallel, IncrementalParser, SchemaError
+from api_schemas.cache import IRCache
+from api_schemas.compilers.python import PythonCompiler
+from api_schemas.compilers.template_registry import templates
+from api_schemas import prelude as prelude_module
+from api_schemas.prelude import get_prelude, register_prelude, available_preludes
+from . import use_temporary_cache_dir
+
+schema = """\
+typedef Point
+    x: $int32
+    y: $int32
+    label: $Label
+
+typedef Label str
+"""
+
+company_types = """\
+typedef Id $uint64
+
+typedef Money
+    cents: $int64
+    currency: str
+"""
+
+
+class TestPrelude(unittest.TestCase):
+
+    def setUp(self) -> None:
+        use_temporary_cache_dir(self)
+
+    def tearDown(self) -> None:
+        if "test_company" in prelude_module._sources:
+            del prelude_module._sources["test_company"]
+            prelude_module._loaded.clear()
+
+    def test_std_types(self):
+        ir = parse(schema)
+        x = ir.global_types[0].type.attributes[0].type
+        self.assertEqual("int32", x.typedef.name)
+        self.assertEqual({"size": "32", "signed": "true"}, x.typedef.type.constants_dicts())
+        self.assertEqual(["Point", "Label"], [t.name for t in ir.global_types])
+
+    def test_loaded_once(self):
+        self.assertIs(get_prelude("std"), get_prelude("std"))
+        a = parse(schema).global_types[0].type.attributes[0].type.typedef
+        b = parse(schema).global_types[0].type.attributes[1].type.typedef
+        self.assertIs(get_prelude("std").types["int32"], a)
+        self.assertIs(a, b)
+
+    def test_read_only(self):
+        with self.assertRaises(TypeError):
+            get_prelude("std").types["int32"] = None
+
+    def test_shadowing(self):
+        ir = parse(schema + "\ntypedef int32 str\n")
+        x = ir.global_types[0].type.attributes[0].type
+        self.assertIs(ir.global_types[-1], x.typedef)
+
+    def test_no_prelude(self):
+        with self.assertRaises(SchemaError):
+            parse(schema, prelude=None)
+        parse("typedef Label str\n", prelude=None)
+
+    def test_custom_prelude(self):
+        register_prelude("test_company", company_types)
+        self.assertIn("test_company", available_preludes())
+        ir = parse("typedef Order\n    id: $Id\n    total: $Money\n    count: $uint8\n", prelude="test_company")
+        order = ir.global_types[0].type
+        self.assertEqual("Money", order.attributes[1].type.typedef.name)
+        self.assertIs(get_prelude("std").types["uint8"], order.attributes[2].type.typedef)
+        with self.assertRaises(SchemaError):
+            parse("typedef Order\n    id: $Id\n")
+
+    def test_unknown_prelude(self):
+        with self.assertRaises(ValueError):
+            parse(schema, prelude="unknown")
+        with self.assertRaises(ValueError):
+            register_prelude("test_company", company_types, base="unknown")
+
+    def test_cache_key(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = IRCache(directory)
+            register_prelude("test_company", company_types)
+            self.assertNotEqual(cache.key(schema), cache.key(schema, "test_company"))
+            self.assertNotEqual(cache.key(schema), cache.key(schema, None))
+            parse(schema, cache=cache)
+            parse(schema, cache=cache, prelude="test_company")
+            self.assertEqual(2, cache.misses)
+
+    def test_cache_keeps_prelude_types(self):
+        register_prelude("test_company", company_types)
+        text = "typedef Order\n    id: $Id\n    count: $uint8\n"
+        with tempfile.TemporaryDirectory() as directory:
+            cache = IRCache(directory)
+            expected = parse(schema, cache=cache)
+            ir = parse(schema, cache=cache)
+            parse(text, cache=cache, prelude="test_company")
+            order = parse(text, cache=cache, prelude="test_company").global_types[0].type
+            self.assertEqual(2, cache.hits)
+        self.assertEqual(expected, ir)
+        self.assertIs(get_prelude("std").types["int32"], ir.global_types[0].type.attributes[0].type.typedef)
+        self.assertIs(get_prelude("test_company").types["Id"], order.attributes[0].type.typedef)
+        self.assertIs(get_prelude("std").types["uint8"], order.attributes[1].type.typedef)
+
+    def test_block_parsers(self):
+        expected = parse(schema)
+        self.assertEqual(expected, IncrementalParser().parse(schema))
+        with ThreadPoolExecutor(2) as executor:
+            self.assertEqual(expected, parse_parallel(schema, executor))
+        with self.assertRaises(SchemaError):
+            IncrementalParser(prelude=None).parse(schema)
+
+    def test_incremental_relink(self):
+        parser = IncrementalParser()
+        parser.parse(schema)
+        start = schema.index("$int32") + 1
+        ir = parser.edit(start, start + 5, "float64")
+        self.assertEqual("float64", ir.global_types[0].type.attributes[0].type.typedef.name)
+
+    def test_compile(self):
+        code = PythonCompiler().compile_dataclasses(schema, templates.get("python"))
+        self.assertIn("x: 'int'", code)
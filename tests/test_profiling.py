@@ -0,0 +1,64 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from api_schemas import parse
+from api_schemas.compilers import python
+from api_schemas.profiling import Profile, phase, active
+from .example_schemas import everything
+
+
+class TestProfile(unittest.TestCase):
+
+    def test_phases(self):
+        python.convert(everything)  # one time setup
+        with Profile() as profile:
+            self.assertIs(profile, active())
+            python.convert(everything, run_autopep8=True)
+        self.assertIsNone(active())
+        stats = profile.stats()
+        self.assertEqual(["parse", "lalr", "lex", "transform", "link", "intern", "render", "autopep8"], list(stats))
+        self.assertEqual(1, stats["parse"].calls)
+        self.assertGreater(stats["lex"].calls, 10)
+        self.assertGreater(stats["render"].allocations, 0)
+        # the self times add up to the time of the outer phases
+        outer = stats["parse"].total + stats["intern"].total + stats["render"].total + stats["autopep8"].total
+        self.assertAlmostEqual(outer, sum(s.self_time for s in stats.values()), places=6)
+        self.assertLessEqual(stats["lex"].total, stats["lalr"].total)
+
+    def test_disabled(self):
+        with Profile() as profile:
+            pass
+        parse(everything)
+        self.assertEqual([], profile.events)
+        self.assertIsNone(active())
+
+    def test_nested_and_memory(self):
+        with Profile(trace_memory=True) as profile:
+            with phase("outer"):
+                with phase("inner"):
+                    data = [object() for _ in range(1000)]
+        stats = profile.stats()
+        self.assertEqual(["outer", "inner"], list(stats))
+        self.assertGreater(stats["inner"].memory, 1000 * 16)
+        self.assertAlmostEqual(stats["outer"].total, stats["outer"].self_time + stats["inner"].total, places=6)
+        self.assertIn("memory kB", profile.report())
+        del data
+
+    def test_chrome_trace(self):
+        parse(everything)   # builds the grammar
+        with Profile() as profile:
+            parse(everything)
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory).joinpath("trace.json")
+            profile.write_chrome_trace(path)
+            trace = json.loads(path.read_text())
+        events = trace["traceEvents"]
+        self.assertEqual({"parse", "lalr", "lex", "transform", "link"}, {e["name"] for e in events})
+        self.assertTrue(all(e["ph"] == "X" and e["dur"] >= 0 for e in events))
+        self.assertIn("calls", next(e for e in events if e["name"] == "lex")["args"])
+
+
+if __name__ == '__main__':
+    unittest.main()
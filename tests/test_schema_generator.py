@@ -0,0 +1,50 @@
+import unittest
+
+from api_schemas import parse
+from api_schemas.compilers import dart, python
+from api_schemas.compilers.base import NameTypes
+from benchmarks.generator import SchemaSpec, generate, sample_json
+from benchmarks.suite import compare, measure
+
+SPEC = SchemaSpec(typedefs=20, width=5, depth=2, communications=3, ws_events=2, seed=3)
+
+
+class TestGenerator(unittest.TestCase):
+
+    def test_deterministic(self):
+        self.assertEqual(generate(SPEC), generate(SPEC))
+        self.assertNotEqual(generate(SPEC), generate(SchemaSpec(seed=4)))
+
+    def test_parse(self):
+        ir = parse(generate(SPEC))
+        self.assertEqual(20, len(ir.global_types))
+        self.assertEqual(3, len(ir.communications))
+        self.assertEqual(2, len(ir.ws_events.client))
+        self.assertEqual(2, len(ir.ws_events.server))
+
+    def test_compile(self):
+        text = generate(SPEC)
+        for compiler in (python, dart):
+            self.assertTrue(compiler.convert(text))
+
+    def test_json_round_trip(self):
+        text = generate(SPEC)
+        scope = {}
+        exec(python.convert(text), scope)
+        compiler = python.PythonCompiler()
+        for typedef in parse(text).global_types:
+            data = sample_json(typedef.type)
+            cls = scope[compiler.format_name(typedef.name, NameTypes.CLASS)]
+            self.assertEqual(data, cls.from_json(data).to_json())
+
+
+class TestSuite(unittest.TestCase):
+
+    def test_measure(self):
+        self.assertGreater(measure(lambda: sum(range(100)), repeat=2, min_time=0.001), 0)
+
+    def test_compare(self):
+        baseline = {"results": {"parse/small": 1.0, "to_json/python/small": 1.0, "removed": 1.0}}
+        results = {"results": {"parse/small": 1.1, "to_json/python/small": 1.3, "added": 1.0}}
+        self.assertEqual([("parse/small", 1.0, 1.1, False), ("to_json/python/small", 1.0, 1.3, True)],
+                         compare(results, baseline, threshold=0.2))
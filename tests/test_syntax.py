@@ -1,3 +1,4 @@
+import pickle
 import unittest
 
 from api_schemas import *
@@ -15,7 +16,7 @@ class TestSyntax(unittest.TestCase):
 
     def wrong(self, content: str):
         with self.subTest(self.i):
-            self.assertRaises(SystemExit, parse, content)
+            self.assertRaises(SchemaError, parse, content)
         self.i += 1
 
     def test_typedef(self):
@@ -38,7 +39,22 @@ typedef Name
         self.wrong("people\n\tGET\n\t\t->\n\t\t<-\n")
 
     def test_error_handling(self):
-        self.assertRaises(SystemExit, parse, "typedef\n")
+        self.assertRaises(SchemaError, parse, "typedef\n")
+
+    def test_indentation_error(self):
+        self.wrong("typedef A\n    a: int\n  b: int\n")
+        with self.assertRaises(SchemaError) as cm:
+            parse("typedef A\n    a: int\n  b: int\n", backend="fast")
+        self.assertIn("IndentationError", cm.exception.msg)
+
+    def test_schema_error(self):
+        with self.assertRaises(SchemaError) as cm:
+            parse("typedef A\n\tx: $B\n")
+        err = cm.exception
+        self.assertEqual((2, "ERROR"), (err.position.line_begin, err.to_dict()["level"]))
+        self.assertIn("name 'B is not defined", err.msg)
+        self.assertTrue(str(err).startswith("<schema>:2:"))
+        self.assertEqual(str(err), str(pickle.loads(pickle.dumps(err))))
 
 
 if __name__ == '__main__':
@@ -32,5 +32,18 @@ class TestTransformation(unittest.TestCase):
         parse(everything)
 
     def test_reference_types_not_found(self):
-        self.assertRaises(SystemExit, lambda: parse("typedef Y\n\tx: $X\n"))
-        self.assertRaises(SystemExit, lambda: parse("typedef Hello\n\tx: int\ntypedef X\n\tx: $hello\n"))
+        self.assertRaises(SchemaError, lambda: parse("typedef Y\n\tx: $X\n"))
+        self.assertRaises(SchemaError, lambda: parse("typedef Hello\n\tx: int\ntypedef X\n\tx: $hello\n"))
+
+    def test_references(self):
+        res = parse("typedef A\n\tb: $B\n\tc: $B\ntypedef B\n\ta: $A\n\tnext: $B\ntypedef C $B\n")
+        a, b, c = res.global_types
+        self.assertIs(b, a.type.attributes[0].type.typedef)
+        self.assertIs(b, a.type.attributes[1].type.typedef)
+        self.assertIs(a, b.type.attributes[0].type.typedef)
+        self.assertIs(b.type, b.type.attributes[1].type.resolve())
+        self.assertIs(b.type, c.type.resolve())
+
+    def test_circular_alias(self):
+        self.assertRaises(SchemaError, lambda: parse("typedef A $B\ntypedef B $A\n"))
+        self.assertRaises(SchemaError, lambda: parse("typedef A $A\n"))